@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import functools
 import json
 import sys
 from pathlib import Path
@@ -35,22 +36,49 @@ def _require_deepseek():
         raise SystemExit("deepseek client is required: check benchmark/deepseek_client.py") from exc
 
 
-def load_adapter(path: str) -> Dict[str, Any]:
-    yaml = _require_yaml()
-    return yaml.safe_load(Path(path).read_text(encoding="utf-8")) or {}
+def _to_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False)
 
 
+@functools.lru_cache(maxsize=1)
 def _env_with_filters():
     Environment = _require_jinja()
     env = Environment(autoescape=False)
-    env.filters["to_json"] = lambda v: json.dumps(v, ensure_ascii=False)
+    env.filters["to_json"] = _to_json
     return env
 
 
+@functools.lru_cache(maxsize=256)
+def compile_template(source: str):
+    return _env_with_filters().from_string(source)
+
+
+class CompiledAdapter(dict):
+    # Parsed adapter YAML (still usable as a plain dict) with its prompt templates
+    # compiled once. Pickles as the raw config and recompiles on load, so it can
+    # be shipped to worker processes.
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self.input_template = compile_template(self.get("input_prompt_template", ""))
+        self.output_template = compile_template(self.get("output_parse_template", ""))
+
+    def __reduce__(self):
+        return (CompiledAdapter, (dict(self),))
+
+
+def compile_adapter(adapter: Dict[str, Any]) -> CompiledAdapter:
+    if isinstance(adapter, CompiledAdapter):
+        return adapter
+    return CompiledAdapter(adapter)
+
+
+def load_adapter(path: str) -> CompiledAdapter:
+    yaml = _require_yaml()
+    return CompiledAdapter(yaml.safe_load(Path(path).read_text(encoding="utf-8")) or {})
+
+
 def render_input(adapter: Dict[str, Any], case: Dict[str, Any]) -> str:
-    env = _env_with_filters()
-    tmpl = env.from_string(adapter.get("input_prompt_template", ""))
-    return tmpl.render(case=case)
+    return compile_adapter(adapter).input_template.render(case=case)
 
 
 def adapt_input_with_llm(adapter: Dict[str, Any], rendered_input: str, model: str = "") -> str:
@@ -72,9 +100,8 @@ def adapt_input_with_llm(adapter: Dict[str, Any], rendered_input: str, model: st
 def parse_output_with_llm(
     adapter: Dict[str, Any], agent_raw_output: str, final_code: Dict[str, str], model: str = ""
 ) -> Dict[str, Any]:
-    env = _env_with_filters()
     chat_complete = _require_deepseek()
-    tmpl = env.from_string(adapter.get("output_parse_template", ""))
+    tmpl = compile_adapter(adapter).output_template
     prompt = tmpl.render(agent_raw_output=agent_raw_output, final_code=json.dumps(final_code, ensure_ascii=False))
     text = chat_complete(
         [{"role": "user", "content": prompt}],
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# Adaptive, stratified case sampling with early stopping (orchestrator --adaptive).
+#
+# Each agent's runs are split into strata (level1 x difficulty) and drawn in a
+# shuffled order, one run per free pipeline slot. Every stratum first gets
+# min_per_stratum runs; after that the next run goes to the stratum whose extra
+# run shrinks the variance of the agent's stratified pass-rate estimate most
+# (greedy Neyman allocation), so budget flows to large, uncertain, under-sampled
+# strata. An agent stops getting new runs once the half-width of its confidence
+# interval is at most target_precision.
+#
+# The estimate is over the planned runs (the population): p = sum_h W_h p_h with
+# W_h = N_h / N, and Var = sum_h W_h^2 s_h^2 / n_h * (1 - n_h / N_h), where
+# s_h^2 uses the Agresti-Coull rate so 0/n and n/n strata still count as
+# uncertain. A fully run stratum contributes no variance.
+import math
+import random
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from leaderboard_stats import Z_95
+
+Stratum = Tuple[str, str]
+
+
+class _Stratum:
+    def __init__(self, runs: List[Any]):
+        # Drawn from the end.
+        self.pool = runs
+        self.size = len(runs)
+        self.assigned = 0
+        self.runs = 0
+        self.passed = 0
+
+    def variance(self, z: float) -> float:
+        p = (self.passed + z * z / 2) / (self.runs + z * z)
+        return p * (1 - p)
+
+
+class _AgentPlan:
+    def __init__(self, key: str):
+        self.key = key
+        self.strata: Dict[Stratum, _Stratum] = {}
+        self.settled = False
+
+    @property
+    def size(self) -> int:
+        return sum(s.size for s in self.strata.values())
+
+
+class AdaptiveSampler:
+    def __init__(
+        self,
+        runs: List[Any],
+        agent_of: Callable[[Any], str],
+        stratum_of: Callable[[Any], Stratum],
+        target_precision: float,
+        min_per_stratum: int = 2,
+        z: float = Z_95,
+        seed: int = 0,
+    ):
+        self.target_precision = target_precision
+        self.min_per_stratum = max(1, min_per_stratum)
+        self.z = z
+        self._agent_of = agent_of
+        self._stratum_of = stratum_of
+        self._plans: Dict[str, _AgentPlan] = {}
+        grouped: Dict[Tuple[str, Stratum], List[Any]] = {}
+        for run in runs:
+            grouped.setdefault((agent_of(run), stratum_of(run)), []).append(run)
+        rng = random.Random(seed)
+        for (agent, stratum), members in grouped.items():
+            rng.shuffle(members)
+            plan = self._plans.setdefault(agent, _AgentPlan(agent))
+            plan.strata[stratum] = _Stratum(members)
+        self._taken = set()
+
+    def _stratum(self, run: Any) -> _Stratum:
+        return self._plans[self._agent_of(run)].strata[self._stratum_of(run)]
+
+    def _take(self, run: Any) -> None:
+        self._taken.add(id(run))
+        self._stratum(run).assigned += 1
+
+    def observe(self, run: Any, passed: bool) -> None:
+        # A finished run; also used for runs already done when resuming.
+        if id(run) not in self._taken:
+            self._take(run)
+        stratum = self._stratum(run)
+        stratum.runs += 1
+        stratum.passed += int(bool(passed))
+        plan = self._plans[self._agent_of(run)]
+        if not plan.settled and self.half_width(plan) <= self.target_precision:
+            plan.settled = True
+
+    def estimate(self, plan: _AgentPlan) -> Optional[float]:
+        total = plan.size
+        if any(s.runs == 0 for s in plan.strata.values()):
+            return None
+        return sum(s.size / total * s.passed / s.runs for s in plan.strata.values())
+
+    def half_width(self, plan: _AgentPlan) -> float:
+        total = plan.size
+        variance = 0.0
+        for s in plan.strata.values():
+            if s.runs < min(self.min_per_stratum, s.size):
+                return math.inf
+            if s.runs < s.size:
+                variance += (s.size / total) ** 2 * s.variance(self.z) / s.runs * (1 - s.runs / s.size)
+        return self.z * math.sqrt(variance)
+
+    def _next_stratum(self, plan: _AgentPlan) -> Optional[_Stratum]:
+        open_strata = [s for s in plan.strata.values() if s.assigned < s.size]
+        if not open_strata:
+            return None
+        behind = [s for s in open_strata if s.assigned < self.min_per_stratum]
+        if behind:
+            return min(behind, key=lambda s: s.assigned)
+        total = plan.size
+
+        # Variance removed by one more run: W^2 s^2 (1/n - 1/(n + 1)), counting
+        # runs still in flight as already allocated.
+        def gain(s: _Stratum) -> float:
+            return (s.size / total) ** 2 * s.variance(self.z) / (s.assigned * (s.assigned + 1))
+
+        return max(open_strata, key=gain)
+
+    def _next_run(self, plan: _AgentPlan) -> Optional[Any]:
+        while not plan.settled:
+            stratum = self._next_stratum(plan)
+            if stratum is None:
+                return None
+            run = stratum.pool.pop()
+            if id(run) in self._taken:
+                # Already observed when resuming (and counted in assigned).
+                continue
+            self._take(run)
+            return run
+        return None
+
+    def next_run(self, agent: str) -> Optional[Any]:
+        # The agent's next run, or None once it is settled or out of runs.
+        plan = self._plans.get(agent)
+        return self._next_run(plan) if plan is not None else None
+
+    def __iter__(self) -> Iterator[Any]:
+        # Round-robin over agents that are neither settled nor out of runs.
+        # Evaluated lazily by run_pipeline, one run per free slot.
+        order = list(self._plans.values())
+        turn = 0
+        while True:
+            for offset in range(len(order)):
+                plan = order[(turn + offset) % len(order)]
+                run = self._next_run(plan)
+                if run is not None:
+                    turn = (turn + offset + 1) % len(order)
+                    yield run
+                    break
+            else:
+                return
+
+    def summary(self) -> List[Dict[str, Any]]:
+        out = []
+        for plan in self._plans.values():
+            estimate = self.estimate(plan)
+            half = self.half_width(plan)
+            runs = sum(s.runs for s in plan.strata.values())
+            out.append(
+                {
+                    "agent": plan.key,
+                    "planned": plan.size,
+                    "runs": runs,
+                    "passed": sum(s.passed for s in plan.strata.values()),
+                    "pass_rate": estimate,
+                    "half_width": None if math.isinf(half) else half,
+                    "low": None if estimate is None or math.isinf(half) else max(0.0, estimate - half),
+                    "high": None if estimate is None or math.isinf(half) else min(1.0, estimate + half),
+                    "settled": plan.settled,
+                    "strata": [
+                        {"level1": key[0], "difficulty": key[1], "planned": s.size, "runs": s.runs, "passed": s.passed}
+                        for key, s in sorted(plan.strata.items())
+                    ],
+                }
+            )
+        return out
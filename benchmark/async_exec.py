@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+import asyncio
+import os
+import signal
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from instrument import read_usage, wrap_command
+
+_CHUNK = 64 * 1024
+
+
+def _kill_group(proc: asyncio.subprocess.Process) -> None:
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def _pump(stream: asyncio.StreamReader, path: Path, mark_output) -> None:
+    with path.open("wb") as f:
+        while True:
+            chunk = await stream.read(_CHUNK)
+            if not chunk:
+                break
+            mark_output()
+            f.write(chunk)
+            f.flush()
+
+
+async def _feed(proc: asyncio.subprocess.Process, data: Optional[bytes]) -> None:
+    if proc.stdin is None:
+        return
+    try:
+        if data:
+            proc.stdin.write(data)
+            await proc.stdin.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        # The child may exit without reading its input.
+        pass
+    finally:
+        proc.stdin.close()
+
+
+async def run_process(
+    cmd: List[str],
+    cwd: str,
+    stdout_path: Path,
+    stderr_path: Path,
+    timeout: int = 600,
+    input_text: Optional[str] = None,
+    env: Optional[Dict[str, str]] = None,
+    measure: bool = False,
+) -> Dict[str, Any]:
+    # The child gets its own session so a timeout kills the whole process group
+    # (agents and pytest both spawn helpers). Timeouts are reported, not raised.
+    # measure=True runs the command under the instrument.py rusage wrapper and
+    # adds cpu_sec / max_rss_kb / write_bytes to the returned stats.
+    usage_path = None
+    if measure:
+        cmd, usage_path = wrap_command(cmd)
+    t0 = time.perf_counter()
+    first_output: List[float] = []
+
+    def _mark_output() -> None:
+        if not first_output:
+            first_output.append(time.perf_counter() - t0)
+
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        cwd=cwd,
+        env=env,
+        stdin=asyncio.subprocess.PIPE if input_text is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,
+    )
+    data = input_text.encode("utf-8") if input_text is not None else None
+    io_tasks = [
+        asyncio.ensure_future(_feed(proc, data)),
+        asyncio.ensure_future(_pump(proc.stdout, stdout_path, _mark_output)),
+        asyncio.ensure_future(_pump(proc.stderr, stderr_path, _mark_output)),
+    ]
+    timed_out = False
+    try:
+        await asyncio.wait_for(proc.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        timed_out = True
+        _kill_group(proc)
+        await proc.wait()
+    except BaseException:
+        _kill_group(proc)
+        raise
+    finally:
+        # Grandchildren may still hold the pipes open after the leader exits.
+        _kill_group(proc)
+        await asyncio.gather(*io_tasks, return_exceptions=True)
+
+    stats = {
+        "returncode": proc.returncode,
+        "wall_sec": round(time.perf_counter() - t0, 3),
+        "first_output_sec": round(first_output[0], 3) if first_output else None,
+        "timed_out": timed_out,
+    }
+    if usage_path is not None:
+        stats.update(read_usage(usage_path))
+    return stats
+
+
+def run_process_sync(
+    cmd: List[str],
+    cwd: str,
+    stdout_path: Path,
+    stderr_path: Path,
+    timeout: int = 600,
+    input_text: Optional[str] = None,
+    env: Optional[Dict[str, str]] = None,
+    measure: bool = False,
+) -> Dict[str, Any]:
+    return asyncio.run(run_process(cmd, cwd, stdout_path, stderr_path, timeout, input_text, env, measure))
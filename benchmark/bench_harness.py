@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# Harness self-benchmark: runs orchestrator.py end to end with fake_agent.py, so
+# the numbers are the harness's own overhead (seeding, diffing, test runs,
+# bookkeeping) rather than an agent's. Each run writes report.json into its own
+# dir under --out-dir and appends a summary line to <out-dir>/history.jsonl so
+# harness performance can be tracked across commits.
+import argparse
+import json
+import random
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from async_exec import run_process_sync
+from case_bank import scan_case_bank
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    # Nearest-rank percentile; None for an empty sample.
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), int(round(q / 100 * len(ordered) + 0.5))))
+    return ordered[rank - 1]
+
+
+def _module_source(index: int, file_kb: int, value: Optional[int]) -> str:
+    lines = [f'"""Synthetic module {index}."""\n\n']
+    if value is not None:
+        lines.append(f"def value():\n    return {value}\n\n")
+    size, j = sum(len(line) for line in lines), 0
+    while size < file_kb * 1024:
+        line = f"\ndef helper_{j}(x):\n    return x + {j}\n"
+        lines.append(line)
+        size += len(line)
+        j += 1
+    return "".join(lines)
+
+
+def _synthetic_case(
+    category: Dict[str, Any], idx: int, files: int, file_kb: int, fail: bool, rng: random.Random
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    # src/mod_0.py has a bug the tests catch; the canned patch fixes it (or, for
+    # cases meant to fail, rewrites it without fixing it) and adds a file.
+    initial = {"src/__init__.py": ""}
+    for k in range(max(1, files)):
+        initial[f"src/mod_{k}.py"] = _module_source(k, file_kb, 0 if k == 0 else None)
+    case = {
+        "case_id": f"BENCH-{category['level3_id']}-{idx:05d}",
+        "vcfcst_category": {
+            "level1": category["level1"],
+            "level2": category["level2"],
+            "level3_id": category["level3_id"],
+            "level3_name": category["level3_name"],
+            "defect_desc": category["defect_desc"],
+        },
+        "difficulty": rng.choice(["Easy", "Medium", "Hard"]),
+        "case_type": "modify",
+        "requirement": "让 value() 返回 1。",
+        "initial_code": initial,
+        "acceptance_criteria": {
+            "test_code": {"tests/test_mod_0.py": "from src.mod_0 import value\n\n\ndef test_value():\n    assert value() == 1\n"},
+            "static_check_rules": [],
+            "pass_condition": "pytest 通过率100%",
+        },
+        "expected_defect": category["defect_desc"],
+        "env_config": {
+            "base_image": "python:3.10-slim",
+            "dependencies": ["pytest==8.0.0"],
+            "expose_port": [],
+            "network_disabled": True,
+        },
+    }
+    patch = {
+        "write": {
+            "src/mod_0.py": _module_source(0, file_kb, 2 if fail else 1),
+            "NOTES.md": f"Changed value() for {case['case_id']}.\n",
+        },
+        "delete": [],
+    }
+    return case, patch
+
+
+def _touch_patch(case: Dict[str, Any]) -> Dict[str, Any]:
+    # Banks we did not build get a harmless edit: a comment appended to the first
+    # Python file, so collect/diff still have something to find.
+    initial = case.get("initial_code") or {}
+    py_files = sorted(rel for rel in initial if rel.endswith(".py"))
+    if not py_files:
+        return {"write": {"FAKE_AGENT.md": "touched\n"}, "delete": []}
+    rel = py_files[0]
+    return {"write": {rel: initial[rel] + "\n# edited by fake agent\n"}, "delete": []}
+
+
+def _build_bank(args, work_dir: Path) -> Tuple[Path, Dict[str, Dict[str, Any]]]:
+    bank_path = work_dir / "bank.jsonl"
+    patches: Dict[str, Dict[str, Any]] = {}
+    if args.bank == "synthetic":
+        rng = random.Random(args.seed)
+        categories = json.loads((BENCH_DIR / "categories_top50.json").read_text(encoding="utf-8"))
+        with bank_path.open("w", encoding="utf-8") as f:
+            for i in range(args.cases):
+                fail = args.fail_every > 0 and i % args.fail_every == args.fail_every - 1
+                case, patch = _synthetic_case(
+                    categories[i % len(categories)], i, args.files_per_case, args.file_kb, fail, rng
+                )
+                patches[case["case_id"]] = patch
+                f.write(json.dumps(case, ensure_ascii=False) + "\n")
+        return bank_path, patches
+    if args.bank == "stub":
+        subprocess.run(
+            [
+                sys.executable,
+                str(BENCH_DIR / "generate_cases.py"),
+                "--dry-run",
+                "--per-category",
+                str(args.per_category),
+                "--categories",
+                str(BENCH_DIR / "categories_top50.json"),
+                "--out-jsonl",
+                str(bank_path),
+                "--out-parquet",
+                str(work_dir / "bank.parquet"),
+            ],
+            check=True,
+            cwd=str(REPO_ROOT),
+        )
+    else:
+        bank_path = Path(args.bank)
+    for case in scan_case_bank(str(bank_path), limit=args.cases).to_dict(orient="records"):
+        patches[case["case_id"]] = _touch_patch(case)
+    return bank_path, patches
+
+
+def _phase_report(results: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    samples: Dict[str, Dict[str, List[float]]] = {}
+    for result in results:
+        for phase in (result.get("metrics") or {}).get("phases") or []:
+            bucket = samples.setdefault(phase["phase"], {"wall_sec": [], "cpu_sec": [], "max_rss_kb": [], "write_bytes": []})
+            for key, values in bucket.items():
+                if phase.get(key) is not None:
+                    values.append(phase[key])
+    report = {}
+    for name, bucket in samples.items():
+        walls, cpus = bucket["wall_sec"], bucket["cpu_sec"]
+        report[name] = {
+            "count": len(walls),
+            "wall_p50": _percentile(walls, 50),
+            "wall_p90": _percentile(walls, 90),
+            "wall_p99": _percentile(walls, 99),
+            "wall_max": max(walls) if walls else None,
+            "cpu_p50": _percentile(cpus, 50),
+            "cpu_p99": _percentile(cpus, 99),
+            "max_rss_kb": max(bucket["max_rss_kb"]) if bucket["max_rss_kb"] else None,
+            "write_bytes_total": sum(bucket["write_bytes"]),
+        }
+    return report
+
+
+def _git_rev() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=str(REPO_ROOT), capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Benchmark the orchestrator itself with a fake agent. "
+        "Unknown options are passed through to orchestrator.py."
+    )
+    ap.add_argument("--bank", default="synthetic", help="synthetic, stub (generate_cases.py --dry-run) or a bank path")
+    ap.add_argument("--cases", type=int, default=1000, help="Synthetic bank size (also a limit for other banks)")
+    ap.add_argument("--files-per-case", type=int, default=5, help="Synthetic: source files per case")
+    ap.add_argument("--file-kb", type=int, default=4, help="Synthetic: approximate size of each source file")
+    ap.add_argument("--fail-every", type=int, default=10, help="Synthetic: every Nth case keeps its bug (0: none)")
+    ap.add_argument("--per-category", type=int, default=1, help="Stub: cases per category")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--agent-sleep-ms", type=int, default=0, help="Simulated agent think time per case")
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--pytest-mode", choices=["subprocess", "fork"], default="fork")
+    ap.add_argument("--timeout", type=int, default=60)
+    ap.add_argument("--label", default="", help="Name for this run in history.jsonl (default: bank + size)")
+    ap.add_argument("--out-dir", default="runs/harness_bench")
+    ap.add_argument("--keep", action="store_true", help="Keep case workspaces and logs after the run")
+    args, passthrough = ap.parse_known_args()
+
+    label = args.label or (
+        f"synthetic-{args.cases}x{args.files_per_case}x{args.file_kb}kb" if args.bank == "synthetic" else Path(args.bank).stem
+    )
+    out_dir = Path(args.out_dir).resolve()
+    work_dir = out_dir / f"{label}-{time.strftime('%Y%m%d-%H%M%S')}"
+    patch_dir = work_dir / "patches"
+    patch_dir.mkdir(parents=True, exist_ok=True)
+
+    bank_path, patches = _build_bank(args, work_dir)
+    for case_id, patch in patches.items():
+        (patch_dir / f"{case_id}.json").write_text(json.dumps(patch, ensure_ascii=False), encoding="utf-8")
+
+    run_root = work_dir / "runs"
+    cmd = [
+        sys.executable,
+        str(BENCH_DIR / "orchestrator.py"),
+        "--case-bank",
+        str(bank_path),
+        "--agent-config",
+        str(BENCH_DIR / "adapters" / "fake_agent.yaml"),
+        "--run-dir",
+        str(run_root),
+        "--out",
+        str(work_dir / "results.parquet"),
+        "--limit",
+        str(args.cases),
+        "--workers",
+        str(args.workers),
+        "--pytest-mode",
+        args.pytest_mode,
+        "--timeout",
+        str(args.timeout),
+    ] + passthrough
+    cmd += ["--agent-cmd", sys.executable, str(BENCH_DIR / "fake_agent.py"), str(patch_dir), str(args.agent_sleep_ms)]
+    print(f"bench: {len(patches)} cases -> {work_dir}")
+    started_at = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    # The orchestrator runs under the rusage wrapper: its peak RSS and CPU time
+    # (including the agents and tests it waited for) land in the report.
+    stats = run_process_sync(
+        cmd,
+        str(REPO_ROOT),
+        work_dir / "orchestrator.stdout.log",
+        work_dir / "orchestrator.stderr.log",
+        timeout=24 * 3600,
+        measure=True,
+    )
+    if stats["returncode"] != 0:
+        raise SystemExit(f"orchestrator failed ({stats['returncode']}), see {work_dir / 'orchestrator.stderr.log'}")
+
+    batch_dir = next(run_root.glob("benchmark-*"))
+    results = [json.loads(line) for line in (batch_dir / "results.jsonl").read_text(encoding="utf-8").splitlines() if line]
+    pipeline = json.loads((batch_dir / "pipeline_stats.json").read_text(encoding="utf-8"))
+    n = len(results)
+    report = {
+        "label": label,
+        "git_rev": _git_rev(),
+        "started_at": started_at,
+        "bank": {
+            "kind": args.bank,
+            "cases": n,
+            "files_per_case": args.files_per_case if args.bank == "synthetic" else None,
+            "file_kb": args.file_kb if args.bank == "synthetic" else None,
+        },
+        "orchestrator_args": cmd[2:],
+        "wall_sec": stats["wall_sec"],
+        "pipeline_wall_sec": pipeline["wall_sec"],
+        "cases_per_sec": round(n / stats["wall_sec"], 3) if stats["wall_sec"] else None,
+        "pipeline_cases_per_sec": round(n / pipeline["wall_sec"], 3) if pipeline["wall_sec"] else None,
+        "cpu_sec": stats.get("cpu_sec"),
+        "peak_rss_kb": stats.get("max_rss_kb"),
+        "passed": sum(1 for r in results if r.get("passed")),
+        "phases": _phase_report(results),
+        "stages": pipeline["stages"],
+    }
+    (work_dir / "report.json").write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    with (out_dir / "history.jsonl").open("a", encoding="utf-8") as f:
+        summary = {k: report[k] for k in ("label", "git_rev", "started_at", "cases_per_sec", "peak_rss_kb", "wall_sec")}
+        summary["phase_wall_p50"] = {name: p["wall_p50"] for name, p in report["phases"].items()}
+        f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+    if not args.keep:
+        shutil.rmtree(run_root, ignore_errors=True)
+
+    print(
+        f"{label}: {n} cases in {report['wall_sec']}s -> {report['cases_per_sec']} cases/s "
+        f"(pipeline {report['pipeline_cases_per_sec']} cases/s), passed={report['passed']}, "
+        f"peak RSS {report['peak_rss_kb']} KiB"
+    )
+    for name, p in report["phases"].items():
+        print(
+            f"  {name:<15} n={p['count']:<6} p50={p['wall_p50']}s p90={p['wall_p90']}s "
+            f"p99={p['wall_p99']}s max={p['wall_max']}s cpu_p50={p['cpu_p50']}s"
+        )
+    print(f"report: {work_dir / 'report.json'}")
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from case_bank import scan_case_bank
+from evaluator import run_pytest_async
+from pytest_worker import PytestWorkerPool
+from seed_cache import write_files
+
+
+async def _run_mode(mode: str, workspaces, timeout: int):
+    workers = PytestWorkerPool(size=1) if mode == "fork" else None
+    walls, codes = [], []
+    t0 = time.perf_counter()
+    try:
+        for ws in workspaces:
+            code, _, stats = await run_pytest_async(
+                str(ws), ws.parent / f"{mode}.stdout.log", ws.parent / f"{mode}.stderr.log", timeout, workers=workers
+            )
+            walls.append(stats["wall_sec"])
+            codes.append(code)
+    finally:
+        if workers is not None:
+            await workers.close()
+    return time.perf_counter() - t0, walls, codes
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare subprocess vs forked-worker pytest execution")
+    ap.add_argument("--case-bank", default="datasets/case_bank.jsonl")
+    ap.add_argument("--limit", type=int, default=20)
+    ap.add_argument("--repeats", type=int, default=3, help="Runs of each case per mode")
+    ap.add_argument("--timeout", type=int, default=30)
+    args = ap.parse_args()
+
+    cases = scan_case_bank(args.case_bank, limit=args.limit).to_dict(orient="records")
+    with tempfile.TemporaryDirectory(prefix="vcfcst-pytest-bench-") as tmp:
+        workspaces = []
+        for case in cases:
+            ws = Path(tmp) / case["case_id"] / "workspace"
+            write_files(ws, case["initial_code"])
+            write_files(ws, case["acceptance_criteria"]["test_code"])
+            workspaces.append(ws)
+        workspaces = workspaces * args.repeats
+
+        results = {}
+        for mode in ("subprocess", "fork"):
+            results[mode] = asyncio.run(_run_mode(mode, workspaces, args.timeout))
+
+    sub_codes, fork_codes = results["subprocess"][2], results["fork"][2]
+    mismatches = sum(a != b for a, b in zip(sub_codes, fork_codes))
+    print(f"runs={len(workspaces)} exit code mismatches={mismatches}")
+    for mode, (total, walls, _) in results.items():
+        print(
+            f"{mode:>10}: total {total:.2f}s  median {statistics.median(walls):.3f}s  "
+            f"mean {statistics.mean(walls):.3f}s  max {max(walls):.3f}s"
+        )
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+import argparse
+import itertools
+import pickle
+import time
+
+from adapter_llm import _require_jinja, _to_json, load_adapter, render_input
+from case_bank import scan_case_bank
+
+
+def _render_uncached(adapter, case):
+    # What render_input used to do per case: fresh Environment + template compile.
+    Environment = _require_jinja()
+    env = Environment(autoescape=False)
+    env.filters["to_json"] = _to_json
+    return env.from_string(adapter.get("input_prompt_template", "")).render(case=case)
+
+
+def _time(fn, adapter, cases):
+    start = time.perf_counter()
+    for case in cases:
+        fn(adapter, case)
+    return time.perf_counter() - start
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Micro-benchmark adapter input rendering")
+    ap.add_argument("--case-bank", default="datasets/case_bank.jsonl")
+    ap.add_argument("--agent-config", default="benchmark/adapters/aider.yaml")
+    ap.add_argument("--n", type=int, default=10000)
+    args = ap.parse_args()
+
+    adapter = load_adapter(args.agent_config)
+    bank = scan_case_bank(args.case_bank).to_dict(orient="records")
+    if not bank:
+        raise SystemExit("case bank is empty")
+    cases = list(itertools.islice(itertools.cycle(bank), args.n))
+
+    for case in bank:
+        if render_input(adapter, case) != _render_uncached(adapter, case):
+            raise SystemExit(f"render mismatch for {case.get('case_id')}")
+    pickle.loads(pickle.dumps(adapter))
+
+    uncached = _time(_render_uncached, adapter, cases)
+    compiled = _time(render_input, adapter, cases)
+    print(f"cases={len(cases)}")
+    print(f"uncached: {uncached:.3f}s ({uncached / len(cases) * 1e6:.1f} us/case)")
+    print(f"compiled: {compiled:.3f}s ({compiled / len(cases) * 1e6:.1f} us/case)")
+    print(f"speedup: {uncached / compiled:.1f}x")
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
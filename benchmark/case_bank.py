@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
+import hashlib
 import json
+import os
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
@@ -78,6 +80,20 @@ def normalize_case(case: Dict[str, Any]) -> Dict[str, Any]:
     return case
 
 
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+def case_content_hash(case: Dict[str, Any]) -> str:
+    # Stable across jsonl/parquet round trips: arrays become lists and the null
+    # fields parquet adds for struct keys a case does not have are dropped.
+    canonical = _drop_none_in_mapping(json.loads(json.dumps(normalize_case(case), default=_json_default)))
+    payload = json.dumps(canonical, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
 def validate_case(case: Dict[str, Any], schema: Optional[Dict[str, Any]] = None) -> List[str]:
     if schema is None:
         schema = load_schema()
@@ -85,13 +101,18 @@ def validate_case(case: Dict[str, Any], schema: Optional[Dict[str, Any]] = None)
     return _validate_with_jsonschema(case, schema)
 
 
-def load_case_bank(path: str):
-    pd = _require_pandas()
-    suffix = Path(path).suffix.lower()
-    if suffix in {".jsonl", ".json"}:
-        df = pd.read_json(path, lines=suffix == ".jsonl")
-    else:
-        df = pd.read_parquet(path)
+def _require_pyarrow():
+    try:
+        import pyarrow as pa  # type: ignore
+        import pyarrow.compute as pc  # type: ignore
+        import pyarrow.dataset as ds  # type: ignore
+
+        return pa, pc, ds
+    except Exception as exc:  # pragma: no cover
+        raise SystemExit("pyarrow is required: pip install pyarrow") from exc
+
+
+def _normalize_frame(df):
     if "initial_code" in df.columns:
         df["initial_code"] = df["initial_code"].apply(lambda v: _drop_none_in_mapping(v or {}))
     if "acceptance_criteria" in df.columns:
@@ -104,6 +125,157 @@ def load_case_bank(path: str):
     return df
 
 
+def load_case_bank(path: str):
+    pd = _require_pandas()
+    suffix = Path(path).suffix.lower()
+    if suffix in {".jsonl", ".json"}:
+        df = pd.read_json(path, lines=suffix == ".jsonl")
+    else:
+        df = pd.read_parquet(path)
+    if "case_id" in df.columns and df["case_id"].duplicated().any():
+        # Upserts through case_store append a new line per replaced case: keep
+        # the last line, at the position of the first.
+        order = {case_id: i for i, case_id in enumerate(pd.unique(df["case_id"]))}
+        df = df.drop_duplicates("case_id", keep="last")
+        df = df.iloc[df["case_id"].map(order).argsort()].reset_index(drop=True)
+    return _normalize_frame(df)
+
+
+# Light, flat columns used for filtering and scheduling; the heavy code blobs
+# (initial_code, acceptance_criteria, ...) are only decoded for selected cases.
+INDEX_COLUMNS = {
+    "case_id": ("case_id",),
+    "level1": ("vcfcst_category", "level1"),
+    "level2": ("vcfcst_category", "level2"),
+    "level3_id": ("vcfcst_category", "level3_id"),
+    "difficulty": ("difficulty",),
+    "case_type": ("case_type",),
+}
+
+
+def jsonl_cache_path(path: str, cache_dir: str) -> Path:
+    # One file per bank (by absolute path) under the caller's cache dir.
+    digest = hashlib.sha256(str(Path(path).resolve()).encode("utf-8")).hexdigest()[:16]
+    return Path(cache_dir) / f"{Path(path).stem}-{digest}.parquet"
+
+
+def _jsonl_dataset(path: str, cache_dir: str = ""):
+    # JSON has no footer or row groups to skip, and a JSONL bank cannot be read
+    # block by block (each case's initial_code has its own keys, so the schema
+    # is only known after the last line), so the whole file is materialized.
+    # With a cache_dir the table is also written there as parquet, tagged with
+    # the JSONL's size and mtime, and later scans read that file so filters and
+    # column projection apply; the conversion is redone only after the JSONL
+    # changes (e.g. a case_store upsert). Nothing is written next to the bank.
+    # If the cache cannot be written the in-memory table is scanned.
+    pa, _, ds = _require_pyarrow()
+    import pyarrow.json as pj  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+
+    if not cache_dir:
+        return ds.dataset(pj.read_json(path))
+    st = Path(path).stat()
+    stamp = json.dumps([st.st_size, st.st_mtime_ns]).encode("utf-8")
+    cache = jsonl_cache_path(path, cache_dir)
+    try:
+        if (pq.read_schema(cache).metadata or {}).get(b"source_stamp") == stamp:
+            return ds.dataset(str(cache), format="parquet")
+    except (OSError, ValueError, pa.ArrowException):
+        pass
+    table = pj.read_json(path)
+    table = table.replace_schema_metadata({b"source_stamp": stamp})
+    tmp = cache.with_name(f"{cache.name}.{os.getpid()}.tmp")
+    try:
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        pq.write_table(table, tmp)
+        os.replace(tmp, cache)
+    except (OSError, pa.ArrowException):
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        return ds.dataset(table)
+    return ds.dataset(str(cache), format="parquet")
+
+
+def open_case_dataset(path: str, cache_dir: str = ""):
+    pa, _, ds = _require_pyarrow()
+    suffix = Path(path).suffix.lower()
+    if suffix == ".jsonl":
+        return _jsonl_dataset(path, cache_dir)
+    if suffix == ".json":
+        pd = _require_pandas()
+        return ds.dataset(pa.Table.from_pandas(pd.read_json(path), preserve_index=False))
+    return ds.dataset(path, format="parquet")
+
+
+def _case_filter(
+    category_id: str = "",
+    difficulty: str = "",
+    case_ids: Optional[List[str]] = None,
+    level3_id=("vcfcst_category", "level3_id"),
+):
+    _, pc, _ = _require_pyarrow()
+    expr = None
+    if category_id:
+        expr = pc.field(*level3_id) == category_id
+    if difficulty:
+        cond = pc.field("difficulty") == difficulty
+        expr = cond if expr is None else expr & cond
+    if case_ids:
+        cond = pc.field("case_id").isin(list(case_ids))
+        expr = cond if expr is None else expr & cond
+    return expr
+
+
+def scan_case_index(
+    path_or_dataset, category_id: str = "", difficulty: str = "", case_ids: Optional[List[str]] = None, limit: int = 0
+):
+    _, pc, _ = _require_pyarrow()
+    dataset = open_case_dataset(path_or_dataset) if isinstance(path_or_dataset, str) else path_or_dataset
+    columns = {name: pc.field(*ref) for name, ref in INDEX_COLUMNS.items()}
+    ids = dataset.to_table(columns=["case_id"]).column("case_id").to_pylist()
+    last = {case_id: i for i, case_id in enumerate(ids)}
+    if len(last) == len(ids):
+        index = dataset.to_table(columns=columns, filter=_case_filter(category_id, difficulty, case_ids))
+    else:
+        # Upserts through case_store append a new line per replaced case: keep
+        # the last line, at the position of the first (dict keys keep first
+        # insertion order), and only then filter, so neither a stale line nor
+        # the position of one the filter drops leaks into the result.
+        index = dataset.to_table(columns=columns).take(list(last.values()))
+        expr = _case_filter(category_id, difficulty, case_ids, level3_id=("level3_id",))
+        if expr is not None:
+            index = index.filter(expr)
+    if limit > 0:
+        index = index.slice(0, limit)
+    return index
+
+
+def scan_case_bank(
+    path: str,
+    category_id: str = "",
+    difficulty: str = "",
+    case_ids: Optional[List[str]] = None,
+    limit: int = 0,
+    cache_dir: str = "",
+):
+    # Same result as load_case_bank + filter_cases + head(limit), but the filters
+    # are pushed down into the arrow scan and only the selected rows are decoded
+    # (for a JSONL bank, only with a cache_dir: see _jsonl_dataset).
+    _, pc, _ = _require_pyarrow()
+    dataset = open_case_dataset(path, cache_dir)
+    index = scan_case_index(dataset, category_id, difficulty, case_ids, limit)
+    selected = index.column("case_id").to_pylist()
+    if not selected:
+        return _normalize_frame(dataset.schema.empty_table().to_pandas())
+    table = dataset.to_table(filter=pc.field("case_id").isin(selected))
+    df = table.to_pandas().drop_duplicates("case_id", keep="last")
+    order = {case_id: i for i, case_id in enumerate(selected)}
+    df = df.iloc[df["case_id"].map(order).argsort()].reset_index(drop=True)
+    return _normalize_frame(df)
+
+
 def save_case_bank(df, path: str) -> None:
     pd = _require_pandas()
     Path(path).parent.mkdir(parents=True, exist_ok=True)
@@ -113,7 +285,7 @@ def save_case_bank(df, path: str) -> None:
 def filter_cases(df, category_id: str = "", difficulty: str = "", case_ids: Optional[List[str]] = None):
     filtered = df
     if category_id:
-        filtered = filtered[filtered["vcfcst_category"].apply(lambda c: c.get("level3_id") == category_id)]
+        filtered = filtered[filtered["vcfcst_category"].str.get("level3_id") == category_id]
     if difficulty:
         filtered = filtered[filtered["difficulty"] == difficulty]
     if case_ids:
@@ -132,8 +304,7 @@ if __name__ == "__main__":
     ap.add_argument("--out", default="", help="Write filtered parquet")
     args = ap.parse_args()
 
-    df = load_case_bank(args.input)
-    df = filter_cases(df, args.category_id, args.difficulty, args.case_id or None)
+    df = scan_case_bank(args.input, args.category_id, args.difficulty, args.case_id or None)
     if args.out:
         save_case_bank(df, args.out)
     else:
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class CaseStore:
+    # Append-only JSONL case bank with a persistent sidecar index.
+    #
+    # An upsert appends the case as a new line and appends one entry to
+    # "<bank>.idx" (case_id, level3_id, offset, length and the bank's mtime_ns
+    # after the write), so adding or replacing a case costs O(1) regardless of
+    # bank size. The index is trusted only while its last entry still matches
+    # the bank's size and mtime; a bank rewritten by other tools is reindexed. A replaced case leaves its old line
+    # behind; readers keep the last line per case_id, at the position of its
+    # first line (so edits do not reorder the bank or change what --limit
+    # selects), and compact() (triggered automatically once dead bytes outweigh
+    # live ones) rewrites the file in that order.
+    def __init__(self, path: str, auto_compact: bool = True):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + ".idx")
+        self.auto_compact = auto_compact
+        self._lock = threading.Lock()
+        self._offsets: Dict[str, List[int]] = {}
+        self._level3: Dict[str, str] = {}
+        self._categories: Dict[str, List[str]] = {}
+        self._live_bytes = 0
+        self._dead_bytes = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __contains__(self, case_id: str) -> bool:
+        return case_id in self._offsets
+
+    def _record(self, case_id: str, level3_id: str, offset: int, length: int) -> None:
+        old = self._offsets.get(case_id)
+        if old is not None:
+            self._dead_bytes += old[1]
+            self._live_bytes -= old[1]
+            old_level3 = self._level3[case_id]
+            if old_level3 != level3_id:
+                # Moved to another category: drop it from the old one.
+                self._categories[old_level3].remove(case_id)
+                if not self._categories[old_level3]:
+                    del self._categories[old_level3]
+        self._offsets[case_id] = [offset, length]
+        self._level3[case_id] = level3_id
+        self._live_bytes += length
+        ids = self._categories.setdefault(level3_id, [])
+        if case_id not in ids:
+            ids.append(case_id)
+
+    def _reset(self) -> None:
+        self._offsets = {}
+        self._level3 = {}
+        self._categories = {}
+        self._live_bytes = 0
+        self._dead_bytes = 0
+
+    def _load_index(self) -> None:
+        st = self.path.stat() if self.path.exists() else None
+        size = st.st_size if st else 0
+        end = 0
+        stamp = None
+        if self.index_path.exists():
+            with self.index_path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    self._record(entry["case_id"], entry.get("level3_id", ""), entry["offset"], entry["length"])
+                    end = entry["offset"] + entry["length"]
+                    stamp = entry.get("bank_mtime_ns")
+        if end != size or (size and stamp != st.st_mtime_ns):
+            # The bank was written without the index, rewritten by another tool
+            # (even to the same size), or a write was cut short.
+            self.reindex()
+
+    def reindex(self) -> None:
+        with self._lock:
+            self._reset()
+            entries = []
+            if self.path.exists():
+                with self.path.open("rb") as f:
+                    offset = 0
+                    for raw in f:
+                        if raw.strip():
+                            case = json.loads(raw)
+                            level3_id = (case.get("vcfcst_category") or {}).get("level3_id", "")
+                            self._record(case["case_id"], level3_id, offset, len(raw))
+                            entries.append(
+                                {"case_id": case["case_id"], "level3_id": level3_id, "offset": offset, "length": len(raw)}
+                            )
+                        offset += len(raw)
+                    if entries:
+                        entries[-1]["bank_mtime_ns"] = os.fstat(f.fileno()).st_mtime_ns
+            tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            tmp.replace(self.index_path)
+
+    def upsert(self, case: Dict[str, Any]) -> None:
+        case_id = case["case_id"]
+        level3_id = (case.get("vcfcst_category") or {}).get("level3_id", "")
+        raw = (json.dumps(case, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            with self.path.open("ab") as f:
+                offset = f.tell()
+                f.write(raw)
+                f.flush()
+                os.fsync(f.fileno())
+                mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+            entry = {
+                "case_id": case_id,
+                "level3_id": level3_id,
+                "offset": offset,
+                "length": len(raw),
+                "bank_mtime_ns": mtime_ns,
+            }
+            with self.index_path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._record(case_id, level3_id, offset, len(raw))
+            needs_compact = self.auto_compact and self._dead_bytes > max(self._live_bytes, 1 << 20)
+        if needs_compact:
+            self.compact()
+
+    def get(self, case_id: str) -> Optional[Dict[str, Any]]:
+        loc = self._offsets.get(case_id)
+        if loc is None:
+            return None
+        with self.path.open("rb") as f:
+            f.seek(loc[0])
+            return json.loads(f.read(loc[1]))
+
+    def case_ids(self, level3_id: str = "") -> List[str]:
+        if level3_id:
+            return list(self._categories.get(level3_id, []))
+        return list(self._offsets)
+
+    def iter_cases(self) -> Iterator[Dict[str, Any]]:
+        # Live cases in bank order: where each case_id first appeared, so a
+        # replaced case keeps its place (case_bank readers of the JSONL agree).
+        locs = list(self._offsets.values())
+        with self.path.open("rb") as f:
+            for offset, length in locs:
+                f.seek(offset)
+                yield json.loads(f.read(length))
+
+    def compact(self) -> None:
+        with self._lock:
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            locs = list(self._offsets.values())
+            with self.path.open("rb") as src, tmp.open("wb") as dst:
+                for offset, length in locs:
+                    src.seek(offset)
+                    dst.write(src.read(length))
+                dst.flush()
+                os.fsync(dst.fileno())
+            tmp.replace(self.path)
+        self.reindex()
+
+    def export_parquet(self, path: str) -> None:
+        import pandas as pd  # type: ignore
+
+        out = Path(path)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        pd.DataFrame(list(self.iter_cases())).to_parquet(out, index=False)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="VC-FCST indexed case bank store")
+    ap.add_argument("--bank", default="datasets/case_bank.jsonl")
+    sub = ap.add_subparsers(dest="command", required=True)
+    get = sub.add_parser("get", help="Print one case by case_id")
+    get.add_argument("case_id")
+    ls = sub.add_parser("ls", help="List case ids, optionally for one level3_id")
+    ls.add_argument("--category-id", default="")
+    sub.add_parser("reindex", help="Rebuild the index from the bank")
+    sub.add_parser("compact", help="Drop replaced lines from the bank")
+    export = sub.add_parser("export", help="Write the live cases to parquet")
+    export.add_argument("--out-parquet", default="datasets/case_bank.parquet")
+    args = ap.parse_args()
+
+    store = CaseStore(args.bank)
+    if args.command == "get":
+        case = store.get(args.case_id)
+        if case is None:
+            raise SystemExit(f"case not found: {args.case_id}")
+        print(json.dumps(case, ensure_ascii=False, indent=2))
+    elif args.command == "ls":
+        for case_id in store.case_ids(args.category_id):
+            print(case_id)
+    elif args.command == "reindex":
+        store.reindex()
+        print("cases", len(store))
+    elif args.command == "compact":
+        store.compact()
+        print("cases", len(store))
+    elif args.command == "export":
+        store.export_parquet(args.out_parquet)
+        print("cases", len(store))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# Warm containers for Docker-isolated tests. Isolation between the cases that
+# share a container: before every command /workspace, /tmp, /var/tmp and $HOME
+# are reset ($HOME from a copy taken once the dependencies are installed).
+# After the command, `docker diff` is compared with its state at that point; a
+# container with new changes anywhere else (a package installed into
+# site-packages, a file dropped in /etc or /usr) is removed, not reused. Writes
+# to a file that was already changed while installing the dependencies, and
+# state outside the filesystem (processes that outlive the command are only
+# caught when it times out), are not detected.
+import asyncio
+import shlex
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from async_exec import run_process
+
+PoolKey = Tuple[str, Tuple[str, ...]]
+# Reset before every command, so their changes do not make a container dirty.
+SCRATCH_DIRS = ("/workspace", "/tmp", "/var/tmp")
+HOME_SNAPSHOT = "/var/lib/vcfcst-home"
+
+
+def pool_key(image: str, requirements: Iterable[str]) -> PoolKey:
+    reqs = {r.strip() for r in requirements if r.strip() and not r.strip().startswith("#")}
+    return image, tuple(sorted(reqs))
+
+
+async def _docker(*args: str) -> str:
+    proc = await asyncio.create_subprocess_exec(
+        "docker",
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    out, err = await proc.communicate()
+    if proc.returncode != 0:
+        raise RuntimeError(f"docker {args[0]} failed: {err.decode('utf-8', errors='ignore').strip()}")
+    return out.decode("utf-8", errors="ignore").strip()
+
+
+class ContainerPool:
+    # Long-lived containers keyed by (base_image, requirements). Each container
+    # installs its dependencies once with networking, is then detached from every
+    # network, and is reused across cases: the scratch dirs are reset and the
+    # workspace copied in before each command instead of starting a fresh
+    # container, and a container left dirty is replaced (see the module header).
+    def __init__(self, max_idle_per_key: int = 4, with_semgrep: bool = False, cpus: str = "1", memory: str = "2g"):
+        self.max_idle_per_key = max_idle_per_key
+        self.with_semgrep = with_semgrep
+        self.cpus = cpus
+        self.memory = memory
+        self._idle: Dict[PoolKey, List[str]] = {}
+        self._all: Dict[str, PoolKey] = {}
+        # container id -> ($HOME, docker diff paths after the dependency install)
+        self._clean: Dict[str, Tuple[str, Set[str]]] = {}
+
+    async def _start(self, key: PoolKey) -> str:
+        image, requirements = key
+        cid = await _docker(
+            "run",
+            "-d",
+            "--cpus",
+            self.cpus,
+            "--memory",
+            self.memory,
+            "-w",
+            "/workspace",
+            image,
+            "sleep",
+            "infinity",
+        )
+        self._all[cid] = key
+        try:
+            packages = list(requirements) + (["semgrep"] if self.with_semgrep else [])
+            if packages:
+                await _docker("exec", cid, "pip", "install", "--no-cache-dir", "-q", *packages)
+            networks = await _docker(
+                "inspect", "-f", "{{range $k, $v := .NetworkSettings.Networks}}{{$k}} {{end}}", cid
+            )
+            for network in networks.split():
+                await _docker("network", "disconnect", "-f", network, cid)
+            home = await _docker("exec", cid, "sh", "-c", 'echo "$HOME"') or "/root"
+            await _docker("exec", cid, "sh", "-c", f'rm -rf {HOME_SNAPSHOT} && cp -a "$HOME" {HOME_SNAPSHOT}')
+            self._clean[cid] = (home, await self._changes(cid, home))
+        except Exception:
+            await self._discard(cid)
+            raise
+        return cid
+
+    async def _discard(self, cid: str) -> None:
+        self._all.pop(cid, None)
+        self._clean.pop(cid, None)
+        try:
+            await _docker("rm", "-f", cid)
+        except RuntimeError:
+            pass
+
+    async def prewarm(self, counts: Dict[PoolKey, int]) -> None:
+        jobs = []
+        for key, count in counts.items():
+            for _ in range(min(count, self.max_idle_per_key)):
+                jobs.append(self._start(key))
+        for cid in await asyncio.gather(*jobs):
+            self._idle.setdefault(self._all[cid], []).append(cid)
+
+    async def acquire(self, key: PoolKey) -> str:
+        idle = self._idle.get(key)
+        if idle:
+            return idle.pop()
+        return await self._start(key)
+
+    async def release(self, cid: str, healthy: bool = True) -> None:
+        key = self._all.get(cid)
+        if key is None:
+            return
+        idle = self._idle.setdefault(key, [])
+        if healthy and len(idle) < self.max_idle_per_key:
+            idle.append(cid)
+        else:
+            await self._discard(cid)
+
+    async def _changes(self, cid: str, home: str) -> Set[str]:
+        # Paths docker diff reports ("A /path", "C /path", "D /path"), minus the
+        # dirs reset before every command and their parents.
+        roots = SCRATCH_DIRS + (home,)
+        changes = set()
+        for line in (await _docker("diff", cid)).splitlines():
+            path = line[2:].strip()
+            if any(path == root or path.startswith(root + "/") or root.startswith(path + "/") for root in roots):
+                continue
+            changes.add(line.strip())
+        return changes
+
+    async def _is_dirty(self, cid: str) -> bool:
+        home, clean = self._clean[cid]
+        try:
+            return bool(await self._changes(cid, home) - clean)
+        except RuntimeError:
+            return True
+
+    async def _reset_workspace(self, cid: str, workspace: Path) -> None:
+        home, _ = self._clean[cid]
+        reset = "rm -rf /workspace /tmp/* /tmp/.[!.]* /var/tmp/* /var/tmp/.[!.]* && mkdir -p /workspace"
+        if home != "/":
+            reset += f" && rm -rf {shlex.quote(home)} && cp -a {HOME_SNAPSHOT} {shlex.quote(home)}"
+        await _docker("exec", cid, "sh", "-c", reset)
+        await _docker("cp", f"{workspace}/.", f"{cid}:/workspace")
+
+    async def run(
+        self,
+        key: PoolKey,
+        workspace: Path,
+        cmd: str,
+        stdout_path: Path,
+        stderr_path: Path,
+        timeout: int,
+        copy_out: Optional[Dict[str, Path]] = None,
+    ) -> Tuple[Dict[str, Any], float]:
+        # copy_out maps container paths to host paths fetched after the command
+        # (e.g. a junit report); missing files are skipped.
+        t0 = time.perf_counter()
+        cid = await self.acquire(key)
+        healthy = False
+        try:
+            await self._reset_workspace(cid, workspace)
+            startup_sec = round(time.perf_counter() - t0, 3)
+            stats = await run_process(
+                ["docker", "exec", "-w", "/workspace", cid, "/bin/bash", "-lc", cmd],
+                str(workspace),
+                stdout_path,
+                stderr_path,
+                timeout=timeout,
+            )
+            for src, dst in (copy_out or {}).items():
+                try:
+                    await _docker("cp", f"{cid}:{src}", str(dst))
+                except RuntimeError:
+                    pass
+            # A timed-out exec may leave processes running inside the container.
+            healthy = not stats["timed_out"] and not await self._is_dirty(cid)
+            return stats, startup_sec
+        finally:
+            await self.release(cid, healthy=healthy)
+
+    async def close(self) -> None:
+        self._idle.clear()
+        await asyncio.gather(*(self._discard(cid) for cid in list(self._all)))
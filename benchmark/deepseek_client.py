@@ -1,8 +1,17 @@
 #!/usr/bin/env python3
+import asyncio
+import http.client
 import json
 import os
-import urllib.request
+import queue
+import random
+import threading
+import time
 from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from llm_cache import LLMCache, cache_key
 
 
 ENV_PATH = Path(__file__).resolve().parents[1] / ".env"
@@ -26,37 +35,229 @@ def _env(key, default=""):
     return os.environ.get(key, default)
 
 
+class ChatError(RuntimeError):
+    def __init__(self, message: str, status: Optional[int] = None, headers: Any = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers if headers is not None else {}
+
+
+# Transport failures worth another attempt: refused/reset/aborted connections,
+# timeouts and broken HTTP exchanges. Other OSErrors (bad certificates, file
+# descriptor limits, ...) will not go away by retrying and are raised as is.
+_RETRYABLE_ERRORS = (http.client.HTTPException, ConnectionError, TimeoutError)
+
+
+class DeepSeekClient:
+    # Reusable chat client: configuration is resolved once, HTTP(S) connections
+    # are kept alive in a small pool and shared across threads, and 429/5xx or
+    # connection failures are retried with jittered exponential backoff.
+    def __init__(
+        self,
+        api_key: str = "",
+        api_base: str = "https://api.deepseek.com",
+        model: str = "deepseek-reasoner",
+        timeout: float = 60,
+        max_retries: int = 3,
+        backoff_sec: float = 1.0,
+        max_backoff_sec: float = 60.0,
+        pool_size: int = 8,
+        cache: Optional[LLMCache] = None,
+    ):
+        self.api_key = api_key
+        self.cache = cache
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_sec = backoff_sec
+        self.max_backoff_sec = max_backoff_sec
+        parts = urlsplit(api_base.rstrip("/"))
+        self._scheme = parts.scheme or "https"
+        self._netloc = parts.netloc
+        self._path = parts.path.rstrip("/") + "/v1/chat/completions"
+        self._pool: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue(maxsize=pool_size)
+
+    @classmethod
+    def from_env(cls, env_path: Path = ENV_PATH, **kwargs: Any) -> "DeepSeekClient":
+        _load_dotenv(env_path)
+        return cls(
+            api_key=_env("API_KEY"),
+            api_base=_env("API_BASE", "https://api.deepseek.com"),
+            model=_env("MODEL_NAME", "deepseek-reasoner"),
+            **kwargs,
+        )
+
+    def _connect(self, fresh: bool = False) -> http.client.HTTPConnection:
+        if not fresh:
+            try:
+                return self._pool.get_nowait()
+            except queue.Empty:
+                pass
+        if self._scheme == "http":
+            return http.client.HTTPConnection(self._netloc, timeout=self.timeout)
+        return http.client.HTTPSConnection(self._netloc, timeout=self.timeout)
+
+    def _release(self, conn: http.client.HTTPConnection) -> None:
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _send(self, conn: http.client.HTTPConnection, body: bytes):
+        try:
+            conn.request(
+                "POST",
+                self._path,
+                body=body,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                },
+            )
+            resp = conn.getresponse()
+            return resp, resp.read()
+        except BaseException:
+            conn.close()
+            raise
+
+    def _post(self, body: bytes) -> Dict[str, Any]:
+        conn = self._connect()
+        try:
+            resp, data = self._send(conn, body)
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            # A pooled keep-alive connection the server already closed; retry
+            # once on a fresh connection without counting it as a failure.
+            conn = self._connect(fresh=True)
+            resp, data = self._send(conn, body)
+        if resp.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+        if resp.status >= 400:
+            raise ChatError(
+                f"HTTP {resp.status}: {data[:500].decode('utf-8', errors='ignore')}",
+                status=resp.status,
+                headers=resp.headers,
+            )
+        return json.loads(data.decode("utf-8"))
+
+    def _delay(self, attempt: int, exc: BaseException) -> float:
+        # Retry-After if the server sent one, else exponential backoff; either way
+        # capped at max_backoff_sec (a worker thread sleeps through it) and jittered.
+        delay = self.backoff_sec * (2**attempt)
+        retry_after = exc.headers.get("Retry-After") if isinstance(exc, ChatError) else None
+        try:
+            if retry_after is not None:
+                delay = float(retry_after)
+        except ValueError:
+            pass
+        return min(self.max_backoff_sec, delay) * (0.5 + random.random())
+
+    def chat_complete(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.2,
+        max_tokens: int = 2048,
+    ) -> str:
+        model_name = model or self.model
+        key = None
+        if self.cache is not None:
+            key = cache_key(model_name, messages, temperature, max_tokens)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        if not self.api_key:
+            raise RuntimeError("API_KEY is not set")
+        payload = {
+            "model": model_name,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        body = json.dumps(payload).encode("utf-8")
+        attempt = 0
+        while True:
+            try:
+                result = self._post(body)
+                break
+            except ChatError as exc:
+                retryable = exc.status == 429 or (exc.status or 0) >= 500
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                time.sleep(self._delay(attempt, exc))
+            except _RETRYABLE_ERRORS as exc:
+                if attempt >= self.max_retries:
+                    raise ChatError(f"request failed: {exc}") from exc
+                time.sleep(self._delay(attempt, exc))
+            attempt += 1
+        choices = result.get("choices") or []
+        if not choices:
+            raise RuntimeError("no choices returned")
+        text = choices[0].get("message", {}).get("content", "")
+        if key is not None and (text or "").strip():
+            self.cache.put(key, text, {"model": model_name})
+        return text
+
+    def forget(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.2,
+        max_tokens: int = 2048,
+    ) -> None:
+        # Drop a cached response the caller rejected (e.g. it failed validation)
+        # so the next attempt goes back to the model.
+        if self.cache is not None:
+            self.cache.discard(cache_key(model or self.model, messages, temperature, max_tokens))
+
+    async def achat_complete(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.2,
+        max_tokens: int = 2048,
+    ) -> str:
+        # The pool is thread-safe, so concurrent awaits each borrow a connection.
+        return await asyncio.to_thread(self.chat_complete, messages, model, temperature, max_tokens)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_default_client: Optional[DeepSeekClient] = None
+_default_lock = threading.Lock()
+
+
+def get_client() -> DeepSeekClient:
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = DeepSeekClient.from_env()
+        return _default_client
+
+
+def set_cache(cache: Optional[LLMCache]) -> None:
+    get_client().cache = cache
+
+
+def set_max_retries(max_retries: int) -> None:
+    # 0 for callers that retry themselves (gen_scheduler), so errors are not
+    # retried twice over.
+    get_client().max_retries = max(0, max_retries)
+
+
+def forget(messages, model=None, temperature=0.2, max_tokens=2048):
+    get_client().forget(messages, model=model, temperature=temperature, max_tokens=max_tokens)
+
+
 def chat_complete(messages, model=None, temperature=0.2, max_tokens=2048):
-    _load_dotenv()
-    api_key = _env("API_KEY")
-    api_base = _env("API_BASE", "https://api.deepseek.com")
-    model_name = model or _env("MODEL_NAME", "deepseek-reasoner")
-
-    if not api_key:
-        raise RuntimeError("API_KEY is not set")
-
-    url = api_base.rstrip("/") + "/v1/chat/completions"
-    payload = {
-        "model": model_name,
-        "messages": messages,
-        "temperature": temperature,
-        "max_tokens": max_tokens,
-    }
-    data = json.dumps(payload).encode("utf-8")
-
-    req = urllib.request.Request(
-        url,
-        data=data,
-        headers={
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        },
-        method="POST",
-    )
-    with urllib.request.urlopen(req, timeout=60) as resp:
-        body = resp.read().decode("utf-8")
-    result = json.loads(body)
-    choices = result.get("choices") or []
-    if not choices:
-        raise RuntimeError("no choices returned")
-    return choices[0].get("message", {}).get("content", "")
+    return get_client().chat_complete(messages, model=model, temperature=temperature, max_tokens=max_tokens)
+
+
+async def achat_complete(messages, model=None, temperature=0.2, max_tokens=2048):
+    return await get_client().achat_complete(messages, model=model, temperature=temperature, max_tokens=max_tokens)
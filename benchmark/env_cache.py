@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import json
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from case_bank import _listify
+
+DEFAULT_CACHE_DIR = "runs/env_cache"
+IMAGE_REPO = "vcfcst-env"
+
+
+class PythonVersionMismatch(RuntimeError):
+    pass
+
+
+def base_python_version(base_image: str) -> Optional[str]:
+    # "python:3.10-slim" -> "3.10"; None for images that do not pin a python.
+    match = re.match(r"^(?:docker\.io/)?(?:library/)?python:(\d+\.\d+)", base_image)
+    return match.group(1) if match else None
+
+
+def python_for(base_image: str) -> Tuple[str, str]:
+    # Host interpreter matching the base image's python: sys.executable when the
+    # versions agree, else pythonX.Y from PATH. Images without a python version
+    # use the host interpreter.
+    host = f"{sys.version_info[0]}.{sys.version_info[1]}"
+    version = base_python_version(base_image)
+    if version is None or version == host:
+        return sys.executable, host
+    python = shutil.which(f"python{version}")
+    if python is None:
+        raise PythonVersionMismatch(f"{base_image} needs python{version}, not found on PATH (host is {host})")
+    return python, version
+
+
+def merge_requirements(existing: str, deps: List[str]) -> List[str]:
+    merged = existing.strip().splitlines() if existing.strip() else []
+    for dep in deps:
+        if dep not in merged:
+            merged.append(dep)
+    return merged
+
+
+def case_requirements(case: Dict[str, Any]) -> List[str]:
+    existing = (case.get("initial_code") or {}).get("requirements.txt") or ""
+    merged = merge_requirements(existing, _listify((case.get("env_config") or {}).get("dependencies")))
+    return sorted({r.strip() for r in merged if r.strip() and not r.strip().startswith("#")})
+
+
+def env_hash(base_image: str, requirements: Iterable[str]) -> str:
+    payload = json.dumps(
+        {"base_image": base_image, "dependencies": sorted(set(requirements))},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def case_env_hash(case: Dict[str, Any]) -> str:
+    return env_hash(case["env_config"]["base_image"], case_requirements(case))
+
+
+class EnvCache:
+    # Content-addressed cache of prepared dependency environments. Every unique
+    # (base_image, sorted requirements) is built once, either as a derived docker
+    # image tagged vcfcst-env:<hash> or as a host venv, and then reused offline.
+    # Venvs are created with the base image's python version (see python_for);
+    # venv_for raises PythonVersionMismatch when no such interpreter is installed.
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, with_semgrep: bool = False):
+        self.root = Path(root).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.with_semgrep = with_semgrep
+        self.index_path = self.root / "index.json"
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict[str, Any]] = {}
+        if self.index_path.exists():
+            self._index = json.loads(self.index_path.read_text(encoding="utf-8"))
+
+    def _save_index(self) -> None:
+        tmp = self.index_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(self._index, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(self.index_path)
+
+    def _touch(self, digest: str, base_image: str, requirements: List[str], **fields: Any) -> None:
+        with self._lock:
+            entry = self._index.setdefault(
+                digest,
+                {"base_image": base_image, "dependencies": requirements, "created_at": time.time()},
+            )
+            entry.update(fields)
+            entry["last_used_at"] = time.time()
+            self._save_index()
+
+    def _packages(self, requirements: List[str]) -> List[str]:
+        packages = list(requirements)
+        if not any(r.lower().startswith("pytest") for r in packages):
+            packages.append("pytest")
+        if self.with_semgrep:
+            packages.append("semgrep")
+        return packages
+
+    def image_for(self, base_image: str, requirements: List[str]) -> str:
+        digest = env_hash(base_image, requirements)
+        field = "image_semgrep" if self.with_semgrep else "image"
+        tag = f"{IMAGE_REPO}:{digest}" + ("-semgrep" if self.with_semgrep else "")
+        probe = subprocess.run(["docker", "image", "inspect", tag], capture_output=True)
+        if probe.returncode != 0:
+            dockerfile = f"FROM {base_image}\n"
+            packages = self._packages(requirements)
+            dockerfile += "RUN pip install --no-cache-dir " + " ".join(json.dumps(p) for p in packages) + "\n"
+            log_path = self.root / f"image-{digest}.log"
+            with log_path.open("w", encoding="utf-8") as log:
+                proc = subprocess.run(
+                    ["docker", "build", "-t", tag, "-"],
+                    input=dockerfile,
+                    text=True,
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                )
+            if proc.returncode != 0:
+                raise RuntimeError(f"failed to build {tag}, see {log_path}")
+        self._touch(digest, base_image, requirements, **{field: tag})
+        return tag
+
+    def venv_for(self, base_image: str, requirements: List[str]) -> Path:
+        digest = env_hash(base_image, requirements)
+        interpreter, version = python_for(base_image)
+        py_tag = f"py{version}"
+        venv_dir = self.root / "venvs" / f"{digest}-{py_tag}"
+        python = venv_dir / "bin" / "python"
+        ready = venv_dir / ".ready"
+        if not ready.exists():
+            if venv_dir.exists():
+                shutil.rmtree(venv_dir)
+            subprocess.run([interpreter, "-m", "venv", str(venv_dir)], check=True)
+            log_path = self.root / f"venv-{digest}-{py_tag}.log"
+            with log_path.open("w", encoding="utf-8") as log:
+                proc = subprocess.run(
+                    [str(python), "-m", "pip", "install", "--no-cache-dir", "-q", *self._packages(requirements)],
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                )
+            if proc.returncode != 0:
+                shutil.rmtree(venv_dir, ignore_errors=True)
+                raise RuntimeError(f"failed to build venv {digest}, see {log_path}")
+            ready.write_text(time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), encoding="utf-8")
+        self._touch(digest, base_image, requirements, **{f"venv_{py_tag}": str(venv_dir)})
+        return python
+
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        return dict(self._index)
+
+    def prune(self, older_than_days: float = 0, keep: Optional[Iterable[str]] = None) -> List[str]:
+        keep_set = set(keep or [])
+        cutoff = time.time() - older_than_days * 86400
+        removed = []
+        with self._lock:
+            for digest, entry in list(self._index.items()):
+                if digest in keep_set:
+                    continue
+                if older_than_days and entry.get("last_used_at", 0) > cutoff:
+                    continue
+                for key, value in entry.items():
+                    if key.startswith("image"):
+                        subprocess.run(["docker", "rmi", "-f", value], capture_output=True)
+                    elif key.startswith("venv_"):
+                        shutil.rmtree(value, ignore_errors=True)
+                del self._index[digest]
+                removed.append(digest)
+            self._save_index()
+        return removed
+
+
+def unique_envs(cases: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    envs: Dict[str, Dict[str, Any]] = {}
+    for case in cases:
+        requirements = case_requirements(case)
+        base_image = case["env_config"]["base_image"]
+        envs.setdefault(env_hash(base_image, requirements), {"base_image": base_image, "requirements": requirements})
+    return envs
+
+
+def main():
+    from case_bank import load_case_bank
+
+    ap = argparse.ArgumentParser(description="VC-FCST dependency environment cache")
+    ap.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    pre = sub.add_parser("prebuild", help="Build environments for every case in a case bank")
+    pre.add_argument("--case-bank", required=True)
+    pre.add_argument("--docker", action="store_true", help="Build derived docker images")
+    pre.add_argument("--venv", action="store_true", help="Build host venvs")
+    pre.add_argument("--with-semgrep", action="store_true")
+
+    sub.add_parser("list", help="List cached environments")
+
+    prune = sub.add_parser("prune", help="Remove cached environments")
+    prune.add_argument("--older-than-days", type=float, default=0, help="Only remove entries unused for N days")
+    prune.add_argument("--keep-case-bank", default="", help="Keep environments used by this case bank")
+    args = ap.parse_args()
+
+    if args.command == "prebuild":
+        cache = EnvCache(args.cache_dir, with_semgrep=args.with_semgrep)
+        cases = [row.to_dict() for _, row in load_case_bank(args.case_bank).iterrows()]
+        envs = unique_envs(cases)
+        print(f"{len(cases)} cases -> {len(envs)} environments")
+        for digest, env in envs.items():
+            if args.docker:
+                print("image", cache.image_for(env["base_image"], env["requirements"]))
+            if args.venv or not args.docker:
+                try:
+                    print("venv", cache.venv_for(env["base_image"], env["requirements"]))
+                except PythonVersionMismatch as exc:
+                    print("skip venv", digest, exc)
+    elif args.command == "list":
+        for digest, entry in EnvCache(args.cache_dir).entries().items():
+            print(digest, entry.get("base_image"), " ".join(entry.get("dependencies", [])))
+    elif args.command == "prune":
+        keep: List[str] = []
+        if args.keep_case_bank:
+            cases = [row.to_dict() for _, row in load_case_bank(args.keep_case_bank).iterrows()]
+            keep = list(unique_envs(cases))
+        removed = EnvCache(args.cache_dir).prune(args.older_than_days, keep)
+        print("removed", len(removed))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
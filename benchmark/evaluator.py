@@ -1,44 +1,273 @@
 #!/usr/bin/env python3
+import asyncio
+import json
+import os
 import re
-import subprocess
 import sys
+import xml.etree.ElementTree as ET
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from async_exec import run_process, run_process_sync
+from pytest_worker import PytestWorkerPool
+
+
+async def run_command_async(
+    cmd: List[str], cwd: str, stdout_path: Path, stderr_path: Path, timeout: int = 600, measure: bool = False
+) -> Dict[str, Any]:
+    return await run_process(cmd, cwd, stdout_path, stderr_path, timeout=timeout, measure=measure)
 
 
 def run_command(cmd: List[str], cwd: str, stdout_path: Path, stderr_path: Path, timeout: int = 600) -> int:
-    with stdout_path.open("w", encoding="utf-8") as out, stderr_path.open("w", encoding="utf-8") as err:
-        proc = subprocess.run(cmd, cwd=cwd, stdout=out, stderr=err, timeout=timeout)
-        return proc.returncode
+    return run_process_sync(cmd, cwd, stdout_path, stderr_path, timeout=timeout)["returncode"]
 
 
-def run_pytest(cwd: str, stdout_path: Path, stderr_path: Path) -> Tuple[int, int]:
-    code = run_command([sys.executable, "-m", "pytest", "-q"], cwd, stdout_path, stderr_path)
-    failed = 0
+# Docker runs write the reports inside the workspace so they can be copied back out;
+# their stdout is mixed with install and stderr output.
+JUNIT_NAME = ".pytest_junit.xml"
+SEMGREP_JSON_NAME = ".semgrep_results.json"
+SLOWEST_TESTS = 5
+
+_JUNIT_OUTCOMES = (("error", "error"), ("failure", "failed"), ("skipped", "skipped"))
+_SUMMARY_COUNT = re.compile(r"(\d+) (passed|failed|skipped|errors?)\b")
+
+
+def _empty_summary() -> Dict[str, Any]:
+    return {"passed": None, "failed": None, "errors": None, "skipped": None, "duration_sec": None, "tests": []}
+
+
+def parse_junit(junit_path: Path) -> Optional[Dict[str, Any]]:
+    # Per-test outcomes and durations from pytest --junitxml. A test that fails
+    # and then errors in teardown counts as both, like pytest's own summary.
     try:
-        text = stderr_path.read_text(encoding="utf-8")
-        m = re.search(r"=+\s+(\d+) failed", text)
-        if m:
-            failed = int(m.group(1))
-    except Exception:
-        failed = 0
-    return code, failed
+        root = ET.parse(str(junit_path)).getroot()
+    except (OSError, ET.ParseError):
+        return None
+    summary = {"passed": 0, "failed": 0, "errors": 0, "skipped": 0, "duration_sec": 0.0, "tests": []}
+    for tc in root.iter("testcase"):
+        tags = {child.tag for child in tc}
+        if "error" in tags:
+            summary["errors"] += 1
+        if "failure" in tags:
+            summary["failed"] += 1
+        if "skipped" in tags:
+            summary["skipped"] += 1
+        outcome = next((o for t, o in _JUNIT_OUTCOMES if t in tags), "passed")
+        if outcome == "passed":
+            summary["passed"] += 1
+        duration = float(tc.get("time") or 0)
+        summary["duration_sec"] += duration
+        classname, name = tc.get("classname") or "", tc.get("name") or ""
+        nodeid = f"{classname}::{name}" if classname else name
+        summary["tests"].append({"nodeid": nodeid, "outcome": outcome, "duration_sec": round(duration, 3)})
+    summary["duration_sec"] = round(summary["duration_sec"], 3)
+    return summary
 
 
-def run_semgrep(cwd: str, rules: List[str], stdout_path: Path, stderr_path: Path) -> Tuple[int, int]:
-    if not rules:
-        return 0, 0
-    rules_path = Path(cwd) / ".semgrep_rules.json"
-    rules_path.write_text("\n".join(rules), encoding="utf-8")
-    code = run_command(["semgrep", "--config", str(rules_path), "--json"], cwd, stdout_path, stderr_path)
-    findings = 0
+def _pytest_stdout_summary(stdout_path: Path) -> Dict[str, Any]:
+    # Fallback when no junit report was written (e.g. a timeout): the counts from
+    # pytest's final "1 failed, 2 passed in 0.1s" line, which goes to stdout.
+    summary = _empty_summary()
     try:
-        import json
+        lines = stdout_path.read_text(encoding="utf-8", errors="ignore").splitlines()
+    except OSError:
+        return summary
+    for line in reversed(lines):
+        counts = _SUMMARY_COUNT.findall(line)
+        if counts and re.search(r"\bin [\d.]+s", line):
+            for n, key in counts:
+                key = "errors" if key.startswith("error") else key
+                summary[key] = int(n)
+            for key in ("passed", "failed", "errors", "skipped"):
+                summary[key] = summary[key] or 0
+            break
+    return summary
+
+
+def pytest_summary(junit_path: Path, stdout_path: Path) -> Dict[str, Any]:
+    return parse_junit(junit_path) or _pytest_stdout_summary(stdout_path)
+
+
+def slowest_tests(summary: Dict[str, Any], n: int = SLOWEST_TESTS) -> List[Dict[str, Any]]:
+    return sorted(summary.get("tests") or [], key=lambda t: t["duration_sec"], reverse=True)[:n]
+
+
+async def run_pytest_async(
+    cwd: str,
+    stdout_path: Path,
+    stderr_path: Path,
+    timeout: int = 600,
+    python: str = sys.executable,
+    junit_path: Optional[Path] = None,
+    workers: Optional[PytestWorkerPool] = None,
+) -> Tuple[int, Dict[str, Any], Dict[str, Any]]:
+    junit_path = junit_path or stdout_path.with_name("pytest.junit.xml")
+    args = ["-q", f"--junitxml={Path(junit_path).resolve()}"]
+    stats = None
+    if workers is not None:
+        try:
+            stats = await workers.run(python, cwd, args, stdout_path, stderr_path, timeout)
+        except Exception:
+            # A crashed or unusable worker; the cold subprocess gives the same result.
+            stats = None
+    if stats is None:
+        stats = await run_command_async(
+            [python, "-m", "pytest"] + args, cwd, stdout_path, stderr_path, timeout, measure=True
+        )
+    return stats["returncode"], pytest_summary(junit_path, stdout_path), stats
+
 
+def run_pytest(cwd: str, stdout_path: Path, stderr_path: Path) -> Tuple[int, int]:
+    code, summary, _ = asyncio.run(run_pytest_async(cwd, stdout_path, stderr_path))
+    return code, summary["failed"] or 0
+
+
+def semgrep_findings_count(stdout_path: Path) -> int:
+    findings = 0
+    try:
         data = json.loads(stdout_path.read_text(encoding="utf-8"))
         findings = len(data.get("results", []))
     except Exception:
         findings = 0
+    return findings
+
+
+async def run_semgrep_async(
+    cwd: str, rules: List[str], stdout_path: Path, stderr_path: Path, timeout: int = 600
+) -> Tuple[int, int, Dict[str, Any]]:
+    if not rules:
+        return 0, 0, {}
+    rules_path = Path(cwd) / ".semgrep_rules.json"
+    rules_path.write_text("\n".join(rules), encoding="utf-8")
+    stats = await run_command_async(
+        ["semgrep", "--config", str(rules_path), "--json"], cwd, stdout_path, stderr_path, timeout, measure=True
+    )
+    return stats["returncode"], semgrep_findings_count(stdout_path), stats
+
+
+class SemgrepBatcher:
+    # Collects static checks from finished cases and runs one semgrep over every
+    # workspace that shares the same rules, instead of paying semgrep's startup
+    # and rule compilation per case. A group is flushed once it holds batch_size
+    # workspaces or linger_sec after its first one arrived. Findings are mapped
+    # back to cases by path; each case's semgrep.stdout.log gets its own subset.
+    #
+    # in_flight() (the number of cases the caller has in flight) lets it flush
+    # every group as soon as all in-flight cases are waiting here: no other case
+    # can arrive to fill a batch, so lingering would only stall the pipeline.
+    # The caller should call poke() when a case leaves without passing through.
+    def __init__(
+        self,
+        work_dir: Path,
+        batch_size: int = 16,
+        linger_sec: float = 2.0,
+        timeout: int = 600,
+        docker_image: str = "",
+        in_flight: Optional[Callable[[], int]] = None,
+    ):
+        self.work_dir = Path(work_dir).resolve()
+        self.batch_size = max(1, batch_size)
+        self.linger_sec = linger_sec
+        self.timeout = timeout
+        self.docker_image = docker_image
+        self.in_flight = in_flight
+        self._pending: Dict[Tuple[str, ...], List[Tuple[Path, Path, asyncio.Future]]] = {}
+        self._timers: Dict[Tuple[str, ...], asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._seq = 0
+
+    async def check(self, workspace: Path, rules: List[str], stdout_path: Path) -> Tuple[int, int, Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        key = tuple(rules)
+        fut = loop.create_future()
+        group = self._pending.setdefault(key, [])
+        group.append((Path(workspace).resolve(), stdout_path, fut))
+        if len(group) >= self.batch_size:
+            self._flush(key)
+        elif self._stalled():
+            self._flush_all()
+        elif len(group) == 1:
+            self._timers[key] = loop.call_later(self.linger_sec, self._flush, key)
+        return await fut
+
+    def _stalled(self) -> bool:
+        if self.in_flight is None:
+            return False
+        waiting = sum(len(group) for group in self._pending.values())
+        return waiting > 0 and waiting >= self.in_flight()
+
+    def _flush_all(self) -> None:
+        for key in list(self._pending):
+            self._flush(key)
+
+    def poke(self) -> None:
+        if self._stalled():
+            self._flush_all()
+
+    def _flush(self, key: Tuple[str, ...]) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        group = self._pending.pop(key, [])
+        if group:
+            task = asyncio.ensure_future(self._run(key, group))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _command(self, rules_path: Path, targets: List[str]) -> List[str]:
+        cmd = ["semgrep", "--config", str(rules_path), "--json", "--metrics", "off"] + targets
+        if not self.docker_image:
+            return cmd
+        # Mounted at the same absolute path so reported paths match the host's.
+        root = os.path.commonpath(targets + [str(self.work_dir)])
+        return ["docker", "run", "--rm", "--network", "none", "-v", f"{root}:{root}:ro", self.docker_image] + cmd
+
+    async def _run(self, key: Tuple[str, ...], group: List[Tuple[Path, Path, asyncio.Future]]) -> None:
+        try:
+            self._seq += 1
+            name = f"batch-{self._seq:04d}"
+            self.work_dir.mkdir(parents=True, exist_ok=True)
+            rules_path = self.work_dir / f"{name}.rules"
+            rules_path.write_text("\n".join(key), encoding="utf-8")
+            stdout_path = self.work_dir / f"{name}.stdout.log"
+            stderr_path = self.work_dir / f"{name}.stderr.log"
+            targets = [str(ws) for ws, _, _ in group]
+            # Usage is the whole batch's; under docker only the client would be
+            # measured, so it is left out.
+            stats = await run_process(
+                self._command(rules_path, targets),
+                str(self.work_dir),
+                stdout_path,
+                stderr_path,
+                timeout=self.timeout,
+                measure=not self.docker_image,
+            )
+            try:
+                results = json.loads(stdout_path.read_text(encoding="utf-8")).get("results", [])
+            except (OSError, ValueError):
+                results = []
+            by_workspace: Dict[str, List[Dict[str, Any]]] = {ws: [] for ws in targets}
+            for item in results:
+                for parent in Path(item.get("path", "")).parents:
+                    if str(parent) in by_workspace:
+                        by_workspace[str(parent)].append(item)
+                        break
+            stats = dict(stats, batch=name, batch_size=len(group))
+            for ws, case_stdout, fut in group:
+                found = by_workspace[str(ws)]
+                case_stdout.write_text(json.dumps({"results": found, "batch": name}), encoding="utf-8")
+                if not fut.done():
+                    fut.set_result((stats["returncode"], len(found), stats))
+        except BaseException as exc:
+            for _, _, fut in group:
+                if not fut.done():
+                    fut.set_exception(exc)
+            if not isinstance(exc, Exception):
+                raise
+
+
+def run_semgrep(cwd: str, rules: List[str], stdout_path: Path, stderr_path: Path) -> Tuple[int, int]:
+    code, findings, _ = asyncio.run(run_semgrep_async(cwd, rules, stdout_path, stderr_path))
     return code, findings
 
 
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# Deterministic stand-in for a code agent, used by bench_harness.py to measure
+# the orchestrator itself. It ignores the prompt and applies the canned patch
+# <patch-dir>/<case_id>.json to its workspace; the case id is the name of the
+# workspace's parent dir (<batch_dir>/<case_id>/workspace). A patch is
+# {"write": {rel_path: content}, "delete": [rel_path]}.
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+
+def apply_patch(workspace: Path, patch: Dict[str, Any]) -> None:
+    for rel_path, content in (patch.get("write") or {}).items():
+        path = workspace / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write + rename, like editors and most agents do.
+        tmp = path.with_name(path.name + ".fake-agent.tmp")
+        tmp.write_text(content, encoding="utf-8")
+        tmp.replace(path)
+    for rel_path in patch.get("delete") or []:
+        try:
+            (workspace / rel_path).unlink()
+        except FileNotFoundError:
+            pass
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Fake agent that applies canned patches")
+    # Positional only: the command is passed through orchestrator --agent-cmd,
+    # which would take dashed options as its own.
+    ap.add_argument("patch_dir", help="Dir of <case_id>.json patches")
+    ap.add_argument("sleep_ms", nargs="?", type=int, default=0, help="Simulated agent think time")
+    args = ap.parse_args()
+
+    sys.stdin.read()
+    workspace = Path.cwd()
+    case_id = workspace.parent.name
+    patch_path = Path(args.patch_dir) / f"{case_id}.json"
+    if args.sleep_ms > 0:
+        time.sleep(args.sleep_ms / 1000)
+    if not patch_path.exists():
+        print(f"no canned patch for {case_id}", file=sys.stderr)
+        return 1
+    patch = json.loads(patch_path.read_text(encoding="utf-8"))
+    apply_patch(workspace, patch)
+    print(json.dumps({"case_id": case_id, "changed": sorted(patch.get("write") or {}) + sorted(patch.get("delete") or [])}))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+class TokenBucket:
+    # Thread-safe token bucket whose refill rate adapts to the server: halved on
+    # 429/5xx (multiplicative decrease), nudged back up on success (additive
+    # increase) but never above the configured rate.
+    def __init__(self, rate: float, burst: int = 1, min_rate: float = 0.05):
+        if rate <= 0:
+            raise ValueError(f"rate must be > 0, got {rate}")
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.min_rate = min(min_rate, rate)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_sec = (1 - self._tokens) / self.rate
+            time.sleep(wait_sec)
+
+    def penalize(self) -> None:
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def reward(self) -> None:
+        with self._lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+
+def http_status(exc: BaseException) -> Optional[int]:
+    # urllib HTTPError has .code, deepseek_client errors .status, litellm .status_code
+    for attr in ("status", "status_code", "code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    headers = getattr(exc, "headers", None)
+    if headers is None:
+        return None
+    try:
+        value = headers.get("Retry-After")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_throttled(exc: BaseException) -> bool:
+    status = http_status(exc)
+    return status is not None and (status == 429 or status >= 500)
+
+
+def call_with_retries(
+    attempt: Callable[[Any], Any],
+    job: Any,
+    bucket: Optional[TokenBucket] = None,
+    max_retries: int = 3,
+    backoff_sec: float = 1.0,
+    max_backoff_sec: float = 60.0,
+) -> Tuple[Any, str]:
+    # Up to max_retries calls of attempt(job), each gated by the bucket; returns
+    # (result, "") or (None, last_error). Throttling errors (429/5xx) shrink the
+    # bucket rate and back off exponentially (or for Retry-After), other errors
+    # wait backoff_sec; every wait is capped at max_backoff_sec and jittered, and
+    # there is none after the last attempt. The client behind attempt should not
+    # retry on its own (deepseek_client.set_max_retries(0)), so every 429 reaches
+    # the bucket and a job costs at most max_retries requests.
+    last_err = ""
+    attempts = max(1, max_retries)
+    for n in range(attempts):
+        if bucket is not None:
+            bucket.acquire()
+        try:
+            result = attempt(job)
+        except Exception as exc:
+            last_err = str(exc) or type(exc).__name__
+            if is_throttled(exc):
+                if bucket is not None:
+                    bucket.penalize()
+                delay = retry_after(exc) or backoff_sec * (2**n)
+            else:
+                delay = backoff_sec
+            if n < attempts - 1:
+                time.sleep(min(max_backoff_sec, delay) * (0.5 + random.random()))
+            continue
+        if bucket is not None:
+            bucket.reward()
+        return result, ""
+    return None, last_err
+
+
+def run_jobs(
+    jobs: Sequence[Any],
+    attempt: Callable[[Any], Any],
+    commit: Callable[[int, Any, Any], None],
+    max_in_flight: int = 4,
+    bucket: Optional[TokenBucket] = None,
+    max_retries: int = 3,
+    backoff_sec: float = 1.0,
+    max_backoff_sec: float = 60.0,
+) -> List[Tuple[Any, str]]:
+    # Runs attempt(job) for every job through call_with_retries with at most
+    # max_in_flight requests in flight. Jobs finish out of order, but
+    # commit(i, job, result) is called from the calling thread strictly in job
+    # order, so the bank ends up identical to a serial run. Failed jobs are
+    # skipped by commit and returned as (job, last_error).
+    def _run(job: Any) -> Tuple[Any, str]:
+        return call_with_retries(attempt, job, bucket, max_retries, backoff_sec, max_backoff_sec)
+
+    failures: List[Tuple[Any, str]] = []
+    done: Dict[int, Tuple[Any, str]] = {}
+    next_commit = 0
+    with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as pool:
+        pending = {pool.submit(_run, job): i for i, job in enumerate(jobs)}
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                done[pending.pop(fut)] = fut.result()
+            while next_commit in done:
+                result, err = done.pop(next_commit)
+                job = jobs[next_commit]
+                if err:
+                    failures.append((job, err))
+                else:
+                    commit(next_commit, job, result)
+                next_commit += 1
+    return failures
@@ -2,20 +2,14 @@
 import argparse
 import json
 import random
-import time
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
+from adapter_llm import compile_template
 from case_bank import load_schema, validate_case
-
-
-def _require_jinja():
-    try:
-        from jinja2 import Template  # type: ignore
-
-        return Template
-    except Exception as exc:
-        raise SystemExit("jinja2 is required: pip install jinja2") from exc
+from case_store import CaseStore
+from gen_scheduler import TokenBucket, run_jobs
+from llm_cache import LLMCache, cache_key
 
 
 def _require_litellm():
@@ -32,20 +26,35 @@ def _load_categories(path: str) -> List[Dict[str, Any]]:
 
 
 def _render_prompt(template_path: str, category: Dict[str, Any]) -> str:
-    Template = _require_jinja()
-    tmpl = Template(Path(template_path).read_text(encoding="utf-8"))
+    tmpl = compile_template(Path(template_path).read_text(encoding="utf-8"))
     return tmpl.render(**category)
 
 
-def _call_llm(model: str, prompt: str, temperature: float, max_tokens: int) -> str:
+def _call_llm(
+    model: str,
+    prompt: str,
+    temperature: float,
+    max_tokens: int,
+    cache: Optional[LLMCache] = None,
+    sample: int = 0,
+) -> Tuple[str, str]:
+    messages = [{"role": "user", "content": prompt}]
+    key = cache_key(model, messages, temperature, max_tokens, sample)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached, key
     litellm = _require_litellm()
     resp = litellm.completion(
         model=model,
-        messages=[{"role": "user", "content": prompt}],
+        messages=messages,
         temperature=temperature,
         max_tokens=max_tokens,
     )
-    return resp["choices"][0]["message"]["content"]
+    text = resp["choices"][0]["message"]["content"]
+    if cache is not None and (text or "").strip():
+        cache.put(key, text, {"model": model})
+    return text, key
 
 
 def _parse_json_strict(text: str) -> Dict[str, Any]:
@@ -104,51 +113,65 @@ def main():
     ap.add_argument("--out-parquet", default="datasets/case_bank.parquet")
     ap.add_argument("--dry-run", action="store_true", help="Generate stub cases without LLM")
     ap.add_argument("--max-retries", type=int, default=3)
+    ap.add_argument("--concurrency", type=int, default=4, help="Max LLM requests in flight")
+    ap.add_argument("--rps", type=float, default=2.0, help="Max LLM requests started per second")
+    ap.add_argument("--llm-cache", default="", help="Cache LLM responses under this dir")
     args = ap.parse_args()
 
+    llm_cache = LLMCache(args.llm_cache) if args.llm_cache else None
+
     schema = load_schema()
     categories = _load_categories(args.categories)
+    # A fresh bank: drop the old file and its index, then write through the
+    # store so the .idx sidecar matches what is written.
     out_jsonl = Path(args.out_jsonl)
-    out_jsonl.parent.mkdir(parents=True, exist_ok=True)
-
-    cases: List[Dict[str, Any]] = []
-    with out_jsonl.open("w", encoding="utf-8") as f:
-        for cat in categories:
-            for i in range(1, args.per_category + 1):
-                if args.dry_run:
-                    case = _make_stub_case(cat, i)
-                    cases.append(case)
-                    f.write(json.dumps(case, ensure_ascii=False) + "\n")
-                    continue
-
-                prompt = _render_prompt(args.template, cat)
-                last_err = ""
-                case = None
-                for _ in range(args.max_retries):
-                    try:
-                        text = _call_llm(args.model, prompt, args.temperature, args.max_tokens)
-                        case = _parse_json_strict(text)
-                        errs = validate_case(case, schema)
-                        if not errs:
-                            break
-                        last_err = "; ".join(errs)
-                        case = None
-                    except Exception as exc:
-                        last_err = str(exc)
-                        case = None
-                    time.sleep(0.5)
-                if case is None:
-                    raise SystemExit(f"failed to generate case for {cat['level3_id']}: {last_err}")
-                cases.append(case)
-                f.write(json.dumps(case, ensure_ascii=False) + "\n")
+    for path in (out_jsonl, out_jsonl.with_name(out_jsonl.name + ".idx")):
+        path.unlink(missing_ok=True)
+    store = CaseStore(str(out_jsonl), auto_compact=False)
+
+    jobs = [(cat, i) for cat in categories for i in range(1, args.per_category + 1)]
+    if args.dry_run:
+        for cat, i in jobs:
+            store.upsert(_make_stub_case(cat, i))
+    else:
+
+        def _attempt(job: Tuple[Dict[str, Any], int]) -> Dict[str, Any]:
+            prompt = _render_prompt(args.template, job[0])
+            # Each of a category's --per-category cases is its own cache entry
+            # (the first keeps the plain request key).
+            text, key = _call_llm(args.model, prompt, args.temperature, args.max_tokens, llm_cache, job[1] - 1)
+            try:
+                case = _parse_json_strict(text)
+                errs = validate_case(case, schema)
+                if errs:
+                    raise ValueError("; ".join(errs))
+            except Exception:
+                if llm_cache is not None:
+                    llm_cache.discard(key)
+                raise
+            return case
+
+        def _commit(_: int, job: Tuple[Dict[str, Any], int], case: Dict[str, Any]) -> None:
+            store.upsert(case)
+
+        failures = run_jobs(
+            jobs,
+            _attempt,
+            _commit,
+            max_in_flight=args.concurrency,
+            bucket=TokenBucket(args.rps, burst=args.concurrency),
+            max_retries=args.max_retries,
+            backoff_sec=0.5,
+        )
+        if llm_cache is not None:
+            print("llm cache:", llm_cache.stats())
+        if failures:
+            (cat, _), last_err = failures[0]
+            raise SystemExit(f"failed to generate case for {cat['level3_id']}: {last_err}")
 
     try:
-        import pandas as pd  # type: ignore
-
-        df = pd.DataFrame(cases)
-        Path(args.out_parquet).parent.mkdir(parents=True, exist_ok=True)
-        df.to_parquet(args.out_parquet, index=False)
-    except Exception as exc:
+        store.export_parquet(args.out_parquet)
+    except ImportError as exc:
         raise SystemExit("pandas/pyarrow required for parquet output") from exc
 
 
@@ -5,8 +5,10 @@ from pathlib import Path
 from typing import Any, Dict, List
 
 from case_bank import load_schema, validate_case
-from adapter_llm import _env_with_filters
-from deepseek_client import chat_complete
+from case_store import CaseStore
+from adapter_llm import compile_template
+from deepseek_client import chat_complete, forget, set_cache
+from llm_cache import LLMCache
 
 
 def _load_categories(path: str) -> List[Dict[str, Any]]:
@@ -14,8 +16,7 @@ def _load_categories(path: str) -> List[Dict[str, Any]]:
 
 
 def _render_prompt(template_path: str, category: Dict[str, Any]) -> str:
-    env = _env_with_filters()
-    tmpl = env.from_string(Path(template_path).read_text(encoding="utf-8"))
+    tmpl = compile_template(Path(template_path).read_text(encoding="utf-8"))
     return tmpl.render(**category)
 
 
@@ -30,30 +31,6 @@ def _parse_json_strict(text: str) -> Dict[str, Any]:
         raise
 
 
-def _load_existing(path: Path) -> List[Dict[str, Any]]:
-    if not path.exists():
-        return []
-    items = []
-    for line in path.read_text(encoding="utf-8").splitlines():
-        if line.strip():
-            items.append(json.loads(line))
-    return items
-
-
-def _write_jsonl(path: Path, items: List[Dict[str, Any]]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as f:
-        for item in items:
-            f.write(json.dumps(item, ensure_ascii=False) + "\n")
-
-
-def _write_parquet(path: Path, items: List[Dict[str, Any]]) -> None:
-    import pandas as pd  # type: ignore
-
-    path.parent.mkdir(parents=True, exist_ok=True)
-    pd.DataFrame(items).to_parquet(path, index=False)
-
-
 def main():
     ap = argparse.ArgumentParser(description="Generate or replace a single VC-FCST case via DeepSeek")
     ap.add_argument("--categories", default="benchmark/categories_top50.json")
@@ -61,8 +38,13 @@ def main():
     ap.add_argument("--category-id", default="", help="Target level3_id; if empty, use first category")
     ap.add_argument("--case-id", default="", help="Optional explicit case_id")
     ap.add_argument("--out-jsonl", default="datasets/case_bank.jsonl")
-    ap.add_argument("--out-parquet", default="datasets/case_bank.parquet")
+    ap.add_argument(
+        "--out-parquet",
+        default="",
+        help="Also rewrite this parquet with the whole bank (O(N); or run case_store.py export later)",
+    )
     ap.add_argument("--model", default="", help="Override MODEL_NAME in .env")
+    ap.add_argument("--llm-cache", default="", help="Cache LLM responses under this dir")
     args = ap.parse_args()
 
     schema = load_schema()
@@ -78,31 +60,28 @@ def main():
     else:
         category = categories[0]
 
+    if args.llm_cache:
+        set_cache(LLMCache(args.llm_cache))
     prompt = _render_prompt(args.template, category)
-    text = chat_complete([{"role": "user", "content": prompt}], model=args.model or None)
-    case = _parse_json_strict(text)
-    errs = validate_case(case, schema)
+    messages = [{"role": "user", "content": prompt}]
+    text = chat_complete(messages, model=args.model or None)
+    try:
+        case = _parse_json_strict(text)
+        errs = validate_case(case, schema)
+    except Exception:
+        forget(messages, model=args.model or None)
+        raise
     if errs:
+        forget(messages, model=args.model or None)
         raise SystemExit("invalid case: " + "; ".join(errs))
 
     if args.case_id:
         case["case_id"] = args.case_id
 
-    jsonl_path = Path(args.out_jsonl)
-    items = _load_existing(jsonl_path)
-
-    replaced = False
-    for i, item in enumerate(items):
-        if item.get("case_id") == case.get("case_id"):
-            items[i] = case
-            replaced = True
-            break
-
-    if not replaced:
-        items.append(case)
-
-    _write_jsonl(jsonl_path, items)
-    _write_parquet(Path(args.out_parquet), items)
+    store = CaseStore(args.out_jsonl)
+    store.upsert(case)
+    if args.out_parquet:
+        store.export_parquet(args.out_parquet)
 
     print("ok", case.get("case_id"))
 
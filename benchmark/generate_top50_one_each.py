@@ -1,13 +1,15 @@
 #!/usr/bin/env python3
 import argparse
 import json
-import time
 from pathlib import Path
 from typing import Any, Dict, List
 
 from case_bank import load_schema, validate_case
-from adapter_llm import _env_with_filters
-from deepseek_client import chat_complete
+from case_store import CaseStore
+from adapter_llm import compile_template
+from deepseek_client import chat_complete, forget, set_cache, set_max_retries
+from gen_scheduler import TokenBucket, run_jobs
+from llm_cache import LLMCache
 
 
 def _load_categories(path: str) -> List[Dict[str, Any]]:
@@ -15,8 +17,7 @@ def _load_categories(path: str) -> List[Dict[str, Any]]:
 
 
 def _render_prompt(template_path: str, category: Dict[str, Any]) -> str:
-    env = _env_with_filters()
-    tmpl = env.from_string(Path(template_path).read_text(encoding="utf-8"))
+    tmpl = compile_template(Path(template_path).read_text(encoding="utf-8"))
     return tmpl.render(**category)
 
 
@@ -31,30 +32,6 @@ def _parse_json_strict(text: str) -> Dict[str, Any]:
         raise
 
 
-def _load_existing(path: Path) -> List[Dict[str, Any]]:
-    if not path.exists():
-        return []
-    items = []
-    for line in path.read_text(encoding="utf-8").splitlines():
-        if line.strip():
-            items.append(json.loads(line))
-    return items
-
-
-def _write_jsonl(path: Path, items: List[Dict[str, Any]]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as f:
-        for item in items:
-            f.write(json.dumps(item, ensure_ascii=False) + "\n")
-
-
-def _write_parquet(path: Path, items: List[Dict[str, Any]]) -> None:
-    import pandas as pd  # type: ignore
-
-    path.parent.mkdir(parents=True, exist_ok=True)
-    pd.DataFrame(items).to_parquet(path, index=False)
-
-
 def _case_id_for(category_id: str) -> str:
     return f"VCFCST-{category_id}-001"
 
@@ -64,70 +41,73 @@ def main():
     ap.add_argument("--categories", default="benchmark/categories_top50.json")
     ap.add_argument("--template", default="benchmark/prompts/case_prompt_template.md")
     ap.add_argument("--out-jsonl", default="datasets/case_bank.jsonl")
-    ap.add_argument("--out-parquet", default="datasets/case_bank.parquet")
+    ap.add_argument("--out-parquet", default="datasets/case_bank.parquet", help="Empty to skip the parquet export")
     ap.add_argument("--model", default="", help="Override MODEL_NAME in .env")
     ap.add_argument("--max-retries", type=int, default=5)
-    ap.add_argument("--sleep-sec", type=float, default=1.0)
+    ap.add_argument("--sleep-sec", type=float, default=1.0, help="Base retry backoff")
+    ap.add_argument("--concurrency", type=int, default=4, help="Max LLM requests in flight")
+    ap.add_argument("--rps", type=float, default=2.0, help="Max LLM requests started per second")
+    ap.add_argument("--llm-cache", default="", help="Cache LLM responses under this dir")
     args = ap.parse_args()
 
+    llm_cache = LLMCache(args.llm_cache) if args.llm_cache else None
+    if llm_cache is not None:
+        set_cache(llm_cache)
+    # run_jobs does the retrying, so 429s reach its rate limiter.
+    set_max_retries(0)
+
     schema = load_schema()
     categories = _load_categories(args.categories)
 
-    jsonl_path = Path(args.out_jsonl)
-    items = _load_existing(jsonl_path)
-
-    # Index existing by case_id for replace
-    by_id = {item.get("case_id"): i for i, item in enumerate(items)}
+    store = CaseStore(args.out_jsonl)
 
-    for category in categories:
-        case_id = _case_id_for(category["level3_id"])
+    def _attempt(category: Dict[str, Any]) -> Dict[str, Any]:
         prompt = _render_prompt(args.template, category)
-        last_err = ""
-        case = None
-        for _ in range(args.max_retries):
-            try:
-                text = chat_complete(
-                    [
-                        {
-                            "role": "system",
-                            "content": "Output ONLY strict JSON. No extra text.",
-                        },
-                        {"role": "user", "content": prompt},
-                    ],
-                    model=args.model or None,
-                )
-                if not (text or "").strip():
-                    last_err = "empty_response"
-                    case = None
-                    raise ValueError(last_err)
-                case = _parse_json_strict(text)
-                case["case_id"] = case_id
-                errs = validate_case(case, schema)
-                if not errs:
-                    break
-                last_err = "; ".join(errs)
-                case = None
-            except Exception as exc:
-                last_err = str(exc)
-                case = None
-            time.sleep(args.sleep_sec)
-        if case is None:
-            raise SystemExit(f"failed to generate {case_id}: {last_err}")
-
-        if case_id in by_id:
-            items[by_id[case_id]] = case
-        else:
-            items.append(case)
-            by_id[case_id] = len(items) - 1
-
-        print("ok", case_id)
-
-        # Persist after each successful case to avoid losing progress.
-        _write_jsonl(jsonl_path, items)
-        _write_parquet(Path(args.out_parquet), items)
-
-    _write_jsonl(jsonl_path, items)
-    _write_parquet(Path(args.out_parquet), items)
+        messages = [
+            {
+                "role": "system",
+                "content": "Output ONLY strict JSON. No extra text.",
+            },
+            {"role": "user", "content": prompt},
+        ]
+        text = chat_complete(messages, model=args.model or None)
+        try:
+            if not (text or "").strip():
+                raise ValueError("empty_response")
+            case = _parse_json_strict(text)
+            case["case_id"] = _case_id_for(category["level3_id"])
+            errs = validate_case(case, schema)
+            if errs:
+                raise ValueError("; ".join(errs))
+        except Exception:
+            # Do not replay a rejected response from the LLM cache on retry.
+            forget(messages, model=args.model or None)
+            raise
+        return case
+
+    def _commit(_: int, category: Dict[str, Any], case: Dict[str, Any]) -> None:
+        # Persisted immediately (O(1) append + index entry) to avoid losing progress.
+        store.upsert(case)
+        print("ok", case["case_id"])
+
+    failures = run_jobs(
+        categories,
+        _attempt,
+        _commit,
+        max_in_flight=args.concurrency,
+        bucket=TokenBucket(args.rps, burst=args.concurrency),
+        max_retries=args.max_retries,
+        backoff_sec=args.sleep_sec,
+    )
+
+    if args.out_parquet:
+        store.export_parquet(args.out_parquet)
+    if llm_cache is not None:
+        print("llm cache:", llm_cache.stats())
+    if failures:
+        for category, err in failures:
+            print(f"failed to generate {_case_id_for(category['level3_id'])}: {err}")
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# Per-phase resource accounting: wall time, CPU time, peak RSS and bytes written.
+#
+# Subprocesses are measured by running them under this file as a tiny wrapper
+# (asyncio reaps its own children, so their rusage is otherwise lost): the
+# wrapper spawns the command, collects it with os.wait4 and writes the rusage to
+# a JSON file. In-process phases run in worker threads and are measured with the
+# thread's CPU clock and /proc/thread-self/io.
+import json
+import os
+import resource
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+WRAPPER = Path(__file__).resolve()
+USAGE_KEYS = ("cpu_sec", "max_rss_kb", "write_bytes")
+
+
+def _rss_kb(maxrss: int) -> int:
+    # ru_maxrss is KiB on Linux but bytes on macOS.
+    return maxrss // 1024 if sys.platform == "darwin" else maxrss
+
+
+def usage_from_rusage(ru: Any) -> Dict[str, Any]:
+    return {
+        "cpu_sec": round(ru.ru_utime + ru.ru_stime, 3),
+        "max_rss_kb": _rss_kb(ru.ru_maxrss),
+        # Block output operations are counted in 512-byte units.
+        "write_bytes": ru.ru_oublock * 512,
+    }
+
+
+def wrap_command(cmd: List[str]) -> Tuple[List[str], Path]:
+    fd, usage_path = tempfile.mkstemp(prefix="vcfcst-rusage-", suffix=".json")
+    os.close(fd)
+    # -S: the wrapper only needs the stdlib, skip site-packages to start faster.
+    return [sys.executable, "-S", str(WRAPPER), usage_path, "--"] + list(cmd), Path(usage_path)
+
+
+def read_usage(usage_path: Path) -> Dict[str, Any]:
+    try:
+        data = json.loads(usage_path.read_text(encoding="utf-8") or "{}")
+    except (OSError, ValueError):
+        data = {}
+    finally:
+        try:
+            usage_path.unlink()
+        except OSError:
+            pass
+    # A killed wrapper (timeout) leaves nothing behind; report unknowns as None.
+    return {key: data.get(key) for key in USAGE_KEYS}
+
+
+def _thread_write_bytes() -> Optional[int]:
+    try:
+        with open("/proc/thread-self/io", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("write_bytes:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def measure_call(fn: Callable[..., Any], *args: Any) -> Tuple[Any, Dict[str, Any]]:
+    # Meant to run inside asyncio.to_thread: CPU and I/O are the calling thread's,
+    # peak RSS is the whole harness process (its high-water mark so far).
+    t0 = time.perf_counter()
+    cpu0 = time.thread_time()
+    io0 = _thread_write_bytes()
+    result = fn(*args)
+    io1 = _thread_write_bytes()
+    return result, {
+        "wall_sec": round(time.perf_counter() - t0, 3),
+        "cpu_sec": round(time.thread_time() - cpu0, 3),
+        "max_rss_kb": _rss_kb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss),
+        "write_bytes": io1 - io0 if io0 is not None and io1 is not None else None,
+    }
+
+
+def _wrap_main(argv: List[str]) -> int:
+    usage_path, sep, cmd = argv[0], argv[1], argv[2:]
+    if sep != "--" or not cmd:
+        print("usage: instrument.py USAGE_JSON -- CMD...", file=sys.stderr)
+        return 2
+    try:
+        proc = subprocess.Popen(cmd)
+    except OSError as exc:
+        print(f"{cmd[0]}: {exc}", file=sys.stderr)
+        return 127
+    _, status, ru = os.wait4(proc.pid, 0)
+    # Keep Popen from reaping the already collected pid again.
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    Path(usage_path).write_text(json.dumps(usage_from_rusage(ru)), encoding="utf-8")
+    if proc.returncode < 0:
+        # Die from the same signal so callers see the same return code as without
+        # the wrapper.
+        signal.signal(-proc.returncode, signal.SIG_DFL)
+        os.kill(os.getpid(), -proc.returncode)
+    return proc.returncode
+
+
+if __name__ == "__main__":
+    raise SystemExit(_wrap_main(sys.argv[1:]))
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 import argparse
-from pathlib import Path
-from typing import Dict
+
+from leaderboard_agg import refresh_aggregates, rollup, source_stamp
+from leaderboard_stats import AGENT_COLUMNS, load_stats
+from result_writer import open_results
 
 
 def _require_streamlit():
@@ -23,81 +25,113 @@ def _require_plotly():
         raise SystemExit("plotly is required: pip install plotly") from exc
 
 
-def _load_parquet(path: str):
-    try:
-        import pandas as pd  # type: ignore
+def _agent_labels(frame):
+    # name@version, like the orchestrator's run dirs; the name alone without a version.
+    version = frame["agent_version"].fillna("")
+    return frame["agent_name"] + ("@" + version).where(version != "", "")
 
-        return pd.read_parquet(path)
-    except Exception as exc:
-        raise SystemExit("pandas is required: pip install pandas pyarrow") from exc
 
+def _cached(st):
+    # Streamlit reruns the whole script on every interaction; st.cache_data keeps
+    # these across reruns. The source stamp argument makes new result files (or
+    # a new case bank) miss the cache.
+    @st.cache_data(show_spinner=False)
+    def load_aggregates(results: str, case_bank: str, stamp: str):
+        agg, _ = refresh_aggregates(results, case_bank)
+        return agg
 
-def _top_level_map(case_df) -> Dict[str, str]:
-    mapping = {}
-    for _, row in case_df.iterrows():
-        cat = row.get("vcfcst_category", {})
-        if isinstance(cat, dict):
-            mapping[row.get("case_id")] = cat.get("level1", "")
-    return mapping
+    @st.cache_data(show_spinner=False)
+    def load_case_rows(results: str, stamp: str, limit: int):
+        # Only the case table needs raw rows; read on demand, newest last.
+        table = open_results(results)
+        return table.slice(max(0, table.num_rows - limit)).to_pandas()
+
+    @st.cache_data(show_spinner=False)
+    def load_uncertainty(results: str, case_bank: str, stamp: str, difficulty: str, n_boot: int):
+        return load_stats(results, case_bank, n_boot=n_boot, difficulty=difficulty)
+
+    return load_aggregates, load_case_rows, load_uncertainty
 
 
 def main():
     ap = argparse.ArgumentParser(description="VC-FCST Benchmark Leaderboard")
-    ap.add_argument("--results", default="runs/benchmark_results.parquet")
+    ap.add_argument(
+        "--results", default="runs/benchmark_results.parquet", help="Results parquet or --out-dataset dir"
+    )
     ap.add_argument("--case-bank", default="datasets/case_bank.parquet")
+    ap.add_argument("--case-rows", type=int, default=5000, help="Max result rows in the case detail table")
+    ap.add_argument("--bootstrap", type=int, default=1000, help="Bootstrap replicates for the confidence intervals")
     args = ap.parse_args()
 
     st = _require_streamlit()
     px, go = _require_plotly()
-
-    results = _load_parquet(args.results)
-    case_bank = _load_parquet(args.case_bank) if Path(args.case_bank).exists() else None
+    load_aggregates, load_case_rows, load_uncertainty = _cached(st)
 
     st.title("VC-FCST Benchmark Leaderboard")
 
-    if results.empty:
+    stamp = source_stamp(args.results, args.case_bank)
+    agg = load_aggregates(args.results, args.case_bank, stamp)
+    if agg.empty:
         st.warning("No results found.")
         return
 
-    if case_bank is not None:
-        level1_map = _top_level_map(case_bank)
-        results = results.copy()
-        results["level1"] = results["case_id"].map(level1_map)
-    else:
-        results["level1"] = ""
+    difficulties = sorted(d for d in agg["difficulty"].unique() if d)
+    difficulty = st.selectbox("Difficulty", ["All"] + difficulties)
+    if difficulty != "All":
+        agg = agg[agg["difficulty"] == difficulty]
 
-    overall = results.groupby("agent_name").agg(
-        total_cases=("case_id", "count"),
-        passed=("passed", "sum"),
-        avg_duration=("duration_sec", "mean"),
+    overall = rollup(agg, AGENT_COLUMNS).rename(columns={"runs": "total_cases"})
+    overall["pass_rate"] = overall["pass_rate"] * 100
+    overall = overall.sort_values("pass_rate", ascending=False).reset_index(drop=True)
+    stats = load_uncertainty(
+        args.results, args.case_bank, stamp, "" if difficulty == "All" else difficulty, args.bootstrap
     )
-    overall["pass_rate"] = overall["passed"] / overall["total_cases"] * 100
-    overall = overall.sort_values("pass_rate", ascending=False).reset_index()
+    intervals = stats["agents"][AGENT_COLUMNS + ["wilson_low", "wilson_high", "bootstrap_low", "bootstrap_high"]]
+    overall = overall.merge(intervals, on=AGENT_COLUMNS, how="left")
+    for column in ("wilson_low", "wilson_high", "bootstrap_low", "bootstrap_high"):
+        overall[column] = overall[column] * 100
 
     st.subheader("Overall Ranking")
+    st.caption("95% intervals over cases: Wilson score and case-level bootstrap.")
     st.dataframe(overall, use_container_width=True)
 
+    st.subheader("Paired Significance")
+    if len(stats["pairwise"]):
+        st.caption("Sign test over the cases both agents ran (McNemar with one run per case), Holm-adjusted.")
+        st.dataframe(stats["pairwise"], use_container_width=True)
+    else:
+        st.info("Need at least two agents for paired tests.")
+
+    if stats["pass_at_k"] is not None:
+        st.subheader("pass@k")
+        table = stats["pass_at_k"].pivot(index=AGENT_COLUMNS, columns="k", values="pass_at_k") * 100
+        st.dataframe(table, use_container_width=True)
+
     st.subheader("Top-Level Category Radar")
-    if results["level1"].nunique() > 1:
-        radar = results.groupby(["agent_name", "level1"]).agg(pass_rate=("passed", "mean")).reset_index()
+    if agg.loc[agg["level1"] != "", "level1"].nunique() > 1:
+        radar = rollup(agg[agg["level1"] != ""], AGENT_COLUMNS + ["level1"])
         fig = go.Figure()
-        for agent in radar["agent_name"].unique():
-            sub = radar[radar["agent_name"] == agent]
+        radar["agent"] = _agent_labels(radar)
+        for agent, sub in radar.groupby("agent"):
             fig.add_trace(
                 go.Scatterpolar(r=sub["pass_rate"] * 100, theta=sub["level1"], fill="toself", name=agent)
             )
         fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 100])))
         st.plotly_chart(fig, use_container_width=True)
+        level1_stats = stats["categories"][stats["categories"]["level1"] != ""]
+        st.dataframe(level1_stats, use_container_width=True)
     else:
         st.info("Top-level category data not available.")
 
     st.subheader("Category Detail")
-    category_stats = results.groupby(["agent_name", "category_id"]).agg(pass_rate=("passed", "mean")).reset_index()
-    fig = px.bar(category_stats, x="agent_name", y="pass_rate", color="category_id", barmode="group")
+    category_stats = rollup(agg, AGENT_COLUMNS + ["level3_id"]).rename(columns={"level3_id": "category_id"})
+    category_stats["agent"] = _agent_labels(category_stats)
+    fig = px.bar(category_stats, x="agent", y="pass_rate", color="category_id", barmode="group")
     st.plotly_chart(fig, use_container_width=True)
 
     st.subheader("Case Detail")
-    st.dataframe(results, use_container_width=True)
+    if st.checkbox(f"Show result rows (last {args.case_rows})"):
+        st.dataframe(load_case_rows(args.results, stamp, args.case_rows), use_container_width=True)
 
 
 if __name__ == "__main__":
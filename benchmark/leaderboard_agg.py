@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# Precomputed leaderboard aggregates. Results are reduced to additive sums per
+# (agent, version, level1, level2, level3_id, difficulty) and stored as a small
+# parquet next to the results, with a manifest of the result files already
+# folded in. A refresh only reads result files that are new since the last one;
+# a changed or removed file (a resumed batch rewrites its part file) or a changed
+# case bank triggers a full rebuild.
+#
+# Layout: <dataset dir>/_aggregates/ (the "_" prefix keeps it out of dataset
+# discovery) or <results>.agg/ next to a single results parquet.
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from case_bank import scan_case_index
+from result_writer import partitioning
+
+GROUP_COLUMNS = ["agent_name", "agent_version", "level1", "level2", "level3_id", "difficulty"]
+SUM_COLUMNS = ["runs", "passed", "duration_sum", "duration_sq_sum"]
+AGG_NAME = "aggregates.parquet"
+MANIFEST_NAME = "manifest.json"
+# Bumped when the aggregate layout changes, so old materializations are rebuilt.
+AGG_VERSION = 1
+
+
+def _require_pandas():
+    try:
+        import pandas as pd  # type: ignore
+
+        return pd
+    except Exception as exc:  # pragma: no cover
+        raise SystemExit("pandas is required: pip install pandas pyarrow") from exc
+
+
+def _require_pyarrow_dataset():
+    try:
+        import pyarrow.dataset as ds  # type: ignore
+
+        return ds
+    except Exception as exc:  # pragma: no cover
+        raise SystemExit("pyarrow is required: pip install pyarrow") from exc
+
+
+def agg_dir(results: str) -> Path:
+    path = Path(results)
+    return path / "_aggregates" if path.is_dir() else path.with_suffix(".agg")
+
+
+def _file_stamp(path: Path) -> List[int]:
+    st = path.stat()
+    return [st.st_size, st.st_mtime_ns]
+
+
+def result_files(results: str) -> Dict[str, List[int]]:
+    # rel path -> [size, mtime_ns] of every result parquet the leaderboard reads.
+    path = Path(results)
+    if not path.exists():
+        return {}
+    if not path.is_dir():
+        return {path.name: _file_stamp(path)}
+    files = {}
+    for root, dirs, names in os.walk(path):
+        dirs[:] = [d for d in dirs if not d.startswith((".", "_"))]
+        for name in names:
+            if name.endswith(".parquet") and not name.startswith((".", "_")):
+                full = Path(root) / name
+                files[full.relative_to(path).as_posix()] = _file_stamp(full)
+    return files
+
+
+def _bank_stamp(case_bank: str) -> Optional[List[int]]:
+    return _file_stamp(Path(case_bank)) if case_bank and Path(case_bank).is_file() else None
+
+
+def source_stamp(results: str, case_bank: str) -> str:
+    # Cheap fingerprint (stat calls only) of everything the aggregates depend on.
+    return json.dumps({"results": result_files(results), "case_bank": _bank_stamp(case_bank)}, sort_keys=True)
+
+
+def case_categories(case_bank: str):
+    # case_id -> level1/level2 via the flat arrow index scan (no per-row Python).
+    pd = _require_pandas()
+    if _bank_stamp(case_bank) is None:
+        return pd.DataFrame(columns=["case_id", "level1", "level2"])
+    index = scan_case_index(case_bank).select(["case_id", "level1", "level2"])
+    return index.to_pandas()
+
+
+def _read_results(results: str, rel_paths: List[str]):
+    ds = _require_pyarrow_dataset()
+    root = Path(results)
+    columns = ["agent_name", "agent_version", "case_id", "category_id", "difficulty", "passed", "duration_sec"]
+    if root.is_dir():
+        dataset = ds.dataset(
+            [str(root / rel) for rel in rel_paths],
+            format="parquet",
+            partitioning=partitioning(),
+            partition_base_dir=str(root),
+        )
+    else:
+        dataset = ds.dataset(str(root), format="parquet")
+    return dataset.to_table(columns=[c for c in columns if c in dataset.schema.names]).to_pandas()
+
+
+def aggregate(frame, categories):
+    pd = _require_pandas()
+    frame = frame.copy()
+    for column in ("agent_version", "category_id", "difficulty"):
+        if column not in frame:
+            frame[column] = ""
+    frame = frame.merge(categories, on="case_id", how="left")
+    frame["level3_id"] = frame["category_id"]
+    for column in GROUP_COLUMNS:
+        frame[column] = frame[column].fillna("").astype(str)
+    duration = pd.to_numeric(frame["duration_sec"], errors="coerce").fillna(0.0)
+    frame["runs"] = 1
+    frame["passed"] = frame["passed"].fillna(False).astype(bool).astype("int64")
+    frame["duration_sum"] = duration
+    frame["duration_sq_sum"] = duration * duration
+    return frame.groupby(GROUP_COLUMNS, as_index=False)[SUM_COLUMNS].sum()
+
+
+def _merge(existing, new):
+    pd = _require_pandas()
+    if existing is None or existing.empty:
+        return new
+    return pd.concat([existing, new], ignore_index=True).groupby(GROUP_COLUMNS, as_index=False)[SUM_COLUMNS].sum()
+
+
+def _load_manifest(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def refresh_aggregates(results: str, case_bank: str = "", rebuild: bool = False):
+    # Returns (aggregates DataFrame, number of result files read this time).
+    pd = _require_pandas()
+    out_dir = agg_dir(results)
+    agg_path, manifest_path = out_dir / AGG_NAME, out_dir / MANIFEST_NAME
+    files = result_files(results)
+    bank_stamp = _bank_stamp(case_bank)
+
+    manifest = None if rebuild else _load_manifest(manifest_path)
+    existing = None
+    todo = sorted(files)
+    if manifest is not None and manifest.get("version") == AGG_VERSION and manifest.get("case_bank") == bank_stamp:
+        seen = manifest.get("files") or {}
+        if all(files.get(rel) == stamp for rel, stamp in seen.items()) and agg_path.exists():
+            existing = pd.read_parquet(agg_path)
+            todo = [rel for rel in todo if rel not in seen]
+    if existing is not None and not todo:
+        return existing, 0
+
+    merged = existing
+    if todo:
+        merged = _merge(existing, aggregate(_read_results(results, todo), case_categories(case_bank)))
+    if merged is None:
+        columns = {c: pd.Series(dtype="object") for c in GROUP_COLUMNS}
+        columns.update({c: pd.Series(dtype="float64") for c in SUM_COLUMNS})
+        merged = pd.DataFrame(columns)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tmp = agg_path.with_name(f".{AGG_NAME}.tmp")
+    merged.to_parquet(tmp, index=False)
+    os.replace(tmp, agg_path)
+    data = {"version": AGG_VERSION, "case_bank": bank_stamp, "files": files}
+    tmp = manifest_path.with_name(f".{MANIFEST_NAME}.tmp")
+    tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    os.replace(tmp, manifest_path)
+    return merged, len(todo)
+
+
+def rollup(agg, by: List[str]):
+    # Re-groups the materialized sums at a coarser grain and derives the rates.
+    out = agg.groupby(by, as_index=False)[SUM_COLUMNS].sum()
+    out["pass_rate"] = out["passed"] / out["runs"]
+    out["avg_duration"] = out["duration_sum"] / out["runs"]
+    variance = (out["duration_sq_sum"] / out["runs"] - out["avg_duration"] ** 2).clip(lower=0)
+    out["std_duration"] = variance ** 0.5
+    return out.drop(columns=["duration_sum", "duration_sq_sum"])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Refresh precomputed leaderboard aggregates")
+    ap.add_argument("--results", default="runs/benchmark_results.parquet", help="Results parquet or dataset dir")
+    ap.add_argument("--case-bank", default="datasets/case_bank.parquet")
+    ap.add_argument("--rebuild", action="store_true", help="Ignore the manifest and re-read every result file")
+    args = ap.parse_args()
+
+    agg, read = refresh_aggregates(args.results, args.case_bank, rebuild=args.rebuild)
+    print(f"{agg_dir(args.results) / AGG_NAME}: {len(agg)} groups, {int(agg['runs'].sum()) if len(agg) else 0} runs")
+    print(f"result files read: {read}")
+    if len(agg):
+        print(rollup(agg, ["agent_name", "agent_version"]).to_string(index=False))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# Uncertainty for the leaderboard, computed with NumPy over the whole result set:
+# - Wilson and (case-level Poisson) bootstrap intervals per agent and per
+#   agent x level1 category,
+# - paired sign tests (McNemar's exact test when every case has one run) between
+#   every pair of agents over the cases both ran, with Holm-adjusted p-values,
+# - unbiased pass@k when cases were run more than once (--repeats).
+#
+# Everything works on "cells": one (agent, case) pair with its run and pass
+# counts, so repeats of a case count as one observation of that case. An agent
+# is an (agent_name, agent_version) pair, like in leaderboard_agg.
+import argparse
+from typing import Any, Dict, Optional
+
+from leaderboard_agg import case_categories
+from result_writer import open_results
+
+Z_95 = 1.959963984540054
+AGENT_COLUMNS = ["agent_name", "agent_version"]
+INTERVAL_COLUMNS = [
+    "cases",
+    "runs",
+    "passed",
+    "pass_rate",
+    "wilson_low",
+    "wilson_high",
+    "bootstrap_low",
+    "bootstrap_high",
+]
+PAIRWISE_COLUMNS = [
+    "agent_a",
+    "agent_a_version",
+    "agent_b",
+    "agent_b_version",
+    "shared_cases",
+    "a_better",
+    "b_better",
+    "p_value",
+    "p_holm",
+    "significant",
+]
+# Bootstrap replicates x cells held in memory at once.
+_BOOT_CHUNK_CELLS = 4_000_000
+
+
+def _require_numpy():
+    try:
+        import numpy as np  # type: ignore
+
+        return np
+    except Exception as exc:  # pragma: no cover
+        raise SystemExit("numpy is required: pip install numpy") from exc
+
+
+def _require_pandas():
+    try:
+        import pandas as pd  # type: ignore
+
+        return pd
+    except Exception as exc:  # pragma: no cover
+        raise SystemExit("pandas is required: pip install pandas pyarrow") from exc
+
+
+def wilson_interval(successes, n, z: float = Z_95):
+    # Vectorized Wilson score interval; (nan, nan) where n == 0.
+    np = _require_numpy()
+    successes = np.asarray(successes, dtype=float)
+    n = np.asarray(n, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = successes / n
+        denom = 1 + z * z / n
+        center = (p + z * z / (2 * n)) / denom
+        half = z * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return np.clip(center - half, 0, 1), np.clip(center + half, 0, 1)
+
+
+def log_factorials(n: int):
+    # lf[k] = log(k!) for k = 0..n
+    np = _require_numpy()
+    return np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, n + 1, dtype=float)))])
+
+
+def sign_test_pvalues(wins, losses):
+    # Exact two-sided binomial test of wins vs losses (ties dropped), for arrays
+    # of pairs at once: p = min(1, 2 * P(X <= min(wins, losses))), X ~ Bin(n, 1/2).
+    np = _require_numpy()
+    wins = np.asarray(wins, dtype=np.int64)
+    losses = np.asarray(losses, dtype=np.int64)
+    n = wins + losses
+    k_min = np.minimum(wins, losses)
+    if n.size == 0:
+        return np.zeros(0)
+    lf = log_factorials(int(n.max()))
+    ks = np.arange(int(k_min.max()) + 1)
+    n_col, k_col = n[..., None], np.minimum(ks, n[..., None])
+    log_pmf = lf[n_col] - lf[k_col] - lf[n_col - k_col] - n_col * np.log(2.0)
+    tail = np.where(ks <= k_min[..., None], np.exp(log_pmf), 0.0).sum(axis=-1)
+    return np.where(n == 0, 1.0, np.minimum(1.0, 2 * tail))
+
+
+def holm_adjust(pvalues):
+    np = _require_numpy()
+    p = np.asarray(pvalues, dtype=float)
+    order = np.argsort(p)
+    m = len(p)
+    adjusted = np.maximum.accumulate((m - np.arange(m)) * p[order])
+    out = np.empty_like(p)
+    out[order] = np.minimum(1.0, adjusted)
+    return out
+
+
+def pass_at_k(n, c, k: int):
+    # Unbiased pass@k per cell: 1 - C(n - c, k) / C(n, k); nan where n < k.
+    np = _require_numpy()
+    n = np.asarray(n, dtype=np.int64)
+    c = np.asarray(c, dtype=np.int64)
+    lf = log_factorials(max(int(n.max()) if n.size else 0, k))
+    fail = n - c
+    ok = fail >= k
+    safe_fail = np.where(ok, fail, k)
+    log_ratio = lf[safe_fail] - lf[safe_fail - k] - lf[n.clip(min=k)] + lf[n.clip(min=k) - k]
+    value = np.where(ok, 1.0 - np.exp(log_ratio), 1.0)
+    return np.where(n >= k, value, np.nan)
+
+
+def _cells(frame):
+    # One row per (agent, case): run and pass counts across repeats. Needs at
+    # least one row.
+    np = _require_numpy()
+    pd = _require_pandas()
+    versions = frame["agent_version"] if "agent_version" in frame else pd.Series("", index=frame.index)
+    agent_keys = pd.MultiIndex.from_arrays([frame["agent_name"].astype(str), versions.fillna("").astype(str)])
+    agent_codes, agents = pd.factorize(agent_keys, sort=True)
+    case_codes, cases = pd.factorize(frame["case_id"], sort=True)
+    cell_ids, inverse = np.unique(agent_codes.astype(np.int64) * len(cases) + case_codes, return_inverse=True)
+    passed = frame["passed"].fillna(False).to_numpy(dtype=bool)
+    return {
+        "agents": np.asarray(agents.get_level_values(0), dtype=object),
+        "versions": np.asarray(agents.get_level_values(1), dtype=object),
+        "cases": np.asarray(cases),
+        "agent": cell_ids // len(cases),
+        "case": cell_ids % len(cases),
+        "runs": np.bincount(inverse).astype(np.int64),
+        "passes": np.bincount(inverse, weights=passed).astype(np.int64),
+    }
+
+
+def bootstrap_intervals(group, passes, runs, n_groups: int, n_boot: int = 1000, alpha: float = 0.05, seed: int = 0):
+    # Case-level bootstrap of passes/runs per group, all groups at once, with
+    # Poisson(1) case weights (the large-sample equivalent of resampling cases
+    # with replacement). Cells with the same (group, passes, runs) are
+    # interchangeable and a sum of m Poisson(1) weights is Poisson(m), so each
+    # replicate draws one weight per distinct cell type instead of one per case.
+    np = _require_numpy()
+    rng = np.random.default_rng(seed)
+    lo = np.full(n_groups, np.nan)
+    hi = np.full(n_groups, np.nan)
+    if len(group) == 0:
+        return lo, hi
+    width = int(runs.max()) + 1
+    keys, counts = np.unique((group * width + passes) * width + runs, return_counts=True)
+    t_group, t_passes, t_runs = keys // (width * width), (keys // width) % width, keys % width
+    starts = np.flatnonzero(np.r_[True, t_group[1:] != t_group[:-1]])
+    chunk = max(1, _BOOT_CHUNK_CELLS // len(keys))
+    estimates = []
+    for done in range(0, n_boot, chunk):
+        weights = rng.poisson(counts, size=(min(chunk, n_boot - done), len(keys))).astype(float)
+        num = np.add.reduceat(weights * t_passes, starts, axis=1)
+        den = np.add.reduceat(weights * t_runs, starts, axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            estimates.append(num / den)
+    bounds = np.nanpercentile(np.vstack(estimates), [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0)
+    present = t_group[starts]
+    lo[present], hi[present] = bounds[0], bounds[1]
+    return lo, hi
+
+
+def _group_table(group, n_groups: int, cells: Dict[str, Any], n_boot: int, seed: int):
+    np = _require_numpy()
+    pd = _require_pandas()
+    runs = np.bincount(group, weights=cells["runs"], minlength=n_groups)
+    passes = np.bincount(group, weights=cells["passes"], minlength=n_groups)
+    n_cases = np.bincount(group, minlength=n_groups)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = passes / runs
+    # Wilson over cases (not runs): repeats of a case are not independent draws.
+    w_lo, w_hi = wilson_interval(rate * n_cases, n_cases)
+    b_lo, b_hi = bootstrap_intervals(group, cells["passes"], cells["runs"], n_groups, n_boot, seed=seed)
+    return pd.DataFrame(
+        {
+            "cases": n_cases,
+            "runs": runs.astype(np.int64),
+            "passed": passes.astype(np.int64),
+            "pass_rate": rate,
+            "wilson_low": w_lo,
+            "wilson_high": w_hi,
+            "bootstrap_low": b_lo,
+            "bootstrap_high": b_hi,
+        }
+    )
+
+
+def _pairwise(cells: Dict[str, Any], alpha: float):
+    # Per-case pass fraction matrix (agents x cases, nan = not run), compared for
+    # every agent pair in chunks of cases.
+    np = _require_numpy()
+    pd = _require_pandas()
+    n_agents, n_cases = len(cells["agents"]), len(cells["cases"])
+    y = np.full((n_agents, n_cases), np.nan)
+    y[cells["agent"], cells["case"]] = cells["passes"] / cells["runs"]
+    wins = np.zeros((n_agents, n_agents), dtype=np.int64)
+    shared = np.zeros((n_agents, n_agents), dtype=np.int64)
+    step = max(1, _BOOT_CHUNK_CELLS // max(1, n_agents * n_agents))
+    for start in range(0, n_cases, step):
+        block = y[:, start : start + step]
+        a, b = block[:, None, :], block[None, :, :]
+        both = ~np.isnan(a) & ~np.isnan(b)
+        wins += (both & (a > b)).sum(axis=2)
+        shared += both.sum(axis=2)
+    i, j = np.triu_indices(n_agents, k=1)
+    p = sign_test_pvalues(wins[i, j], wins[j, i])
+    p_holm = holm_adjust(p) if len(p) else p
+    return pd.DataFrame(
+        {
+            "agent_a": cells["agents"][i],
+            "agent_a_version": cells["versions"][i],
+            "agent_b": cells["agents"][j],
+            "agent_b_version": cells["versions"][j],
+            "shared_cases": shared[i, j],
+            "a_better": wins[i, j],
+            "b_better": wins[j, i],
+            "p_value": p,
+            "p_holm": p_holm,
+            "significant": p_holm < alpha,
+        }
+    )
+
+
+def _pass_at_k(cells: Dict[str, Any]):
+    np = _require_numpy()
+    pd = _require_pandas()
+    n_agents = len(cells["agents"])
+    rows = []
+    for k in range(1, int(cells["runs"].max()) + 1 if len(cells["runs"]) else 1):
+        values = pass_at_k(cells["runs"], cells["passes"], k)
+        ok = ~np.isnan(values)
+        total = np.bincount(cells["agent"][ok], weights=values[ok], minlength=n_agents)
+        count = np.bincount(cells["agent"][ok], minlength=n_agents)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = total / count
+        rows.append(
+            pd.DataFrame(
+                {
+                    "agent_name": cells["agents"],
+                    "agent_version": cells["versions"],
+                    "k": k,
+                    "cases": count,
+                    "pass_at_k": rate,
+                }
+            )
+        )
+    return pd.concat(rows, ignore_index=True)
+
+
+def _empty_stats() -> Dict[str, Any]:
+    pd = _require_pandas()
+    return {
+        "agents": pd.DataFrame(columns=AGENT_COLUMNS + INTERVAL_COLUMNS),
+        "categories": pd.DataFrame(columns=AGENT_COLUMNS + ["level1"] + INTERVAL_COLUMNS),
+        "pairwise": pd.DataFrame(columns=PAIRWISE_COLUMNS),
+        "pass_at_k": None,
+    }
+
+
+def compute_stats(frame, categories=None, n_boot: int = 1000, alpha: float = 0.05, seed: int = 0) -> Dict[str, Any]:
+    # frame: one row per run with agent_name, agent_version (optional), case_id,
+    # passed. categories: case_id -> level1 (leaderboard_agg.case_categories) for
+    # per-category intervals.
+    np = _require_numpy()
+    pd = _require_pandas()
+    if len(frame) == 0:
+        return _empty_stats()
+    cells = _cells(frame)
+    n_agents = len(cells["agents"])
+
+    agents = _group_table(cells["agent"], n_agents, cells, n_boot, seed)
+    agents.insert(0, "agent_version", cells["versions"])
+    agents.insert(0, "agent_name", cells["agents"])
+
+    level1 = np.full(len(cells["cases"]), "", dtype=object)
+    if categories is not None and len(categories):
+        level1_of = categories.set_index("case_id")["level1"]
+        level1 = pd.Series(cells["cases"]).map(level1_of).fillna("").to_numpy(dtype=object)
+    level_codes, levels = pd.factorize(level1[cells["case"]], sort=True)
+    group = cells["agent"] * max(1, len(levels)) + level_codes
+    by_category = _group_table(group, n_agents * max(1, len(levels)), cells, n_boot, seed)
+    by_category.insert(0, "level1", np.tile(np.asarray(levels, dtype=object), n_agents) if len(levels) else "")
+    by_category.insert(0, "agent_version", np.repeat(cells["versions"], max(1, len(levels))))
+    by_category.insert(0, "agent_name", np.repeat(cells["agents"], max(1, len(levels))))
+    by_category = by_category[by_category["cases"] > 0].reset_index(drop=True)
+
+    repeated = len(cells["runs"]) and int(cells["runs"].max()) > 1
+    return {
+        "agents": agents.sort_values("pass_rate", ascending=False).reset_index(drop=True),
+        "categories": by_category,
+        "pairwise": _pairwise(cells, alpha),
+        "pass_at_k": _pass_at_k(cells) if repeated else None,
+    }
+
+
+def load_stats(
+    results: str, case_bank: str = "", n_boot: int = 1000, seed: int = 0, difficulty: str = ""
+) -> Dict[str, Any]:
+    frame = open_results(results, columns=AGENT_COLUMNS + ["case_id", "difficulty", "passed"]).to_pandas()
+    if difficulty and "difficulty" in frame:
+        frame = frame[frame["difficulty"] == difficulty]
+    return compute_stats(frame, case_categories(case_bank), n_boot=n_boot, seed=seed)
+
+
+def _print_table(title: str, table: Optional[Any]) -> None:
+    if table is None:
+        return
+    print(f"\n{title}")
+    print(table.to_string(index=False))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Confidence intervals and paired tests for the leaderboard")
+    ap.add_argument("--results", default="runs/benchmark_results.parquet", help="Results parquet or dataset dir")
+    ap.add_argument("--case-bank", default="datasets/case_bank.parquet")
+    ap.add_argument("--bootstrap", type=int, default=1000, help="Bootstrap replicates")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    stats = load_stats(args.results, args.case_bank, args.bootstrap, args.seed)
+    _print_table("Agents", stats["agents"])
+    _print_table("Agents x level1", stats["categories"])
+    _print_table("Paired tests", stats["pairwise"])
+    _print_table("pass@k", stats["pass_at_k"])
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_CACHE_DIR = "runs/llm_cache"
+
+
+def cache_key(
+    model: str, messages: List[Dict[str, str]], temperature: float, max_tokens: int, sample: int = 0
+) -> str:
+    # sample tells apart repeated draws of the same request (e.g. several cases
+    # from one category prompt), which must not share a cached response.
+    request: Dict[str, Any] = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+    if sample:
+        request["sample"] = sample
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    # On-disk, content-addressed cache of chat completions. One file per key
+    # (<root>/<k[:2]>/<k>.json); a hit bumps the file mtime so eviction can drop
+    # the least recently used entries once the cache grows past max_bytes.
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_bytes: int = 512 * 1024 * 1024):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._bytes = sum(p.stat().st_size for p in self.root.glob("*/*.json"))
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            text = json.loads(path.read_text(encoding="utf-8"))["response"]
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return text
+
+    def put(self, key: str, response: str, meta: Optional[Dict[str, Any]] = None) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({"response": response, "meta": meta or {}}, ensure_ascii=False).encode("utf-8")
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        old = path.stat().st_size if path.exists() else 0
+        os.replace(tmp, path)
+        with self._lock:
+            self._bytes += len(data) - old
+            over = self._bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def discard(self, key: str) -> None:
+        path = self._path(key)
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except OSError:
+            return
+        with self._lock:
+            self._bytes -= size
+
+    def evict(self) -> None:
+        # Drop down to 90% of the budget so eviction does not run on every put.
+        with self._lock:
+            entries = []
+            for p in self.root.glob("*/*.json"):
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, p))
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            target = int(self.max_bytes * 0.9)
+            for _, size, p in entries:
+                if total <= target:
+                    break
+                try:
+                    p.unlink()
+                except OSError:
+                    continue
+                total -= size
+            self._bytes = total
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "bytes": self._bytes,
+            }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="VC-FCST LLM response cache")
+    ap.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    ap.add_argument("--max-mb", type=float, default=512)
+    ap.add_argument("--clear", action="store_true", help="Remove every cached response")
+    args = ap.parse_args()
+
+    cache = LLMCache(args.cache_dir, max_bytes=int(args.max_mb * 1024 * 1024))
+    if args.clear:
+        for p in cache.root.glob("*/*.json"):
+            cache.discard(p.stem)
+    elif cache.stats()["bytes"] > cache.max_bytes:
+        cache.evict()
+    entries = sum(1 for _ in cache.root.glob("*/*.json"))
+    print(f"entries={entries} bytes={cache.stats()['bytes']}")
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,49 +1,55 @@
 #!/usr/bin/env python3
 import argparse
+import asyncio
 import json
-import subprocess
 import os
+import re
+import shutil
+import sys
+import threading
 import time
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
+from adaptive_sampler import AdaptiveSampler
 from adapter_llm import adapt_input_with_llm, load_adapter, parse_output_with_llm, render_input
-from case_bank import filter_cases, load_case_bank
-from evaluator import evaluate_pass_condition, run_pytest, run_semgrep
+from async_exec import run_process
+from case_bank import case_content_hash, scan_case_bank
+from container_pool import ContainerPool, PoolKey, pool_key
+from deepseek_client import set_cache
+from env_cache import (
+    EnvCache,
+    PythonVersionMismatch,
+    case_env_hash,
+    case_requirements,
+    merge_requirements,
+    unique_envs,
+)
+from evaluator import (
+    JUNIT_NAME,
+    SEMGREP_JSON_NAME,
+    SemgrepBatcher,
+    evaluate_pass_condition,
+    pytest_summary,
+    run_pytest_async,
+    run_semgrep_async,
+    semgrep_findings_count,
+    slowest_tests,
+)
+from instrument import USAGE_KEYS, measure_call
+from llm_cache import LLMCache
+from pipeline import Stage, run_pipeline
+from pytest_worker import PytestWorkerPool
+from result_store import ResultStore, adapter_template_hash, store_key
+from result_writer import ResultWriter, write_results
+from seed_cache import SEED_MODES, SeedCache, seed_workspace
+from workspace_diff import DEFAULT_MAX_BLOB_BYTES, Snapshot, WorkspaceDiff, diff_workspace
 
 
 def _utc_now():
     return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
 
 
-def _write_files(base: Path, files: Dict[str, str]) -> None:
-    for rel_path, content in files.items():
-        path = base / rel_path
-        path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(content, encoding="utf-8")
-
-
-def _collect_final_code(base: Path) -> Dict[str, str]:
-    final_code: Dict[str, str] = {}
-    for path in base.rglob("*"):
-        if path.is_file() and ".git" not in path.parts:
-            rel = str(path.relative_to(base))
-            try:
-                final_code[rel] = path.read_text(encoding="utf-8")
-            except UnicodeDecodeError:
-                # Skip binary or non-utf8 artifacts produced during execution.
-                continue
-    return final_code
-
-
-def _changed_files(initial: Dict[str, str], final: Dict[str, str]) -> List[str]:
-    changed = []
-    for path, content in final.items():
-        if initial.get(path) != content:
-            changed.append(path)
-    return sorted(changed)
-
-
 def _listify(value: Any) -> List[Any]:
     if value is None:
         return []
@@ -59,42 +65,49 @@ def _listify(value: Any) -> List[Any]:
     return [value]
 
 
-def _run_agent(agent_cmd: List[str], prompt: str, cwd: str, stdout_path: Path, stderr_path: Path, timeout: int) -> int:
-    proc = subprocess.run(
-        agent_cmd,
-        input=prompt,
-        text=True,
-        cwd=cwd,
-        stdout=stdout_path.open("w", encoding="utf-8"),
-        stderr=stderr_path.open("w", encoding="utf-8"),
-        timeout=timeout,
+async def _run_agent(
+    agent_cmd: List[str], prompt: str, cwd: str, stdout_path: Path, stderr_path: Path, timeout: int
+) -> Dict[str, Any]:
+    return await run_process(
+        agent_cmd, cwd, stdout_path, stderr_path, timeout=timeout, input_text=prompt, measure=True
     )
-    return proc.returncode
 
 
-def _run_in_docker(image: str, workspace: Path, cmd: str, stdout_path: Path, stderr_path: Path, timeout: int) -> int:
+def _run_in_docker_sdk(image: str, workspace: Path, cmd: str, stdout_path: Path, timeout: int) -> Dict[str, Any]:
+    import docker  # type: ignore
+
+    t0 = time.perf_counter()
+    client = docker.from_env()
+    with stdout_path.open("w", encoding="utf-8") as out:
+        container = client.containers.run(
+            image=image,
+            command=["/bin/bash", "-lc", cmd],
+            working_dir="/workspace",
+            volumes={str(workspace): {"bind": "/workspace", "mode": "rw"}},
+            network_disabled=True,
+            mem_limit="2g",
+            nano_cpus=1_000_000_000,
+            detach=True,
+        )
+        try:
+            result = container.wait(timeout=timeout)
+            logs = container.logs(stdout=True, stderr=True).decode("utf-8", errors="ignore")
+            out.write(logs)
+            return {
+                "returncode": int(result.get("StatusCode", 1)),
+                "wall_sec": round(time.perf_counter() - t0, 3),
+                "first_output_sec": None,
+                "timed_out": False,
+            }
+        finally:
+            container.remove(force=True)
+
+
+async def _run_in_docker(
+    image: str, workspace: Path, cmd: str, stdout_path: Path, stderr_path: Path, timeout: int
+) -> Dict[str, Any]:
     try:
-        import docker  # type: ignore
-
-        client = docker.from_env()
-        with stdout_path.open("w", encoding="utf-8") as out, stderr_path.open("w", encoding="utf-8") as err:
-            container = client.containers.run(
-                image=image,
-                command=["/bin/bash", "-lc", cmd],
-                working_dir="/workspace",
-                volumes={str(workspace): {"bind": "/workspace", "mode": "rw"}},
-                network_disabled=True,
-                mem_limit="2g",
-                nano_cpus=1_000_000_000,
-                detach=True,
-            )
-            try:
-                result = container.wait(timeout=timeout)
-                logs = container.logs(stdout=True, stderr=True).decode("utf-8", errors="ignore")
-                out.write(logs)
-                return int(result.get("StatusCode", 1))
-            finally:
-                container.remove(force=True)
+        return await asyncio.to_thread(_run_in_docker_sdk, image, workspace, cmd, stdout_path, timeout)
     except Exception:
         docker_cmd = [
             "docker",
@@ -115,26 +128,32 @@ def _run_in_docker(image: str, workspace: Path, cmd: str, stdout_path: Path, std
             "-lc",
             cmd,
         ]
-        proc = subprocess.run(
-            docker_cmd,
-            stdout=stdout_path.open("w", encoding="utf-8"),
-            stderr=stderr_path.open("w", encoding="utf-8"),
-            timeout=timeout,
-        )
-        return proc.returncode
-
-
-def _ensure_requirements(workspace: Path, deps: List[str]) -> None:
-    req_path = workspace / "requirements.txt"
-    existing = ""
-    if req_path.exists():
-        existing = req_path.read_text(encoding="utf-8")
-    merged = existing.strip().splitlines() if existing.strip() else []
-    for dep in deps:
-        if dep not in merged:
-            merged.append(dep)
+        return await run_process(docker_cmd, str(workspace), stdout_path, stderr_path, timeout=timeout)
+
+
+def _seed_files(case: Dict[str, Any]) -> Dict[str, str]:
+    # Everything a fresh workspace holds before the agent runs: initial code,
+    # acceptance tests and requirements.txt merged with the case dependencies.
+    seeded: Dict[str, str] = {}
+    seeded.update(case["initial_code"])
+    seeded.update(case["acceptance_criteria"]["test_code"])
+    merged = merge_requirements(seeded.get("requirements.txt", ""), case["env_config"]["dependencies"])
     if merged:
-        req_path.write_text("\n".join(merged) + "\n", encoding="utf-8")
+        seeded["requirements.txt"] = "\n".join(merged) + "\n"
+    return seeded
+
+
+def _case_image(case: Dict[str, Any], runtime: "_Runtime") -> Tuple[str, bool]:
+    # Returns the image to test in and whether its dependencies are preinstalled.
+    image = runtime.env_images.get(case_env_hash(case))
+    if image:
+        return image, True
+    return case["env_config"]["base_image"], False
+
+
+def _case_pool_key(case: Dict[str, Any], runtime: "_Runtime") -> PoolKey:
+    image, ready = _case_image(case, runtime)
+    return pool_key(image, [] if ready else case_requirements(case))
 
 
 def _write_rules(workspace: Path, rules: List[str]) -> Path:
@@ -143,166 +162,847 @@ def _write_rules(workspace: Path, rules: List[str]) -> Path:
     return rules_path
 
 
+def _phase(name: str, stats: Dict[str, Any]) -> Dict[str, Any]:
+    # Resource fields are None where they cannot be measured (docker phases only
+    # see the docker client, a timed-out command is killed with its wrapper).
+    phase = {
+        "phase": name,
+        "wall_sec": stats.get("wall_sec"),
+        "first_output_sec": stats.get("first_output_sec"),
+        "timed_out": bool(stats.get("timed_out")),
+    }
+    for key in USAGE_KEYS:
+        phase[key] = stats.get(key)
+    return phase
+
+
+def _collect_changes(run: "_CaseRun", max_blob_bytes: int) -> WorkspaceDiff:
+    diff = diff_workspace(run.workspace, run.before, max_blob_bytes)
+    run.patch_path.write_text(diff.patch(run.seeded), encoding="utf-8")
+    return diff
+
+
+def _parse_output(adapter: Dict[str, Any], run: "_CaseRun", model: str) -> Dict[str, Any]:
+    try:
+        return parse_output_with_llm(
+            adapter, run.agent_stdout.read_text(encoding="utf-8"), run.diff.final_code(run.seeded), model
+        )
+    except Exception:
+        return {}
+
+
+class _Runtime:
+    # Shared, per-batch execution resources handed to every case.
+    def __init__(self, container_pool: Optional[ContainerPool] = None):
+        self.container_pool = container_pool
+        # env_cache hash -> prebuilt docker image / host venv python
+        self.env_images: Dict[str, str] = {}
+        self.env_pythons: Dict[str, str] = {}
+        # env_cache hashes tested in docker without --use-docker (no host python
+        # matches their base image)
+        self.docker_envs: set = set()
+        self.seed_cache: Optional[SeedCache] = None
+        self.pytest_workers: Optional[PytestWorkerPool] = None
+        self.semgrep_batcher: Optional[SemgrepBatcher] = None
+        # (agent label, case_id) -> rendered prompt
+        self.prompts: Dict[Tuple[str, str], str] = {}
+        # Runs admitted to the pipeline and not finished yet.
+        self.in_flight = 0
+        # Set whenever a run leaves the agent stage and frees its agent's slot.
+        self.agent_freed = asyncio.Event()
+
+
+class _Agent:
+    # One adapter config of the run: its command and how many of its cases may be
+    # in the agent stage at once.
+    def __init__(self, adapter: Dict[str, Any], cmd: List[str], concurrency: int):
+        self.adapter = adapter
+        self.name = adapter.get("agent_name", "unknown")
+        self.version = adapter.get("agent_version", "")
+        self.label = re.sub(r"[^A-Za-z0-9@._-]+", "_", f"{self.name}@{self.version}" if self.version else self.name)
+        self.cmd = cmd
+        self.template_hash = adapter_template_hash(adapter)
+        self.concurrency = max(1, concurrency)
+        self.slots: Optional[asyncio.Semaphore] = None
+
+
+class _CaseRun:
+    # Per-(agent, case, repeat) state handed from one pipeline stage to the next.
+    # Runs of the same case share its seed files and rendered prompt.
+    def __init__(
+        self,
+        index: int,
+        case: Dict[str, Any],
+        case_dir: Path,
+        agent: _Agent,
+        repeat: int,
+        seeded: Dict[str, str],
+        digest: str,
+    ):
+        self.index = index
+        self.case = case
+        self.agent = agent
+        self.repeat = repeat
+        self.digest = digest
+        self.case_dir = case_dir
+        self.workspace = self.case_dir / "workspace"
+        self.agent_stdout = self.case_dir / "agent.stdout.log"
+        self.agent_stderr = self.case_dir / "agent.stderr.log"
+        self.pytest_stdout = self.case_dir / "pytest.stdout.log"
+        self.pytest_stderr = self.case_dir / "pytest.stderr.log"
+        self.semgrep_stdout = self.case_dir / "semgrep.stdout.log"
+        self.semgrep_stderr = self.case_dir / "semgrep.stderr.log"
+        self.semgrep_json = self.case_dir / "semgrep.json"
+        self.junit_path = self.case_dir / "pytest.junit.xml"
+        self.patch_path = self.case_dir / "changes.patch"
+        self.rules = _listify(case["acceptance_criteria"].get("static_check_rules"))
+        self.phases: List[Dict[str, Any]] = []
+        self.seeded = seeded
+        self.before: Optional[Snapshot] = None
+        self.diff: Optional[WorkspaceDiff] = None
+        self.started_at = ""
+        self.t0 = 0.0
+        self.agent_code: Optional[int] = None
+        self.pytest_code = 1
+        self.semgrep_code: Optional[int] = None
+        self.semgrep_findings: Optional[int] = None
+        self.parse_result: Dict[str, Any] = {}
+        self.error = ""
+        self.result: Dict[str, Any] = {}
+
+
+async def _stage_agent(args, runtime: _Runtime, run: _CaseRun) -> None:
+    # The run was admitted holding one of its agent's slots (see _run_cases).
+    case, agent = run.case, run.agent
+    try:
+        if run.case_dir.exists():
+            # Leftovers from an interrupted attempt (see --resume).
+            shutil.rmtree(run.case_dir)
+        run.before, seed_stats = await asyncio.to_thread(
+            measure_call, seed_workspace, runtime.seed_cache, run.digest, run.seeded, run.workspace
+        )
+        run.phases.append(_phase("seed", seed_stats))
+
+        run.started_at = _utc_now()
+        run.t0 = time.time()
+
+        # Rendered once per (agent, case) and reused by its repeats.
+        prompt_key = (agent.label, case["case_id"])
+        prompt = runtime.prompts.get(prompt_key)
+        if prompt is None:
+            prompt = runtime.prompts[prompt_key] = render_input(agent.adapter, case)
+        if args.llm_adapt_input:
+            prompt = await asyncio.to_thread(adapt_input_with_llm, agent.adapter, prompt, model=args.llm_model)
+        agent_stats = await _run_agent(
+            agent.cmd, prompt, str(run.workspace), run.agent_stdout, run.agent_stderr, args.timeout
+        )
+        run.agent_code = agent_stats["returncode"]
+        run.phases.append(_phase("agent", agent_stats))
+    finally:
+        agent.slots.release()
+        runtime.agent_freed.set()
+
+
+async def _stage_collect(args, run: _CaseRun) -> None:
+    run.diff, collect_stats = await asyncio.to_thread(measure_call, _collect_changes, run, args.max_blob_kb * 1024)
+    run.phases.append(_phase("collect", collect_stats))
+
+
+async def _stage_test(args, runtime: _Runtime, run: _CaseRun) -> None:
+    case, workspace = run.case, run.workspace
+    # Batched static checks run in the static stage, outside the per-case environment.
+    per_case_rules = run.rules if runtime.semgrep_batcher is None else []
+
+    if args.use_docker and runtime.container_pool is not None:
+        pool = runtime.container_pool
+        key = _case_pool_key(case, runtime)
+        pytest_stats, startup_sec = await pool.run(
+            key,
+            workspace,
+            f"pytest -q --junitxml={JUNIT_NAME}",
+            run.pytest_stdout,
+            run.pytest_stderr,
+            args.timeout,
+            copy_out={f"/workspace/{JUNIT_NAME}": run.junit_path},
+        )
+        run.pytest_code = pytest_stats["returncode"]
+        run.phases.append(_phase("docker_startup", {"wall_sec": startup_sec}))
+        run.phases.append(_phase("pytest", pytest_stats))
+        if len(per_case_rules) > 0:
+            _write_rules(workspace, per_case_rules)
+            semgrep_stats, startup_sec = await pool.run(
+                key,
+                workspace,
+                f"semgrep --config semgrep_rules.txt --json --output {SEMGREP_JSON_NAME}",
+                run.semgrep_stdout,
+                run.semgrep_stderr,
+                args.timeout,
+                copy_out={f"/workspace/{SEMGREP_JSON_NAME}": run.semgrep_json},
+            )
+            run.semgrep_code = semgrep_stats["returncode"]
+            run.phases.append(_phase("docker_startup", {"wall_sec": startup_sec}))
+            run.phases.append(_phase("semgrep", semgrep_stats))
+            run.semgrep_findings = semgrep_findings_count(run.semgrep_json)
+    elif args.use_docker or case_env_hash(case) in runtime.docker_envs:
+        image, ready = _case_image(case, runtime)
+        install = "true" if ready else "pip install -r requirements.txt"
+        pytest_cmd = f"{install} && pytest -q --junitxml={JUNIT_NAME}"
+        pytest_stats = await _run_in_docker(
+            image, workspace, pytest_cmd, run.pytest_stdout, run.pytest_stderr, args.timeout
+        )
+        run.pytest_code = pytest_stats["returncode"]
+        run.phases.append(_phase("pytest", pytest_stats))
+        if (workspace / JUNIT_NAME).exists():
+            shutil.move(str(workspace / JUNIT_NAME), str(run.junit_path))
+        if len(per_case_rules) > 0:
+            _write_rules(workspace, per_case_rules)
+            semgrep_install = install if ready else f"{install} && pip install semgrep"
+            semgrep_cmd = (
+                f"{semgrep_install} && semgrep --config semgrep_rules.txt --json --output {SEMGREP_JSON_NAME}"
+            )
+            semgrep_stats = await _run_in_docker(
+                image, workspace, semgrep_cmd, run.semgrep_stdout, run.semgrep_stderr, args.timeout
+            )
+            if (workspace / SEMGREP_JSON_NAME).exists():
+                shutil.move(str(workspace / SEMGREP_JSON_NAME), str(run.semgrep_json))
+            run.semgrep_code = semgrep_stats["returncode"]
+            run.phases.append(_phase("semgrep", semgrep_stats))
+            run.semgrep_findings = semgrep_findings_count(run.semgrep_json)
+    else:
+        python = runtime.env_pythons.get(case_env_hash(case), sys.executable)
+        run.pytest_code, _, pytest_stats = await run_pytest_async(
+            str(workspace),
+            run.pytest_stdout,
+            run.pytest_stderr,
+            args.timeout,
+            python=python,
+            junit_path=run.junit_path,
+            workers=runtime.pytest_workers,
+        )
+        run.phases.append(_phase("pytest", pytest_stats))
+        if len(per_case_rules) > 0:
+            run.semgrep_code, run.semgrep_findings, semgrep_stats = await run_semgrep_async(
+                str(workspace), per_case_rules, run.semgrep_stdout, run.semgrep_stderr, args.timeout
+            )
+            run.phases.append(_phase("semgrep", semgrep_stats))
+
+
+async def _stage_static(runtime: _Runtime, run: _CaseRun) -> None:
+    if len(run.rules) == 0 or runtime.semgrep_batcher is None:
+        return
+    run.semgrep_code, run.semgrep_findings, semgrep_stats = await runtime.semgrep_batcher.check(
+        run.workspace, run.rules, run.semgrep_stdout
+    )
+    run.phases.append(_phase("semgrep", semgrep_stats))
+
+
+async def _stage_parse(args, run: _CaseRun) -> None:
+    if not args.llm_parse_output:
+        return
+    run.parse_result, parse_stats = await asyncio.to_thread(measure_call, _parse_output, run.agent.adapter, run, args.llm_model)
+    run.phases.append(_phase("parse", parse_stats))
+
+
+def _guarded(name: str, fn: Callable[[_CaseRun], Awaitable[None]]) -> Callable[[_CaseRun], Awaitable[None]]:
+    # An exception in one run's stage (a missing agent binary, a docker error)
+    # fails that run only: it is recorded and the run skips its remaining stages.
+    async def stage(run: _CaseRun) -> None:
+        if run.error:
+            return
+        try:
+            await fn(run)
+        except Exception as exc:
+            run.error = f"{name}: {type(exc).__name__}: {exc}"
+            print(f"{run.case['case_id']} ({run.agent.label}): {run.error}")
+
+    return stage
+
+
+def _case_result(run: _CaseRun) -> Dict[str, Any]:
+    case = run.case
+    tests = pytest_summary(run.junit_path, run.pytest_stdout)
+    passed = not run.error and evaluate_pass_condition(
+        case["acceptance_criteria"]["pass_condition"],
+        run.pytest_code,
+        run.semgrep_findings or 0,
+    )
+    parse_result = run.parse_result
+
+    ended_at = _utc_now()
+    duration = time.time() - run.t0 if run.t0 else 0.0
+
+    return {
+        "case_id": case["case_id"],
+        "agent_name": run.agent.name,
+        "agent_version": run.agent.version,
+        "repeat": run.repeat,
+        "category_id": case["vcfcst_category"]["level3_id"],
+        "difficulty": case["difficulty"],
+        "case_type": case["case_type"],
+        "passed": bool(passed),
+        "has_expected_defect": parse_result.get("has_expected_defect"),
+        "started_at": run.started_at,
+        "ended_at": ended_at,
+        "duration_sec": round(duration, 3),
+        "metrics": {
+            "pytest_exit_code": run.pytest_code,
+            "pytest_passed": tests["passed"],
+            "pytest_failed": tests["failed"],
+            "pytest_errors": tests["errors"],
+            "pytest_skipped": tests["skipped"],
+            "pytest_duration_sec": tests["duration_sec"],
+            "pytest_slowest": slowest_tests(tests),
+            "semgrep_exit_code": run.semgrep_code,
+            "semgrep_findings": run.semgrep_findings,
+            "phases": run.phases,
+        },
+        "artifacts": {
+            "run_dir": str(run.case_dir),
+            "workspace_dir": str(run.workspace),
+            "agent_stdout": str(run.agent_stdout),
+            "agent_stderr": str(run.agent_stderr),
+            "tests_stdout": str(run.pytest_stdout),
+            "tests_stderr": str(run.pytest_stderr),
+            "tests_junit": str(run.junit_path),
+            "patch": str(run.patch_path),
+        },
+        "agent_return_code": run.agent_code,
+        "changed_files": run.diff.changed_files() if run.diff is not None else [],
+        "code_change_summary": parse_result.get("code_change_summary", ""),
+        "failure_reason": run.error or parse_result.get("failure_reason", ""),
+        "reused": False,
+    }
+
+
+RunKey = Tuple[str, str, str, int]
+
+
+def _result_key(result: Dict[str, Any]) -> RunKey:
+    # Journals written before matrix runs have no repeat field: they were repeat 0.
+    return (result["agent_name"], result.get("agent_version") or "", result["case_id"], int(result.get("repeat") or 0))
+
+
+def _load_journal(path: Path) -> Dict[RunKey, Dict[str, Any]]:
+    done: Dict[RunKey, Dict[str, Any]] = {}
+    if not path.exists():
+        return done
+    data = path.read_bytes()
+    complete = data.rfind(b"\n") + 1
+    if complete < len(data):
+        # A crash mid-write leaves a truncated last line; drop it so that case is rerun
+        # and later appends start on a fresh line.
+        with path.open("r+b") as f:
+            f.truncate(complete)
+    for line in data[:complete].decode("utf-8").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        done[_result_key(item)] = item
+    return done
+
+
+def _batch_date(batch_dir: Path) -> str:
+    # benchmark-YYYYmmdd-HHMMSS -> YYYY-mm-dd, so a resumed batch keeps its partition.
+    try:
+        return time.strftime("%Y-%m-%d", time.strptime(batch_dir.name, "benchmark-%Y%m%d-%H%M%S"))
+    except ValueError:
+        return time.strftime("%Y-%m-%d")
+
+
+class _Journal:
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, result: Dict[str, Any]) -> None:
+        line = json.dumps(result, ensure_ascii=False) + "\n"
+        with self._lock:
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def _agent_cmd(adapter: Dict[str, Any], override: List[str]) -> List[str]:
+    cmd = list(override)
+    if not cmd:
+        cmd = ((adapter.get("call_config") or {}).get("cmd", "") or "").split()
+    if not cmd:
+        raise SystemExit(
+            f"agent command is required for {adapter.get('agent_name', 'unknown')} "
+            "(use --agent-cmd or set call_config.cmd)"
+        )
+    repo_root = Path(__file__).resolve().parents[1]
+    resolved_cmd = []
+    for part in cmd:
+        if not os.path.isabs(part):
+            candidate = repo_root / part
+            if candidate.exists():
+                resolved_cmd.append(str(candidate))
+                continue
+        resolved_cmd.append(part)
+    return resolved_cmd
+
+
+def _agent_concurrency(args, adapter: Dict[str, Any]) -> int:
+    if args.agent_concurrency > 0:
+        return args.agent_concurrency
+    cap = int((adapter.get("call_config") or {}).get("max_concurrency") or 0)
+    return cap if cap > 0 else args.workers
+
+
+def _test_concurrency(args) -> int:
+    if args.test_concurrency > 0:
+        return args.test_concurrency
+    return max(1, min(args.workers, os.cpu_count() or 1))
+
+
+def _matrix(agents: List[_Agent], cases: List[Dict[str, Any]], repeats: int, batch_dir: Path) -> List[_CaseRun]:
+    # The (repeat x case x agent) cross product, agents interleaved case by case
+    # so every agent advances at the same pace through the shared pipeline. Each
+    # case's seed files and content hash are computed once for all its runs. A
+    # single agent without repeats keeps the flat <batch>/<case_id> layout.
+    nested = len(agents) > 1 or repeats > 1
+    prepared = [(case, _seed_files(case), case_content_hash(case)) for case in cases]
+    runs: List[_CaseRun] = []
+    for repeat in range(repeats):
+        for case, seeded, digest in prepared:
+            for agent in agents:
+                case_dir = batch_dir / agent.label / f"r{repeat}" / case["case_id"] if nested else batch_dir / case["case_id"]
+                runs.append(_CaseRun(len(runs), case, case_dir, agent, repeat, seeded, digest))
+    return runs
+
+
+def _run_key(run: _CaseRun) -> RunKey:
+    return (run.agent.name, run.agent.version, run.case["case_id"], run.repeat)
+
+
+def _store_key(run: _CaseRun) -> Dict[str, Any]:
+    return store_key(run.agent.name, run.agent.version, run.agent.template_hash, run.digest, run.repeat)
+
+
+# Exit codes of the shell or docker rather than of the command it ran: docker
+# could not run the container (125), the command is not executable (126) or not
+# found (127).
+_INFRA_EXIT_CODES = (125, 126, 127)
+
+
+def _reusable(run: _CaseRun) -> bool:
+    # Only runs whose agent and tests ran to completion go to the result store;
+    # a timeout or an infrastructure failure is rerun by the next --reuse-results.
+    if run.error or run.agent_code is None:
+        return False
+    if any(phase["timed_out"] for phase in run.phases):
+        return False
+    return not {run.agent_code, run.pytest_code, run.semgrep_code} & set(_INFRA_EXIT_CODES)
+
+
+def _stratum(run: _CaseRun) -> Tuple[str, str]:
+    category = run.case.get("vcfcst_category") or {}
+    return (str(category.get("level1") or ""), str(run.case.get("difficulty") or ""))
+
+
+async def _run_cases(
+    args,
+    agents: List[_Agent],
+    runs: List[_CaseRun],
+    batch_dir: Path,
+    journal: _Journal,
+    writer: Optional[ResultWriter] = None,
+    sampler: Optional[AdaptiveSampler] = None,
+    store: Optional[ResultStore] = None,
+) -> List[Dict[str, Any]]:
+    # Every run has its own workspace under batch_dir and the heavy lifting
+    # happens in agent/pytest subprocesses, so one event loop drives them all.
+    # With a sampler, only the runs it hands out are executed.
+    cases = list({run.case["case_id"]: run.case for run in runs}.values())
+    for agent in agents:
+        agent.slots = asyncio.Semaphore(agent.concurrency)
+    runtime = _Runtime()
+    if args.seed_mode != "write":
+        runtime.seed_cache = SeedCache(args.seed_cache or str(Path(args.run_dir) / "seed_cache"), args.seed_mode)
+    with_semgrep = any(_listify(c["acceptance_criteria"].get("static_check_rules")) for c in cases)
+    in_flight = max(1, args.workers)
+    if with_semgrep and args.semgrep_batch > 1:
+        # A batch can only fill from cases in flight at once, and cases waiting
+        # in the batcher hold their slots.
+        runtime.semgrep_batcher = SemgrepBatcher(
+            batch_dir / "semgrep_batches",
+            batch_size=min(args.semgrep_batch, in_flight),
+            linger_sec=args.semgrep_linger,
+            timeout=args.timeout,
+            docker_image=args.semgrep_image if args.use_docker else "",
+            in_flight=lambda: runtime.in_flight,
+        )
+        # Test environments no longer need semgrep installed.
+        with_semgrep = False
+    if args.env_cache:
+        cache = EnvCache(args.env_cache, with_semgrep=with_semgrep and args.use_docker)
+        for digest, env in unique_envs(cases).items():
+            if args.use_docker:
+                runtime.env_images[digest] = await asyncio.to_thread(
+                    cache.image_for, env["base_image"], env["requirements"]
+                )
+            else:
+                try:
+                    python = await asyncio.to_thread(cache.venv_for, env["base_image"], env["requirements"])
+                except PythonVersionMismatch as exc:
+                    # Never test against a different python than the case's
+                    # image: build its docker image instead.
+                    if shutil.which("docker") is None:
+                        raise SystemExit(f"{exc}; install it or make docker available") from exc
+                    print(f"env {digest}: {exc}, testing in docker instead")
+                    runtime.env_images[digest] = await asyncio.to_thread(
+                        cache.image_for, env["base_image"], env["requirements"]
+                    )
+                    runtime.docker_envs.add(digest)
+                else:
+                    runtime.env_pythons[digest] = str(python)
+    if args.pytest_mode == "fork" and not args.use_docker:
+        runtime.pytest_workers = PytestWorkerPool(size=args.workers)
+    if args.use_docker and args.container_pool > 0:
+        runtime.container_pool = ContainerPool(max_idle_per_key=args.container_pool, with_semgrep=with_semgrep)
+        counts: Dict[PoolKey, int] = {}
+        for run in runs:
+            key = _case_pool_key(run.case, runtime)
+            counts[key] = counts.get(key, 0) + 1
+        await runtime.container_pool.prewarm(counts)
+
+    # agent -> collect -> test -> static -> parse, each stage with its own
+    # concurrency and a bounded queue in front of it; --workers caps the cases
+    # in flight across the whole pipeline. Each agent's own cap is enforced at
+    # admission (see _admit), so the agent stage never waits on it.
+    stages = [
+        Stage(
+            "agent",
+            _guarded("agent", lambda run: _stage_agent(args, runtime, run)),
+            min(in_flight, sum(agent.concurrency for agent in agents)),
+            in_flight,
+        ),
+        Stage("collect", _guarded("collect", lambda run: _stage_collect(args, run)), in_flight, in_flight),
+        Stage(
+            "test", _guarded("test", lambda run: _stage_test(args, runtime, run)), _test_concurrency(args), in_flight
+        ),
+        Stage("static", _guarded("static", lambda run: _stage_static(runtime, run)), in_flight, in_flight),
+        Stage(
+            "parse",
+            _guarded("parse", lambda run: _stage_parse(args, run)),
+            args.parse_concurrency or in_flight,
+            in_flight,
+        ),
+    ]
+
+    async def _admit(next_run: Callable[[_Agent], Optional[_CaseRun]]):
+        # A run is admitted only once its agent has a free slot. Runs of an agent
+        # at its cap wait here, outside the pipeline, instead of taking in-flight
+        # slots and agent-stage workers that other agents' runs could use. Agents
+        # with a free slot take turns; next_run(agent) is None once it has no more.
+        active = list(agents)
+        turn = 0
+        while active:
+            ready = [active[(turn + k) % len(active)] for k in range(len(active))]
+            ready = [agent for agent in ready if not agent.slots.locked()]
+            if not ready:
+                runtime.agent_freed.clear()
+                await runtime.agent_freed.wait()
+                continue
+            agent = ready[0]
+            run = next_run(agent)
+            if run is None:
+                active.remove(agent)
+                continue
+            await agent.slots.acquire()
+            turn = (active.index(agent) + 1) % len(active)
+            runtime.in_flight += 1
+            yield run
+
+    if sampler is None:
+        # Each agent's runs in run order, drawn from the end.
+        queues: Dict[_Agent, List[_CaseRun]] = {agent: [] for agent in agents}
+        for run in reversed(runs):
+            queues[run.agent].append(run)
+
+        def next_run(agent: _Agent) -> Optional[_CaseRun]:
+            return queues[agent].pop() if queues[agent] else None
+
+    else:
+
+        def next_run(agent: _Agent) -> Optional[_CaseRun]:
+            return sampler.next_run(agent.label)
+
+    def _finish(run: _CaseRun) -> None:
+        runtime.in_flight -= 1
+        if runtime.semgrep_batcher is not None:
+            # Fewer runs in flight: the ones waiting for a batch may be all that is left.
+            runtime.semgrep_batcher.poke()
+        run.result = _case_result(run)
+        journal.append(run.result)
+        if writer is not None:
+            writer.write(run.result)
+        if sampler is not None:
+            sampler.observe(run, run.result["passed"])
+        if store is not None and _reusable(run):
+            store.put(_store_key(run), run.result)
+
+    t0 = time.perf_counter()
+    try:
+        await run_pipeline(stages, _admit(next_run), _finish, max_in_flight=in_flight)
+        # Results keep run order so the output matches the serial path.
+        return [run.result for run in runs if run.result]
+    finally:
+        stats = {
+            "cases": sum(1 for run in runs if run.result),
+            "agents": [agent.label for agent in agents],
+            "workers": in_flight,
+            "wall_sec": round(time.perf_counter() - t0, 3),
+            "stages": [stage.stats() for stage in stages],
+        }
+        (batch_dir / "pipeline_stats.json").write_text(json.dumps(stats, indent=2), encoding="utf-8")
+        for stage in stats["stages"]:
+            print(
+                f"stage {stage['stage']:<8} processed={stage['processed']} "
+                f"throughput={stage['throughput_per_sec']}/s utilization={stage['utilization']} "
+                f"max_queue={stage['max_queue_depth']} mean_queue={stage['mean_queue_depth']}"
+            )
+        if runtime.container_pool is not None:
+            await runtime.container_pool.close()
+        if runtime.pytest_workers is not None:
+            await runtime.pytest_workers.close()
+
+
 def main():
     ap = argparse.ArgumentParser(description="VC-FCST Benchmark Orchestrator (MVP)")
     ap.add_argument("--case-bank", required=True, help="Case bank parquet path")
-    ap.add_argument("--agent-config", required=True, help="Agent adapter config yaml")
-    ap.add_argument("--agent-cmd", nargs="+", default=[], help="Agent command (CLI mode)")
-    ap.add_argument("--out", default="runs/benchmark_results.parquet", help="Result parquet")
+    ap.add_argument(
+        "--agent-config",
+        required=True,
+        nargs="+",
+        action="extend",
+        help="Agent adapter config yaml; several run as one matrix over the same cases",
+    )
+    ap.add_argument(
+        "--agent-cmd", nargs="+", default=[], help="Agent command (CLI mode, single --agent-config only)"
+    )
+    ap.add_argument("--repeats", type=int, default=1, help="Run every (agent, case) pair K times")
+    ap.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Sample runs stratified by level1 x difficulty and stop each agent at --target-precision",
+    )
+    ap.add_argument(
+        "--target-precision",
+        type=float,
+        default=0.05,
+        help="With --adaptive: stop an agent once its 95%% pass-rate interval half-width is at most this",
+    )
+    ap.add_argument(
+        "--min-per-stratum", type=int, default=2, help="With --adaptive: runs per stratum before stopping is allowed"
+    )
+    ap.add_argument("--adaptive-seed", type=int, default=0, help="With --adaptive: seed of the sampling order")
+    ap.add_argument(
+        "--out",
+        default=None,
+        help="Result parquet (default: runs/benchmark_results.parquet unless --out-dataset is given)",
+    )
+    ap.add_argument(
+        "--out-dataset",
+        default="",
+        help="Stream results into a parquet dataset partitioned by agent_name/run_date under this dir",
+    )
+    ap.add_argument("--row-group-size", type=int, default=64, help="Results per --out-dataset row group")
     ap.add_argument("--run-dir", default="runs", help="Run artifacts root")
     ap.add_argument("--category-id", default="", help="Filter by category id")
     ap.add_argument("--difficulty", default="", help="Filter by difficulty")
     ap.add_argument("--case-id", action="append", default=[], help="Filter by case id")
     ap.add_argument("--limit", type=int, default=0, help="Limit number of cases")
     ap.add_argument("--timeout", type=int, default=600)
+    ap.add_argument("--workers", type=int, default=1, help="Number of cases in flight across all stages")
+    ap.add_argument(
+        "--agent-concurrency",
+        type=int,
+        default=0,
+        help="Max concurrent runs per agent (default: call_config.max_concurrency or --workers)",
+    )
+    ap.add_argument(
+        "--test-concurrency",
+        type=int,
+        default=0,
+        help="Max concurrent pytest runs (default: min(--workers, CPU count))",
+    )
+    ap.add_argument(
+        "--parse-concurrency", type=int, default=0, help="Max concurrent --llm-parse-output calls (default: --workers)"
+    )
+    ap.add_argument("--resume", default="", help="Resume an interrupted batch dir, skipping finished cases")
+    ap.add_argument(
+        "--reuse-results",
+        action="store_true",
+        help="Take results from --result-store for runs whose agent name/version, adapter templates and case "
+        "content are unchanged, and store new results there",
+    )
+    ap.add_argument("--result-store", default="runs/result_store", help="Cross-run result store dir")
     ap.add_argument("--use-docker", action="store_true", help="Run tests in Docker")
+    ap.add_argument(
+        "--pytest-mode",
+        choices=["subprocess", "fork"],
+        default="subprocess",
+        help="Host tests only: fork: run pytest in children forked from warm, pre-imported workers",
+    )
+    ap.add_argument(
+        "--container-pool",
+        type=int,
+        default=0,
+        help="With --use-docker: keep up to N warm, network-less containers per (image, deps) and reuse them",
+    )
+    ap.add_argument(
+        "--env-cache",
+        default="",
+        help="Build each unique (base_image, deps) env once under this dir and reuse it (see env_cache.py)",
+    )
+    ap.add_argument(
+        "--semgrep-batch",
+        type=int,
+        default=0,
+        help="Run one semgrep over up to N finished workspaces sharing the same rules (<=1: per case)",
+    )
+    ap.add_argument(
+        "--semgrep-linger", type=float, default=2.0, help="Seconds a partial semgrep batch waits for more cases"
+    )
+    ap.add_argument(
+        "--semgrep-image", default="semgrep/semgrep", help="Image for batched semgrep when --use-docker is set"
+    )
+    ap.add_argument(
+        "--seed-mode",
+        choices=["write"] + SEED_MODES,
+        default="auto",
+        help="How workspaces are seeded: write every file, or clone a cached per-case template "
+        "(auto tries reflink, then copies)",
+    )
+    ap.add_argument("--seed-cache", default="", help="Seed template dir (default: <run-dir>/seed_cache)")
+    ap.add_argument(
+        "--bank-cache", default="", help="Parquet copies of JSONL case banks (default: <run-dir>/bank_cache)"
+    )
+    ap.add_argument(
+        "--max-blob-kb",
+        type=int,
+        default=DEFAULT_MAX_BLOB_BYTES // 1024,
+        help="Changed files larger than this are listed in the patch as binary, not read",
+    )
     ap.add_argument("--llm-adapt-input", action="store_true")
     ap.add_argument("--llm-parse-output", action="store_true")
     ap.add_argument("--llm-model", default="")
+    ap.add_argument("--llm-cache", default="", help="Cache adapter LLM responses under this dir")
     args = ap.parse_args()
+    if args.out is None and not args.out_dataset:
+        args.out = "runs/benchmark_results.parquet"
+
+    if args.agent_cmd and len(args.agent_config) > 1:
+        raise SystemExit("--agent-cmd only applies to a single --agent-config; set call_config.cmd instead")
+    agents = []
+    for config in args.agent_config:
+        adapter = load_adapter(config)
+        agents.append(_Agent(adapter, _agent_cmd(adapter, args.agent_cmd), _agent_concurrency(args, adapter)))
+    seen = set()
+    for agent in agents:
+        if (agent.name, agent.version) in seen:
+            raise SystemExit(f"duplicate agent {agent.name} {agent.version}: results would be indistinguishable")
+        seen.add((agent.name, agent.version))
+    df = scan_case_bank(
+        args.case_bank,
+        args.category_id,
+        args.difficulty,
+        args.case_id or None,
+        args.limit,
+        cache_dir=args.bank_cache or str(Path(args.run_dir) / "bank_cache"),
+    )
 
-    adapter = load_adapter(args.agent_config)
-    if not args.agent_cmd:
-        cmd = (adapter.get("call_config") or {}).get("cmd", "")
-        if cmd:
-            args.agent_cmd = cmd.split()
-    if not args.agent_cmd:
-        raise SystemExit("agent command is required (use --agent-cmd or set call_config.cmd)")
-    repo_root = Path(__file__).resolve().parents[1]
-    resolved_cmd = []
-    for part in args.agent_cmd:
-        if not os.path.isabs(part):
-            candidate = repo_root / part
-            if candidate.exists():
-                resolved_cmd.append(str(candidate))
+    if args.resume:
+        batch_dir = Path(args.resume)
+        if not batch_dir.is_dir():
+            raise SystemExit(f"resume dir not found: {batch_dir}")
+    else:
+        run_root = Path(args.run_dir)
+        run_root.mkdir(parents=True, exist_ok=True)
+        batch_dir = run_root / f"benchmark-{time.strftime('%Y%m%d-%H%M%S')}"
+        batch_dir.mkdir(parents=True, exist_ok=True)
+
+    llm_cache = None
+    if args.llm_cache and (args.llm_adapt_input or args.llm_parse_output):
+        llm_cache = LLMCache(args.llm_cache)
+        set_cache(llm_cache)
+
+    journal_path = batch_dir / "results.jsonl"
+    journal = _Journal(journal_path)
+    done = _load_journal(journal_path)
+    cases = [row.to_dict() for _, row in df.iterrows()]
+    runs = _matrix(agents, cases, max(1, args.repeats), batch_dir)
+    pending = [run for run in runs if _run_key(run) not in done]
+    if done:
+        print(f"resume: {len(runs) - len(pending)} runs already done, {len(pending)} to run")
+    store = None
+    if args.reuse_results:
+        store = ResultStore(args.result_store)
+        # Reused results go into this batch's journal (so --resume does not look
+        # them up again) and its --out file, which is this batch's complete result
+        # set. They are not written to --out-dataset: the dataset accumulates
+        # batches and already holds the run they were taken from.
+        remaining = []
+        for run in pending:
+            stored = store.get(_store_key(run))
+            if stored is None:
+                remaining.append(run)
                 continue
-        resolved_cmd.append(part)
-    args.agent_cmd = resolved_cmd
-    df = load_case_bank(args.case_bank)
-    df = filter_cases(df, args.category_id, args.difficulty, args.case_id or None)
-    if args.limit > 0:
-        df = df.head(args.limit)
-
-    run_root = Path(args.run_dir)
-    run_root.mkdir(parents=True, exist_ok=True)
-    batch_dir = run_root / f"benchmark-{time.strftime('%Y%m%d-%H%M%S')}"
-    batch_dir.mkdir(parents=True, exist_ok=True)
-
-    results: List[Dict[str, Any]] = []
-
-    for _, row in df.iterrows():
-        case = row.to_dict()
-        case_id = case["case_id"]
-        case_dir = batch_dir / case_id
-        workspace = case_dir / "workspace"
-        workspace.mkdir(parents=True, exist_ok=True)
-
-        _write_files(workspace, case["initial_code"])
-        _write_files(workspace, case["acceptance_criteria"]["test_code"])
-        _ensure_requirements(workspace, case["env_config"]["dependencies"])
-
-        started_at = _utc_now()
-        t0 = time.time()
-
-        agent_stdout = case_dir / "agent.stdout.log"
-        agent_stderr = case_dir / "agent.stderr.log"
-        prompt = render_input(adapter, case)
-        if args.llm_adapt_input:
-            prompt = adapt_input_with_llm(adapter, prompt, model=args.llm_model)
-        agent_code = _run_agent(args.agent_cmd, prompt, str(workspace), agent_stdout, agent_stderr, args.timeout)
-
-        final_code = _collect_final_code(workspace)
-        changed_files = _changed_files(case["initial_code"], final_code)
-        parse_result = {}
-        if args.llm_parse_output:
-            try:
-                parse_result = parse_output_with_llm(
-                    adapter,
-                    agent_stdout.read_text(encoding="utf-8"),
-                    final_code,
-                    args.llm_model,
-                )
-            except Exception:
-                parse_result = {}
-
-        pytest_stdout = case_dir / "pytest.stdout.log"
-        pytest_stderr = case_dir / "pytest.stderr.log"
-        semgrep_stdout = case_dir / "semgrep.stdout.log"
-        semgrep_stderr = case_dir / "semgrep.stderr.log"
-
-        pytest_code = 1
-        pytest_failed = None
-        semgrep_code = None
-        semgrep_findings = None
-
-        if args.use_docker:
-            image = case["env_config"]["base_image"]
-            install = "pip install -r requirements.txt"
-            pytest_cmd = f"{install} && pytest -q"
-            pytest_code = _run_in_docker(image, workspace, pytest_cmd, pytest_stdout, pytest_stderr, args.timeout)
-            pytest_failed = None
-            rules = _listify(case["acceptance_criteria"].get("static_check_rules"))
-            if len(rules) > 0:
-                _write_rules(workspace, rules)
-                semgrep_cmd = f"{install} && pip install semgrep && semgrep --config semgrep_rules.txt --json"
-                semgrep_code = _run_in_docker(image, workspace, semgrep_cmd, semgrep_stdout, semgrep_stderr, args.timeout)
-                semgrep_findings = 0
-        else:
-            pytest_code, pytest_failed = run_pytest(str(workspace), pytest_stdout, pytest_stderr)
-            rules = _listify(case["acceptance_criteria"].get("static_check_rules"))
-            if len(rules) > 0:
-                semgrep_code, semgrep_findings = run_semgrep(str(workspace), rules, semgrep_stdout, semgrep_stderr)
-
-        passed = evaluate_pass_condition(
-            case["acceptance_criteria"]["pass_condition"],
-            pytest_code,
-            semgrep_findings or 0,
+            result = dict(stored, repeat=run.repeat, reused=True)
+            journal.append(result)
+            done[_run_key(run)] = result
+        print(f"reuse: {len(pending) - len(remaining)} runs from {args.result_store}, {len(remaining)} to run")
+        pending = remaining
+    sampler = None
+    if args.adaptive:
+        sampler = AdaptiveSampler(
+            runs,
+            lambda run: run.agent.label,
+            _stratum,
+            args.target_precision,
+            args.min_per_stratum,
+            seed=args.adaptive_seed,
         )
-
-        ended_at = _utc_now()
-        duration = time.time() - t0
-
-        result = {
-            "case_id": case_id,
-            "agent_name": adapter.get("agent_name", "unknown"),
-            "agent_version": adapter.get("agent_version", ""),
-            "category_id": case["vcfcst_category"]["level3_id"],
-            "difficulty": case["difficulty"],
-            "case_type": case["case_type"],
-            "passed": bool(passed),
-            "has_expected_defect": parse_result.get("has_expected_defect"),
-            "started_at": started_at,
-            "ended_at": ended_at,
-            "duration_sec": round(duration, 3),
-            "metrics": {
-                "pytest_exit_code": pytest_code,
-                "pytest_failed": pytest_failed,
-                "semgrep_exit_code": semgrep_code,
-                "semgrep_findings": semgrep_findings,
-            },
-            "artifacts": {
-                "run_dir": str(case_dir),
-                "workspace_dir": str(workspace),
-                "agent_stdout": str(agent_stdout),
-                "agent_stderr": str(agent_stderr),
-                "tests_stdout": str(pytest_stdout),
-                "tests_stderr": str(pytest_stderr),
-            },
-            "agent_return_code": agent_code,
-            "changed_files": changed_files,
-            "code_change_summary": parse_result.get("code_change_summary", ""),
-            "failure_reason": parse_result.get("failure_reason", ""),
-        }
-        results.append(result)
-
-    try:
-        import pandas as pd  # type: ignore
-
-        out_path = Path(args.out)
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-        pd.DataFrame(results).to_parquet(out_path, index=False)
-    except Exception as exc:
-        raise SystemExit("pandas/pyarrow required for parquet output") from exc
+        for run in runs:
+            if _run_key(run) in done:
+                sampler.observe(run, done[_run_key(run)]["passed"])
+    writer = None
+    if args.out_dataset:
+        writer = ResultWriter(args.out_dataset, batch_dir.name, _batch_date(batch_dir), args.row_group_size)
+        # The batch's file is rewritten whole, so a resumed batch still ends up
+        # with every result it ran in it.
+        writer.write_many(
+            done[_run_key(run)] for run in runs if _run_key(run) in done and not done[_run_key(run)].get("reused")
+        )
+    for result in asyncio.run(_run_cases(args, agents, pending, batch_dir, journal, writer, sampler, store)):
+        done[_result_key(result)] = result
+    if writer is not None:
+        for path in writer.close():
+            print(f"results: {path}")
+    results = [done[_run_key(run)] for run in runs if _run_key(run) in done]
+    if sampler is not None:
+        summary = sampler.summary()
+        (batch_dir / "adaptive.json").write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+        for item in summary:
+            interval = "n/a" if item["half_width"] is None else f"{item['pass_rate']:.3f} +/- {item['half_width']:.3f}"
+            state = "settled" if item["settled"] else "not settled"
+            print(f"adaptive {item['agent']}: {item['runs']}/{item['planned']} runs, pass rate {interval} ({state})")
+    if len(agents) > 1 or args.repeats > 1:
+        for agent in agents:
+            mine = [r for r in results if (r["agent_name"], r.get("agent_version") or "") == (agent.name, agent.version)]
+            print(f"agent {agent.label}: passed {sum(1 for r in mine if r['passed'])}/{len(mine)}")
+    if llm_cache is not None:
+        print("llm cache:", llm_cache.stats())
+
+    if args.out:
+        write_results(Path(args.out), results)
 
 
 if __name__ == "__main__":
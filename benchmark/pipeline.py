@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+import asyncio
+import time
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+
+
+class Stage:
+    # One pipeline stage: a bounded input queue drained by `concurrency` workers
+    # that each await fn(item). Records what run_pipeline reports per stage.
+    def __init__(
+        self, name: str, fn: Callable[[Any], Awaitable[None]], concurrency: int = 1, maxsize: int = 0
+    ):
+        self.name = name
+        self.fn = fn
+        self.concurrency = max(1, concurrency)
+        self.queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize)
+        self.processed = 0
+        self.busy_sec = 0.0
+        self.max_queue_depth = 0
+        self._depth_sum = 0
+        self._depth_samples = 0
+        self._first_start: Optional[float] = None
+        self._last_end: Optional[float] = None
+
+    def _sample(self) -> None:
+        depth = self.queue.qsize()
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        self._depth_sum += depth
+        self._depth_samples += 1
+
+    async def put(self, item: Any) -> None:
+        await self.queue.put(item)
+        self._sample()
+
+    async def get(self) -> Any:
+        item = await self.queue.get()
+        self._sample()
+        return item
+
+    def record(self, start: float, end: float) -> None:
+        self.processed += 1
+        self.busy_sec += end - start
+        if self._first_start is None:
+            self._first_start = start
+        self._last_end = end
+
+    def stats(self) -> Dict[str, Any]:
+        span = (self._last_end - self._first_start) if self._first_start is not None else 0.0
+        return {
+            "stage": self.name,
+            "concurrency": self.concurrency,
+            "processed": self.processed,
+            "busy_sec": round(self.busy_sec, 3),
+            "span_sec": round(span, 3),
+            "throughput_per_sec": round(self.processed / span, 3) if span > 0 else None,
+            # Share of the stage's worker time spent working while it was active.
+            "utilization": round(self.busy_sec / (span * self.concurrency), 3) if span > 0 else None,
+            "max_queue_depth": self.max_queue_depth,
+            "mean_queue_depth": round(self._depth_sum / self._depth_samples, 3) if self._depth_samples else 0,
+        }
+
+
+async def run_pipeline(
+    stages: List[Stage],
+    items: Union[Iterable[Any], AsyncIterable[Any]],
+    on_done: Callable[[Any], None],
+    max_in_flight: int = 1,
+) -> None:
+    # Pushes every item through the stages in order. At most max_in_flight items
+    # are admitted at once; a full downstream queue blocks the upstream worker
+    # holding the item (backpressure). on_done(item) runs after the last stage.
+    # The first exception raised by any stage cancels the pipeline and is re-raised.
+    # items is consumed lazily, one item per free slot, so a generator can decide
+    # what to run next from the results on_done has seen so far. An async
+    # iterable may also hold the free slot until its next item is ready.
+    if not stages:
+        return
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(max(1, max_in_flight))
+    finished = loop.create_future()
+    failed = loop.create_future()
+    # [admitted, completed, feed exhausted]
+    counts = [0, 0, False]
+
+    def _check_finished() -> None:
+        if counts[2] and counts[0] == counts[1] and not finished.done():
+            finished.set_result(None)
+
+    async def _feed() -> None:
+        async_iterator = items.__aiter__() if isinstance(items, AsyncIterable) else None
+        iterator = iter(items) if async_iterator is None else None
+        while True:
+            await slots.acquire()
+            try:
+                item = next(iterator) if async_iterator is None else await async_iterator.__anext__()
+            except (StopIteration, StopAsyncIteration):
+                break
+            except Exception as exc:
+                if not failed.done():
+                    failed.set_exception(exc)
+                return
+            counts[0] += 1
+            await stages[0].put(item)
+        counts[2] = True
+        _check_finished()
+
+    async def _work(index: int) -> None:
+        stage = stages[index]
+        while True:
+            item = await stage.get()
+            start = time.perf_counter()
+            try:
+                await stage.fn(item)
+            except Exception as exc:
+                if not failed.done():
+                    failed.set_exception(exc)
+                return
+            finally:
+                stage.record(start, time.perf_counter())
+            if index + 1 < len(stages):
+                await stages[index + 1].put(item)
+                continue
+            try:
+                on_done(item)
+            except Exception as exc:
+                if not failed.done():
+                    failed.set_exception(exc)
+                return
+            slots.release()
+            counts[1] += 1
+            _check_finished()
+
+    tasks = [asyncio.ensure_future(_feed())]
+    for index, stage in enumerate(stages):
+        tasks.extend(asyncio.ensure_future(_work(index)) for _ in range(stage.concurrency))
+    try:
+        await asyncio.wait([finished, failed], return_when=asyncio.FIRST_COMPLETED)
+        if failed.done():
+            failed.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
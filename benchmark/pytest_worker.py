@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# Warm pytest worker. Run as a script (with the python that should execute the
+# tests) it imports pytest and its plugins once, then serves JSON-line requests on
+# stdin: each request forks a child that chdirs into the workspace, resets
+# sys.path and runs pytest.main, so no test state leaks between cases. The
+# PytestWorkerPool below drives these workers from the orchestrator.
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from instrument import USAGE_KEYS, usage_from_rusage
+
+WORKER_SCRIPT = Path(__file__).resolve()
+_POLL_SEC = 0.005
+
+
+def _preload() -> None:
+    import pytest  # noqa: F401  (warms the import cache for forked children)
+
+    try:
+        from importlib.metadata import entry_points
+
+        eps = entry_points()
+        group = eps.select(group="pytest11") if hasattr(eps, "select") else eps.get("pytest11", [])
+        for ep in group:
+            try:
+                ep.load()
+            except Exception:
+                continue
+    except Exception:
+        pass
+
+
+def _child(req: Dict[str, Any], base_path: List[str]) -> None:
+    # Runs in the forked child and never returns.
+    code = 70
+    try:
+        os.setsid()
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        out = os.open(req["stdout"], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        err = os.open(req["stderr"], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.dup2(devnull, 0)
+        os.dup2(out, 1)
+        os.dup2(err, 2)
+        os.chdir(req["cwd"])
+        sys.path[:] = [req["cwd"]] + base_path
+        sys.argv = ["pytest"] + list(req["args"])
+        import pytest
+
+        code = int(pytest.main(list(req["args"])))
+    except SystemExit as exc:
+        code = exc.code if isinstance(exc.code, int) else 1
+    except BaseException:
+        import traceback
+
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def _serve_one(req: Dict[str, Any], base_path: List[str]) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        _child(req, base_path)
+    deadline = t0 + float(req.get("timeout") or 600)
+    timed_out = False
+    while True:
+        # wait4 also returns the child's rusage (pytest plus anything it spawned
+        # and waited for).
+        done, status, ru = os.wait4(pid, os.WNOHANG)
+        if done:
+            break
+        if time.perf_counter() >= deadline:
+            timed_out = True
+            for target in (lambda: os.killpg(pid, signal.SIGKILL), lambda: os.kill(pid, signal.SIGKILL)):
+                try:
+                    target()
+                except (ProcessLookupError, PermissionError):
+                    pass
+            _, status, ru = os.wait4(pid, 0)
+            break
+        time.sleep(_POLL_SEC)
+    try:
+        # Helpers the tests spawned die with their session.
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+    reply = {
+        "id": req.get("id"),
+        "returncode": os.waitstatus_to_exitcode(status),
+        "wall_sec": round(time.perf_counter() - t0, 3),
+        "first_output_sec": None,
+        "timed_out": timed_out,
+    }
+    reply.update(usage_from_rusage(ru))
+    return reply
+
+
+def serve() -> None:
+    _preload()
+    base_path = [p for p in sys.path if p not in ("", os.getcwd(), str(WORKER_SCRIPT.parent))]
+    channel = sys.stdout
+    print(json.dumps({"ready": True, "pid": os.getpid()}), file=channel, flush=True)
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            reply = _serve_one(json.loads(line), base_path)
+        except Exception as exc:
+            reply = {"error": f"{type(exc).__name__}: {exc}"}
+        print(json.dumps(reply), file=channel, flush=True)
+
+
+class _Worker:
+    def __init__(self, proc: asyncio.subprocess.Process):
+        self.proc = proc
+        self.seq = 0
+
+
+class PytestWorkerPool:
+    # Warm workers per python executable (host python or env_cache venvs). Each
+    # worker serves one request at a time; callers fall back to a plain pytest
+    # subprocess when run() raises.
+    def __init__(self, size: int = 1):
+        self.size = max(1, size)
+        self._idle: Dict[str, List[_Worker]] = {}
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._all: List[_Worker] = []
+
+    async def _spawn(self, python: str) -> _Worker:
+        proc = await asyncio.create_subprocess_exec(
+            python,
+            "-u",
+            str(WORKER_SCRIPT),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        worker = _Worker(proc)
+        self._all.append(worker)
+        try:
+            hello = await asyncio.wait_for(proc.stdout.readline(), timeout=60)
+            if not json.loads(hello or b"{}").get("ready"):
+                raise RuntimeError("pytest worker failed to start")
+        except BaseException:
+            await self._discard(worker)
+            raise
+        return worker
+
+    async def _discard(self, worker: _Worker) -> None:
+        if worker in self._all:
+            self._all.remove(worker)
+        if worker.proc.returncode is None:
+            try:
+                os.killpg(worker.proc.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+            await worker.proc.wait()
+
+    async def run(
+        self,
+        python: str,
+        cwd: str,
+        args: List[str],
+        stdout_path: Path,
+        stderr_path: Path,
+        timeout: int = 600,
+    ) -> Dict[str, Any]:
+        slots = self._slots.setdefault(python, asyncio.Semaphore(self.size))
+        async with slots:
+            idle = self._idle.setdefault(python, [])
+            worker = idle.pop() if idle else await self._spawn(python)
+            healthy = False
+            try:
+                worker.seq += 1
+                req = {
+                    "id": worker.seq,
+                    "cwd": str(Path(cwd).resolve()),
+                    "args": args,
+                    "stdout": str(Path(stdout_path).resolve()),
+                    "stderr": str(Path(stderr_path).resolve()),
+                    "timeout": timeout,
+                }
+                worker.proc.stdin.write((json.dumps(req) + "\n").encode("utf-8"))
+                await worker.proc.stdin.drain()
+                # The worker enforces the timeout itself; the grace covers fork/kill.
+                line = await asyncio.wait_for(worker.proc.stdout.readline(), timeout=timeout + 30)
+                reply = json.loads(line or b"{}")
+                if reply.get("id") != worker.seq:
+                    raise RuntimeError(reply.get("error") or "pytest worker exited")
+                healthy = True
+                keys = ("returncode", "wall_sec", "first_output_sec", "timed_out") + USAGE_KEYS
+                return {k: reply.get(k) for k in keys}
+            finally:
+                if healthy:
+                    idle.append(worker)
+                else:
+                    await self._discard(worker)
+
+    async def close(self) -> None:
+        self._idle.clear()
+        await asyncio.gather(*(self._discard(w) for w in list(self._all)))
+
+
+if __name__ == "__main__":
+    serve()
@@ -1,39 +1,20 @@
 #!/usr/bin/env python3
 import argparse
 import json
+import shutil
 from pathlib import Path
 from typing import Any, Dict, List
 
 from case_bank import load_schema, validate_case
-from adapter_llm import _env_with_filters
-from deepseek_client import chat_complete
-
-
-def _load_items(path: Path) -> List[Dict[str, Any]]:
-    items = []
-    for line in path.read_text(encoding="utf-8").splitlines():
-        if line.strip():
-            items.append(json.loads(line))
-    return items
-
-
-def _write_jsonl(path: Path, items: List[Dict[str, Any]]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as f:
-        for item in items:
-            f.write(json.dumps(item, ensure_ascii=False) + "\n")
-
-
-def _write_parquet(path: Path, items: List[Dict[str, Any]]) -> None:
-    import pandas as pd  # type: ignore
-
-    path.parent.mkdir(parents=True, exist_ok=True)
-    pd.DataFrame(items).to_parquet(path, index=False)
+from case_store import CaseStore
+from adapter_llm import compile_template
+from deepseek_client import chat_complete, forget, set_cache, set_max_retries
+from gen_scheduler import call_with_retries
+from llm_cache import LLMCache
 
 
 def _render_fix_prompt(case: Dict[str, Any]) -> str:
-    env = _env_with_filters()
-    template = env.from_string(
+    template = compile_template(
         """
 You are fixing a VC-FCST case. The case has invalid fields (null values) and must be corrected.
 
@@ -73,57 +54,70 @@ def main():
     ap = argparse.ArgumentParser(description="Repair invalid cases via DeepSeek")
     ap.add_argument("--input", default="datasets/case_bank.jsonl")
     ap.add_argument("--out-jsonl", default="datasets/case_bank.jsonl")
-    ap.add_argument("--out-parquet", default="datasets/case_bank.parquet")
+    ap.add_argument(
+        "--out-parquet",
+        default="",
+        help="Also rewrite this parquet with the whole bank (O(N); or run case_store.py export later)",
+    )
     ap.add_argument("--model", default="", help="Override MODEL_NAME in .env")
     ap.add_argument("--max-retries", type=int, default=5)
     ap.add_argument("--sleep-sec", type=float, default=1.0)
+    ap.add_argument("--llm-cache", default="", help="Cache LLM responses under this dir")
     args = ap.parse_args()
 
+    if args.llm_cache:
+        set_cache(LLMCache(args.llm_cache))
+    # call_with_retries does the retrying (with backoff for 429/5xx).
+    set_max_retries(0)
+
     schema = load_schema()
-    items = _load_items(Path(args.input))
+    copied = Path(args.input).resolve() != Path(args.out_jsonl).resolve()
+    if copied:
+        Path(args.out_jsonl).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(args.input, args.out_jsonl)
+    store = CaseStore(args.out_jsonl)
+    if copied:
+        # An .idx left by an earlier run describes the old file, not the copy.
+        store.reindex()
+
+    def _attempt(messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        text = chat_complete(messages, model=args.model or None)
+        try:
+            if not (text or "").strip():
+                raise ValueError("empty_response")
+            fixed = _parse_json_strict(text)
+            errs = validate_case(fixed, schema)
+            if errs:
+                raise ValueError("; ".join(errs))
+        except Exception:
+            # Do not replay a rejected response from the LLM cache on retry.
+            forget(messages, model=args.model or None)
+            raise
+        return fixed
 
     repaired = 0
-    for i, case in enumerate(items):
+    for case in list(store.iter_cases()):
         if not _has_null_initial_code(case):
             continue
 
-        prompt = _render_fix_prompt(case)
-        last_err = ""
-        fixed = None
-        for _ in range(args.max_retries):
-            try:
-                text = chat_complete(
-                    [
-                        {"role": "system", "content": "Output ONLY strict JSON. No extra text."},
-                        {"role": "user", "content": prompt},
-                    ],
-                    model=args.model or None,
-                )
-                if not (text or "").strip():
-                    raise ValueError("empty_response")
-                fixed = _parse_json_strict(text)
-                errs = validate_case(fixed, schema)
-                if not errs:
-                    break
-                last_err = "; ".join(errs)
-                fixed = None
-            except Exception as exc:
-                last_err = str(exc)
-                fixed = None
-            import time
-
-            time.sleep(args.sleep_sec)
-
+        messages = [
+            {"role": "system", "content": "Output ONLY strict JSON. No extra text."},
+            {"role": "user", "content": _render_fix_prompt(case)},
+        ]
+        fixed, last_err = call_with_retries(
+            _attempt, messages, max_retries=args.max_retries, backoff_sec=args.sleep_sec
+        )
         if fixed is None:
             raise SystemExit(f"failed to repair {case.get('case_id')}: {last_err}")
 
-        items[i] = fixed
+        # Replace the case in place even if the model renamed it.
+        fixed["case_id"] = case["case_id"]
+        store.upsert(fixed)
         repaired += 1
         print("repaired", fixed.get("case_id"))
 
-        _write_jsonl(Path(args.out_jsonl), items)
-        _write_parquet(Path(args.out_parquet), items)
-
+    if repaired and args.out_parquet:
+        store.export_parquet(args.out_parquet)
     print("done", repaired)
 
 
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_STORE_DIR = "runs/result_store"
+# Adapter fields that change what the agent is asked or how its output is read.
+TEMPLATE_FIELDS = ("call_mode", "input_prompt_template", "output_parse_template")
+
+
+def adapter_template_hash(adapter: Dict[str, Any]) -> str:
+    payload = json.dumps({name: adapter.get(name) for name in TEMPLATE_FIELDS}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def store_key(agent_name: str, agent_version: str, template_hash: str, case_hash: str, repeat: int) -> Dict[str, Any]:
+    return {
+        "agent_name": agent_name,
+        "agent_version": agent_version,
+        "template_hash": template_hash,
+        "case_hash": case_hash,
+        "repeat": repeat,
+    }
+
+
+def _digest(key: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(key, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ResultStore:
+    # Finished results across batches, one file per (agent name, version,
+    # adapter template hash, case content hash, repeat) at <root>/<d[:2]>/<d>.json.
+    # A case whose content changed, or an agent with a new version or templates,
+    # has a different key, so only those are run again.
+    def __init__(self, root: str = DEFAULT_STORE_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: Dict[str, Any]) -> Path:
+        digest = _digest(key)
+        return self.root / digest[:2] / f"{digest}.json"
+
+    def get(self, key: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        try:
+            entry = json.loads(self._path(key).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            entry = None
+        # A digest collision or a hand-edited file is treated as a miss.
+        hit = isinstance(entry, dict) and entry.get("key") == key and isinstance(entry.get("result"), dict)
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry["result"] if hit else None
+
+    def put(self, key: Dict[str, Any], result: Dict[str, Any]) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({"key": key, "result": result}, ensure_ascii=False).encode("utf-8")
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self.stored += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "stored": self.stored}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="VC-FCST cross-run result store")
+    ap.add_argument("--store-dir", default=DEFAULT_STORE_DIR)
+    ap.add_argument("--agent-name", default="", help="With --clear: only drop this agent's results")
+    ap.add_argument("--clear", action="store_true", help="Remove stored results")
+    args = ap.parse_args()
+
+    store = ResultStore(args.store_dir)
+    entries = removed = 0
+    for path in store.root.glob("*/*.json"):
+        if args.clear:
+            if args.agent_name:
+                try:
+                    key = json.loads(path.read_text(encoding="utf-8")).get("key") or {}
+                except (OSError, ValueError):
+                    key = {}
+                if key.get("agent_name") != args.agent_name:
+                    entries += 1
+                    continue
+            path.unlink()
+            removed += 1
+            continue
+        entries += 1
+    print(f"entries={entries} removed={removed}")
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# Results as a Hive-partitioned parquet dataset:
+#   <root>/agent_name=<agent>/run_date=<YYYY-MM-DD>/part-<batch>.parquet
+# Rows are buffered per partition and flushed as a row group every
+# row_group_size results, so memory stays flat however long the batch runs. The
+# Arrow schema is derived from result_schema.json, so every file (and every
+# all-null column in it) has the same types and runs can be read back as one
+# dataset.
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+RESULT_SCHEMA_PATH = Path(__file__).resolve().parent / "result_schema.json"
+PARTITION_COLUMNS = ("agent_name", "run_date")
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa  # type: ignore
+        import pyarrow.dataset as ds  # type: ignore
+        import pyarrow.parquet as pq  # type: ignore
+
+        return pa, ds, pq
+    except Exception as exc:  # pragma: no cover
+        raise SystemExit("pyarrow is required: pip install pyarrow") from exc
+
+
+def _arrow_type(spec: Dict[str, Any]):
+    pa, _, _ = _require_pyarrow()
+    kinds = spec.get("type", "string")
+    if isinstance(kinds, list):
+        kinds = [k for k in kinds if k != "null"]
+        kinds = kinds[0] if kinds else "string"
+    if kinds == "object":
+        return pa.struct([pa.field(name, _arrow_type(sub)) for name, sub in (spec.get("properties") or {}).items()])
+    if kinds == "array":
+        return pa.list_(_arrow_type(spec.get("items") or {}))
+    return {"string": pa.string(), "boolean": pa.bool_(), "integer": pa.int64(), "number": pa.float64()}[kinds]
+
+
+def arrow_schema(schema_path: Path = RESULT_SCHEMA_PATH):
+    # Top-level result_schema.json properties, in order. Partition columns are not
+    # stored in the files (they live in the directory names).
+    pa, _, _ = _require_pyarrow()
+    schema = json.loads(Path(schema_path).read_text(encoding="utf-8"))
+    return pa.schema([pa.field(name, _arrow_type(spec)) for name, spec in schema["properties"].items()])
+
+
+def _file_schema(schema):
+    for name in PARTITION_COLUMNS:
+        if name in schema.names:
+            schema = schema.remove(schema.get_field_index(name))
+    return schema
+
+
+def partitioning():
+    pa, ds, _ = _require_pyarrow()
+    return ds.partitioning(pa.schema([(name, pa.string()) for name in PARTITION_COLUMNS]), flavor="hive")
+
+
+def write_results(path: Path, results: List[Dict[str, Any]], schema_path: Path = RESULT_SCHEMA_PATH) -> None:
+    # One file with the same explicit schema (the --out parquet).
+    pa, _, pq = _require_pyarrow()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(pa.Table.from_pylist(results, schema=arrow_schema(schema_path)), path)
+
+
+class ResultWriter:
+    # Streams results of one batch into a partitioned dataset. Each partition's
+    # file is written as a hidden .<name>.tmp (skipped by dataset discovery) and
+    # renamed on close, so readers never see a file without its parquet footer;
+    # an interrupted batch leaves only the .tmp behind (the results.jsonl journal
+    # is what --resume relies on).
+    def __init__(
+        self,
+        root: str,
+        batch_name: str,
+        run_date: str,
+        row_group_size: int = 64,
+        schema_path: Path = RESULT_SCHEMA_PATH,
+    ):
+        pa, _, _ = _require_pyarrow()
+        self.root = Path(root)
+        self.batch_name = batch_name
+        self.run_date = run_date
+        self.row_group_size = max(1, row_group_size)
+        self.schema = _file_schema(arrow_schema(schema_path))
+        self._pa = pa
+        self._lock = threading.Lock()
+        self._buffers: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self._writers: Dict[Tuple[str, str], Any] = {}
+        self._paths: Dict[Tuple[str, str], Path] = {}
+        self.rows = 0
+
+    def _partition_dir(self, key: Tuple[str, str]) -> Path:
+        parts = [f"{name}={quote(value, safe='')}" for name, value in zip(PARTITION_COLUMNS, key)]
+        return self.root.joinpath(*parts)
+
+    @staticmethod
+    def _tmp_path(path: Path) -> Path:
+        return path.with_name(f".{path.name}.tmp")
+
+    def _flush(self, key: Tuple[str, str]) -> None:
+        rows = self._buffers.get(key)
+        if not rows:
+            return
+        _, _, pq = _require_pyarrow()
+        writer = self._writers.get(key)
+        if writer is None:
+            part_dir = self._partition_dir(key)
+            part_dir.mkdir(parents=True, exist_ok=True)
+            path = part_dir / f"part-{self.batch_name}.parquet"
+            self._paths[key] = path
+            writer = pq.ParquetWriter(str(self._tmp_path(path)), self.schema)
+            self._writers[key] = writer
+        writer.write_table(self._pa.Table.from_pylist(rows, schema=self.schema))
+        self._buffers[key] = []
+
+    def write(self, result: Dict[str, Any]) -> None:
+        key = (str(result.get("agent_name") or "unknown"), self.run_date)
+        with self._lock:
+            rows = self._buffers.setdefault(key, [])
+            rows.append(result)
+            self.rows += 1
+            if len(rows) >= self.row_group_size:
+                self._flush(key)
+
+    def write_many(self, results: Iterable[Dict[str, Any]]) -> None:
+        for result in results:
+            self.write(result)
+
+    def close(self) -> List[Path]:
+        with self._lock:
+            for key in list(self._buffers):
+                self._flush(key)
+            for key, writer in self._writers.items():
+                writer.close()
+                os.replace(self._tmp_path(self._paths[key]), self._paths[key])
+            paths = list(self._paths.values())
+            self._writers.clear()
+            self._buffers.clear()
+            return paths
+
+
+def open_results(path: str, columns: Optional[List[str]] = None):
+    # A dataset dir (partition columns come back from the paths) or a single
+    # parquet file; returns a pyarrow Table.
+    _, ds, _ = _require_pyarrow()
+    if Path(path).is_dir():
+        dataset = ds.dataset(path, format="parquet", partitioning=partitioning())
+    else:
+        dataset = ds.dataset(path, format="parquet")
+    if columns is not None:
+        columns = [c for c in columns if c in dataset.schema.names]
+    return dataset.to_table(columns=columns)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+import json
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+
+from workspace_diff import Snapshot, snapshot_workspace
+
+SEED_MODES = ["auto", "reflink", "copy", "hardlink"]
+
+try:
+    import fcntl  # type: ignore
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+_FICLONE = 0x40049409
+
+
+def _reflink(src: str, dst: str) -> None:
+    if fcntl is None:
+        raise OSError("reflink is not supported on this platform")
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+    shutil.copystat(src, dst)
+
+
+def _clone_file(src: str, dst: str, mode: str) -> None:
+    # Every mode keeps the template mtime, so the template snapshot is also the
+    # snapshot of the clone. Anything the filesystem refuses (no reflink support,
+    # hardlinks across devices) falls back to a plain copy.
+    if mode in ("auto", "reflink"):
+        try:
+            _reflink(src, dst)
+            return
+        except OSError:
+            pass
+    elif mode == "hardlink":
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+
+
+def write_files(base: Path, files: Dict[str, str]) -> None:
+    for rel_path, content in files.items():
+        path = base / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+class SeedCache:
+    # One prepared workspace per case content hash (<root>/<hash>/workspace plus
+    # its snapshot in seed.json), cloned into run directories instead of writing
+    # every file again for each agent and repeat.
+    #
+    # "hardlink" shares inodes with the template: only safe for agents that
+    # replace files (write + rename) rather than editing them in place. A
+    # template whose files no longer match its snapshot (an in-place edit through
+    # a hardlink, a partially deleted cache) is rebuilt before it is cloned.
+    def __init__(self, root: str, mode: str = "auto"):
+        if mode not in SEED_MODES:
+            raise ValueError(f"unknown seed mode: {mode}")
+        self.root = Path(root).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._snapshots: Dict[str, Snapshot] = {}
+
+    def _digest_lock(self, digest: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(digest, threading.Lock())
+
+    def _load(self, digest: str) -> Optional[Snapshot]:
+        try:
+            data = json.loads((self.root / digest / "seed.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return Snapshot({rel: tuple(meta) for rel, meta in data["files"].items()}, data["taken_ns"])
+
+    def _intact(self, digest: str, snap: Snapshot) -> bool:
+        template = self.root / digest / "workspace"
+        for rel, (size, mtime_ns, _) in snap.files.items():
+            try:
+                st = os.stat(template / rel)
+            except OSError:
+                return False
+            if st.st_size != size or st.st_mtime_ns != mtime_ns:
+                return False
+        return True
+
+    def _build(self, digest: str, files: Dict[str, str]) -> Snapshot:
+        # Built in a private dir and renamed into place, so concurrent processes
+        # sharing the cache never see a half-written template.
+        tmp = self.root / f".{digest}.{uuid.uuid4().hex}"
+        write_files(tmp / "workspace", files)
+        snap = snapshot_workspace(tmp / "workspace")
+        data = {"files": snap.files, "taken_ns": snap.taken_ns}
+        (tmp / "seed.json").write_text(json.dumps(data), encoding="utf-8")
+        target = self.root / digest
+        if target.exists():
+            shutil.rmtree(target, ignore_errors=True)
+        try:
+            os.rename(tmp, target)
+        except OSError:
+            # Another process won the race; use its template.
+            shutil.rmtree(tmp, ignore_errors=True)
+            return self._load(digest) or snap
+        return snap
+
+    def template(self, digest: str, files: Dict[str, str]) -> Snapshot:
+        with self._digest_lock(digest):
+            snap = self._snapshots.get(digest) or self._load(digest)
+            if snap is None or not self._intact(digest, snap):
+                snap = self._build(digest, files)
+            self._snapshots[digest] = snap
+            return snap
+
+    def clone(self, digest: str, files: Dict[str, str], dest: Path) -> Snapshot:
+        snap = self.template(digest, files)
+        template = self.root / digest / "workspace"
+        for rel in snap.files:
+            target = dest / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            _clone_file(str(template / rel), str(target), self.mode)
+        return snap
+
+
+def seed_workspace(cache: Optional[SeedCache], digest: str, files: Dict[str, str], dest: Path) -> Snapshot:
+    dest.mkdir(parents=True, exist_ok=True)
+    if cache is not None:
+        return cache.clone(digest, files, dest)
+    write_files(dest, files)
+    return snapshot_workspace(dest)
@@ -26,7 +26,8 @@ def main():
     path = Path(args.input)
     cases: List[Dict[str, Any]] = []
     if path.suffix == ".jsonl":
-        cases = list(_iter_jsonl(path))
+        # Keep the last line per case_id (case_store upserts append).
+        cases = list({case.get("case_id"): case for case in _iter_jsonl(path)}.values())
     else:
         try:
             import pandas as pd  # type: ignore
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+import difflib
+import hashlib
+import os
+import stat
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Directories agents (or their tooling) create that never count as code changes.
+DEFAULT_IGNORE = frozenset(
+    {
+        ".git",
+        ".hg",
+        ".venv",
+        "venv",
+        "__pycache__",
+        "node_modules",
+        ".pytest_cache",
+        ".mypy_cache",
+        ".ruff_cache",
+        ".tox",
+        ".nox",
+        ".cache",
+        ".eggs",
+    }
+)
+DEFAULT_MAX_BLOB_BYTES = 1024 * 1024
+
+# rel path -> (size, mtime_ns, sha256)
+FileMeta = Tuple[int, int, str]
+
+
+def _walk(base: Path, ignore: frozenset) -> Iterator[Tuple[str, os.stat_result]]:
+    # os.walk with ignored directories pruned, so a node_modules or venv the agent
+    # created is never descended into. Symlinks are not followed.
+    for root, dirs, files in os.walk(base):
+        dirs[:] = [d for d in dirs if d not in ignore]
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                st = os.lstat(path)
+            except OSError:
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                continue
+            yield os.path.relpath(path, base).replace(os.sep, "/"), st
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Snapshot:
+    # Metadata of a freshly seeded workspace. taken_ns guards against "racily
+    # clean" files: anything modified at or after the snapshot started is hashed
+    # even if size and mtime still match.
+    def __init__(self, files: Dict[str, FileMeta], taken_ns: int):
+        self.files = files
+        self.taken_ns = taken_ns
+
+
+def snapshot_workspace(base: Path, ignore: frozenset = DEFAULT_IGNORE) -> Snapshot:
+    taken_ns = time.time_ns()
+    files: Dict[str, FileMeta] = {}
+    for rel, st in _walk(base, ignore):
+        files[rel] = (st.st_size, st.st_mtime_ns, _hash_file(base / rel))
+    return Snapshot(files, taken_ns)
+
+
+class WorkspaceDiff:
+    def __init__(self):
+        self.added: List[str] = []
+        self.modified: List[str] = []
+        self.deleted: List[str] = []
+        # New content of added/modified files; None for binary or oversized blobs.
+        self.texts: Dict[str, Optional[str]] = {}
+        self.bytes_read = 0
+
+    def changed_files(self) -> List[str]:
+        return sorted(self.added + self.modified + self.deleted)
+
+    def final_code(self, seeded: Dict[str, str]) -> Dict[str, str]:
+        # Seeded content is already in memory, so only changed files were read.
+        deleted = set(self.deleted)
+        final = {rel: text for rel, text in seeded.items() if rel not in deleted}
+        for rel, text in self.texts.items():
+            if text is None:
+                final.pop(rel, None)
+            else:
+                final[rel] = text
+        return final
+
+    def patch(self, seeded: Dict[str, str]) -> str:
+        added, deleted = set(self.added), set(self.deleted)
+        chunks: List[str] = []
+        for rel in self.changed_files():
+            old = seeded.get(rel) if rel not in added else None
+            new = self.texts.get(rel) if rel not in deleted else None
+            header = f"diff --git a/{rel} b/{rel}\n"
+            if rel in added:
+                header += "new file mode 100644\n"
+            elif rel in deleted:
+                header += "deleted file mode 100644\n"
+            binary = (rel not in deleted and new is None) or (rel not in added and old is None)
+            fromfile = "/dev/null" if rel in added else f"a/{rel}"
+            tofile = "/dev/null" if rel in deleted else f"b/{rel}"
+            if binary:
+                chunks.append(header + f"Binary files {fromfile} and {tofile} differ\n")
+                continue
+            lines = difflib.unified_diff(
+                (old or "").splitlines(keepends=True),
+                (new or "").splitlines(keepends=True),
+                fromfile=fromfile,
+                tofile=tofile,
+            )
+            body = "".join(line if line.endswith("\n") else line + "\n\\ No newline at end of file\n" for line in lines)
+            chunks.append(header + body)
+        return "".join(chunks)
+
+
+def diff_workspace(
+    base: Path,
+    before: Snapshot,
+    max_blob_bytes: int = DEFAULT_MAX_BLOB_BYTES,
+    ignore: frozenset = DEFAULT_IGNORE,
+) -> WorkspaceDiff:
+    diff = WorkspaceDiff()
+    seen = set()
+    for rel, st in _walk(base, ignore):
+        seen.add(rel)
+        meta = before.files.get(rel)
+        if meta is not None and meta[0] == st.st_size and meta[1] == st.st_mtime_ns and st.st_mtime_ns < before.taken_ns:
+            continue
+        path = base / rel
+        if st.st_size > max_blob_bytes:
+            # Too big to keep: hash it in chunks to tell a touch from an edit.
+            if meta is not None and meta[0] == st.st_size and _hash_file(path) == meta[2]:
+                continue
+            (diff.modified if meta is not None else diff.added).append(rel)
+            diff.texts[rel] = None
+            continue
+        try:
+            data = path.read_bytes()
+        except OSError:
+            continue
+        diff.bytes_read += len(data)
+        if meta is not None and hashlib.sha256(data).hexdigest() == meta[2]:
+            continue
+        (diff.modified if meta is not None else diff.added).append(rel)
+        try:
+            diff.texts[rel] = data.decode("utf-8")
+        except UnicodeDecodeError:
+            diff.texts[rel] = None
+    diff.deleted = sorted(rel for rel in before.files if rel not in seen)
+    diff.added.sort()
+    diff.modified.sort()
+    return diff
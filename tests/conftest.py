@@ -0,0 +1,64 @@
+import json
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parents[1] / "benchmark"
+# benchmark/ modules import each other as flat scripts.
+sys.path.insert(0, str(BENCH_DIR))
+
+
+def make_bank(tmp_path, cases=3, fail_every=3):
+    # Synthetic bench_harness cases plus the canned fake_agent patches for them;
+    # every fail_every-th case (the first one included) is patched without a fix.
+    from bench_harness import _synthetic_case
+
+    categories = json.loads((BENCH_DIR / "categories_top50.json").read_text(encoding="utf-8"))
+    patch_dir = tmp_path / "patches"
+    patch_dir.mkdir()
+    rng = random.Random(0)
+    bank = tmp_path / "bank.jsonl"
+    with bank.open("w", encoding="utf-8") as f:
+        for i in range(cases):
+            case, patch = _synthetic_case(categories[i], i, 1, 1, i % fail_every == 0, rng)
+            (patch_dir / f"{case['case_id']}.json").write_text(json.dumps(patch), encoding="utf-8")
+            f.write(json.dumps(case, ensure_ascii=False) + "\n")
+    return bank, patch_dir
+
+
+def orchestrator_args(tmp_path, bank, *extra, agent_cmd=None, agent_configs=None):
+    # orchestrator.py's CLI args for a run with the fake agent; extra are more args.
+    # An empty agent_cmd leaves --agent-cmd out (each config's call_config.cmd runs).
+    args = [
+        "--case-bank",
+        str(bank),
+        "--agent-config",
+        *[str(path) for path in agent_configs or [BENCH_DIR / "adapters" / "fake_agent.yaml"]],
+        "--run-dir",
+        str(tmp_path / "runs"),
+        "--seed-cache",
+        str(tmp_path / "seed_cache"),
+        "--timeout",
+        "60",
+        *[str(arg) for arg in extra],
+    ]
+    if agent_cmd is None:
+        agent_cmd = [sys.executable, str(BENCH_DIR / "fake_agent.py"), str(tmp_path / "patches")]
+    if not agent_cmd:
+        return args
+    return args + ["--agent-cmd", *[str(part) for part in agent_cmd]]
+
+
+def run_orchestrator(tmp_path, bank, *extra, agent_cmd=None, agent_configs=None, check=True):
+    # orchestrator.py in a subprocess, the way it is run for real. Returns the
+    # CompletedProcess.
+    cmd = [sys.executable, str(BENCH_DIR / "orchestrator.py")]
+    cmd += orchestrator_args(tmp_path, bank, *extra, agent_cmd=agent_cmd, agent_configs=agent_configs)
+    return subprocess.run(cmd, capture_output=True, text=True, check=check)
+
+
+def read_results(path):
+    import pandas as pd
+
+    return pd.read_parquet(path).to_dict(orient="records")
@@ -0,0 +1,94 @@
+import json
+import math
+
+from adaptive_sampler import AdaptiveSampler
+from conftest import make_bank, run_orchestrator
+
+
+class Run:
+    def __init__(self, agent, stratum, index):
+        self.agent = agent
+        self.stratum = stratum
+        self.index = index
+
+
+def _sampler(sizes, target=0.05, min_per_stratum=2, agents=("a",)):
+    runs = [
+        Run(agent, stratum, i) for agent in agents for stratum, size in sizes.items() for i in range(size)
+    ]
+    sampler = AdaptiveSampler(
+        runs, lambda r: r.agent, lambda r: r.stratum, target, min_per_stratum=min_per_stratum, seed=1
+    )
+    return runs, sampler
+
+
+def _drain(sampler, passed):
+    taken = []
+    for run in sampler:
+        taken.append(run)
+        sampler.observe(run, passed(run))
+    return taken
+
+
+def test_every_stratum_gets_its_minimum_first():
+    _, sampler = _sampler({("L1", "Easy"): 10, ("L2", "Hard"): 10, ("L3", "Easy"): 1})
+    first = [sampler.next_run("a") for _ in range(5)]
+    strata = [run.stratum for run in first]
+    assert strata.count(("L3", "Easy")) == 1
+    assert strata.count(("L1", "Easy")) == 2 and strata.count(("L2", "Hard")) == 2
+
+
+def test_stops_once_the_interval_is_narrow_enough():
+    runs, sampler = _sampler({("L1", "Easy"): 200, ("L2", "Hard"): 200}, target=0.1)
+    taken = _drain(sampler, lambda run: run.stratum[0] == "L1")
+    [summary] = sampler.summary()
+    assert summary["settled"]
+    assert summary["runs"] == len(taken) < len(runs)
+    assert summary["half_width"] <= 0.1
+    assert summary["low"] <= summary["pass_rate"] <= summary["high"]
+    assert len({id(run) for run in taken}) == len(taken)
+
+
+def test_uncertain_strata_get_more_runs():
+    _, sampler = _sampler({("L1", "Easy"): 100, ("L2", "Hard"): 100}, target=0.08)
+    # L1 always passes; L2 is a coin flip.
+    taken = _drain(sampler, lambda run: run.stratum[0] == "L1" or run.index % 2 == 0)
+    easy = sum(1 for run in taken if run.stratum == ("L1", "Easy"))
+    hard = sum(1 for run in taken if run.stratum == ("L2", "Hard"))
+    assert hard > 1.5 * easy
+
+
+def test_an_exhausted_plan_has_zero_variance():
+    runs, sampler = _sampler({("L1", "Easy"): 3}, target=0.0)
+    taken = _drain(sampler, lambda run: run.index == 0)
+    assert len(taken) == 3
+    [summary] = sampler.summary()
+    assert summary["half_width"] == 0.0
+    assert math.isclose(summary["pass_rate"], 1 / 3)
+
+
+def test_resumed_runs_are_not_handed_out_again():
+    runs, sampler = _sampler({("L1", "Easy"): 4}, target=0.0)
+    for run in runs[:2]:
+        sampler.observe(run, True)
+    rest = _drain(sampler, lambda run: False)
+    assert sorted(run.index for run in rest) == sorted(run.index for run in runs[2:])
+    assert sampler.summary()[0]["runs"] == 4
+
+
+def test_next_run_is_per_agent():
+    runs, sampler = _sampler({("L1", "Easy"): 2}, target=0.0, agents=("a", "b"))
+    assert [sampler.next_run("b").agent for _ in range(2)] == ["b", "b"]
+    assert sampler.next_run("b") is None
+    assert sampler.next_run("a").agent == "a"
+    assert sampler.next_run("missing") is None
+
+
+def test_orchestrator_adaptive_run_writes_its_summary(tmp_path):
+    bank, _ = make_bank(tmp_path, cases=6)
+    proc = run_orchestrator(
+        tmp_path, bank, "--adaptive", "--min-per-stratum", 1, "--workers", 2, "--out", tmp_path / "out.parquet"
+    )
+    assert "adaptive fake_agent@bench: 6/6 runs, pass rate 0.667 +/- 0.000 (settled)" in proc.stdout
+    [summary] = json.loads(next((tmp_path / "runs").glob("benchmark-*/adaptive.json")).read_text(encoding="utf-8"))
+    assert (summary["planned"], summary["runs"], summary["passed"]) == (6, 6, 4)
@@ -0,0 +1,59 @@
+import sys
+import time
+from pathlib import Path
+
+from async_exec import run_process_sync
+from instrument import USAGE_KEYS
+
+
+def _alive(pid):
+    # A killed grandchild is reparented and may linger as a zombie until reaped.
+    try:
+        status = Path(f"/proc/{pid}/status").read_text()
+    except FileNotFoundError:
+        return False
+    return "\nState:\tZ" not in status
+
+
+def test_output_and_input_are_captured(tmp_path):
+    script = "import sys; data = sys.stdin.read(); print(data.upper()); print('err', file=sys.stderr); sys.exit(3)"
+    stats = run_process_sync(
+        [sys.executable, "-c", script], str(tmp_path), tmp_path / "out", tmp_path / "err", input_text="hello"
+    )
+    assert stats["returncode"] == 3
+    assert not stats["timed_out"]
+    assert stats["first_output_sec"] is not None
+    assert (tmp_path / "out").read_text().strip() == "HELLO"
+    assert (tmp_path / "err").read_text().strip() == "err"
+
+
+def test_timeout_kills_the_whole_process_group(tmp_path):
+    pid_file = tmp_path / "grandchild.pid"
+    script = (
+        "import subprocess, sys, time\n"
+        "p = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\n"
+        f"open({str(pid_file)!r}, 'w').write(str(p.pid))\n"
+        "print('started', flush=True)\n"
+        "time.sleep(60)\n"
+    )
+    t0 = time.perf_counter()
+    stats = run_process_sync(
+        [sys.executable, "-c", script], str(tmp_path), tmp_path / "out", tmp_path / "err", timeout=2
+    )
+    assert stats["timed_out"]
+    assert time.perf_counter() - t0 < 30
+    assert (tmp_path / "out").read_text().strip() == "started"
+    grandchild = int(pid_file.read_text())
+    deadline = time.time() + 5
+    while _alive(grandchild) and time.time() < deadline:
+        time.sleep(0.05)
+    assert not _alive(grandchild)
+
+
+def test_measure_reports_usage(tmp_path):
+    cmd = [sys.executable, "-c", "print(sum(range(100000)))"]
+    stats = run_process_sync(cmd, str(tmp_path), tmp_path / "out", tmp_path / "err", measure=True)
+    assert stats["returncode"] == 0
+    for key in USAGE_KEYS:
+        assert key in stats
+    assert stats["max_rss_kb"] > 0
@@ -0,0 +1,54 @@
+from case_bank import jsonl_cache_path, scan_case_bank
+from case_store import CaseStore
+from generate_cases import _make_stub_case
+
+CATEGORY = {
+    "level1": "L1",
+    "level2": "L2",
+    "level3_id": "1.1.1",
+    "level3_name": "name",
+    "defect_desc": "desc",
+}
+
+
+def _case(idx, difficulty, requirement="original"):
+    case = _make_stub_case(CATEGORY, idx)
+    case.update(requirement=requirement, difficulty=difficulty, case_type="modify")
+    return case
+
+
+def test_jsonl_bank_is_scanned_through_a_parquet_cache_in_cache_dir(tmp_path):
+    bank = tmp_path / "bank.jsonl"
+    store = CaseStore(str(bank), auto_compact=False)
+    for idx, difficulty in ((1, "Easy"), (2, "Hard"), (3, "Easy")):
+        store.upsert(_case(idx, difficulty))
+    cache_dir = str(tmp_path / "cache")
+    cache = jsonl_cache_path(str(bank), cache_dir)
+
+    # Without a cache dir a scan writes nothing.
+    before = sorted(tmp_path.iterdir())
+    df = scan_case_bank(str(bank), difficulty="Easy")
+    assert df["case_id"].tolist() == ["VCFCST-1.1.1-001", "VCFCST-1.1.1-003"]
+    assert sorted(tmp_path.iterdir()) == before
+
+    assert scan_case_bank(str(bank), difficulty="Easy", cache_dir=cache_dir).to_json() == df.to_json()
+    assert cache.exists()
+    built = cache.stat().st_mtime_ns
+
+    def easy(**kwargs):
+        return scan_case_bank(str(bank), difficulty="Easy", cache_dir=cache_dir, **kwargs)
+
+    # Unchanged bank: the cache is reused as is.
+    assert easy()["case_id"].tolist() == df["case_id"].tolist()
+    assert cache.stat().st_mtime_ns == built
+
+    # A changed bank rebuilds it.
+    store.upsert(_case(2, "Easy", "edited"))
+    df = easy()
+    assert df["case_id"].tolist() == ["VCFCST-1.1.1-001", "VCFCST-1.1.1-002", "VCFCST-1.1.1-003"]
+    assert df["requirement"].tolist()[1] == "edited"
+    assert cache.stat().st_mtime_ns != built
+
+    # The stale Easy line of a case moved to Hard is not picked up.
+    store.upsert(_case(3, "Hard"))
+    assert easy()["case_id"].tolist() == ["VCFCST-1.1.1-001", "VCFCST-1.1.1-002"]
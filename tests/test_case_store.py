@@ -0,0 +1,127 @@
+import json
+import shutil
+import sys
+
+import generate_cases
+import repair_cases
+from case_bank import load_case_bank, scan_case_bank
+from case_store import CaseStore
+from conftest import BENCH_DIR
+from generate_cases import _make_stub_case
+
+CATEGORY = {
+    "level1": "L1",
+    "level2": "L2",
+    "level3_id": "1.1.1",
+    "level3_name": "name",
+    "defect_desc": "desc",
+}
+
+
+def _case(idx, requirement="original"):
+    case = _make_stub_case(CATEGORY, idx)
+    case.update(requirement=requirement, difficulty="Easy", case_type="modify")
+    return case
+
+
+def test_replaced_case_keeps_its_position(tmp_path):
+    bank = tmp_path / "bank.jsonl"
+    store = CaseStore(str(bank), auto_compact=False)
+    for idx in (1, 2, 3):
+        store.upsert(_case(idx))
+    store.upsert(_case(1, "edited"))
+    expected = ["VCFCST-1.1.1-001", "VCFCST-1.1.1-002", "VCFCST-1.1.1-003"]
+
+    cases = list(store.iter_cases())
+    assert [c["case_id"] for c in cases] == expected
+    assert cases[0]["requirement"] == "edited"
+
+    # Readers of the raw JSONL (with the replaced line still in it) agree.
+    df = scan_case_bank(str(bank))
+    assert df["case_id"].tolist() == expected
+    assert df["requirement"].tolist()[0] == "edited"
+    assert scan_case_bank(str(bank), limit=1)["case_id"].tolist() == expected[:1]
+    assert load_case_bank(str(bank))["case_id"].tolist() == expected
+    assert load_case_bank(str(bank))["requirement"].tolist()[0] == "edited"
+
+    store.compact()
+    assert [c["case_id"] for c in CaseStore(str(bank)).iter_cases()] == expected
+    assert len(bank.read_text(encoding="utf-8").splitlines()) == 3
+
+
+def test_repair_rebuilds_stale_index_of_copied_bank(tmp_path, monkeypatch):
+    # An earlier run left out.jsonl(.idx) behind; the new input has the same
+    # size but different cases.
+    old, new = tmp_path / "old.jsonl", tmp_path / "new.jsonl"
+    for path, idx in ((old, 1), (new, 2)):
+        path.write_text(json.dumps(_case(idx), ensure_ascii=False) + "\n", encoding="utf-8")
+    out = tmp_path / "out.jsonl"
+    shutil.copyfile(old, out)
+    CaseStore(str(out))
+    assert (tmp_path / "out.jsonl.idx").exists()
+
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["repair_cases.py", "--input", str(new), "--out-jsonl", str(out), "--out-parquet", ""],
+    )
+    repair_cases.main()
+    assert CaseStore(str(out)).case_ids() == ["VCFCST-1.1.1-002"]
+
+
+def test_moving_a_case_to_another_category(tmp_path):
+    bank = tmp_path / "bank.jsonl"
+    store = CaseStore(str(bank))
+    store.upsert(_case(1))
+    store.upsert(_case(2))
+    moved = _case(1)
+    moved["vcfcst_category"] = dict(moved["vcfcst_category"], level3_id="2.2.2")
+    store.upsert(moved)
+    for reopened in (store, CaseStore(str(bank))):
+        assert reopened.case_ids("1.1.1") == ["VCFCST-1.1.1-002"]
+        assert reopened.case_ids("2.2.2") == ["VCFCST-1.1.1-001"]
+
+
+def test_same_size_rewrite_is_reindexed(tmp_path):
+    bank = tmp_path / "bank.jsonl"
+    store = CaseStore(str(bank))
+    for idx in (1, 2):
+        store.upsert(_case(idx))
+    # Another tool rewrites the bank with the same bytes count: 001 <-> 002.
+    lines = bank.read_text(encoding="utf-8").splitlines(keepends=True)
+    bank.write_text(lines[1] + lines[0], encoding="utf-8")
+    assert [c["case_id"] for c in CaseStore(str(bank)).iter_cases()] == ["VCFCST-1.1.1-002", "VCFCST-1.1.1-001"]
+    assert CaseStore(str(bank)).get("VCFCST-1.1.1-001")["case_id"] == "VCFCST-1.1.1-001"
+
+
+def test_generate_cases_rewrites_the_index_with_the_bank(tmp_path, monkeypatch):
+    bank = tmp_path / "bank.jsonl"
+    store = CaseStore(str(bank))
+    store.upsert(_case(7))
+    argv = ["generate_cases.py", "--dry-run", "--categories", str(BENCH_DIR / "categories_top50.json")]
+    argv += ["--out-jsonl", str(bank), "--out-parquet", str(tmp_path / "bank.parquet")]
+    monkeypatch.setattr(sys, "argv", argv)
+    generate_cases.main()
+    fresh = CaseStore(str(bank))
+    assert len(fresh) == 50
+    assert "VCFCST-1.1.1-007" not in fresh
+    assert len(fresh.index_path.read_text(encoding="utf-8").splitlines()) == 50
+
+
+def test_repair_keeps_the_case_id_when_the_model_renames_it(tmp_path, monkeypatch):
+    bank = tmp_path / "bank.jsonl"
+    broken = _case(1)
+    broken["initial_code"] = dict(broken["initial_code"], **{"src/extra.py": None})
+    CaseStore(str(bank)).upsert(broken)
+
+    def fake_chat(messages, model=None):
+        fixed = _case(1, "repaired")
+        fixed["case_id"] = "VCFCST-1.1.1-999"
+        return json.dumps(fixed, ensure_ascii=False)
+
+    monkeypatch.setattr(repair_cases, "chat_complete", fake_chat)
+    monkeypatch.setattr(sys, "argv", ["repair_cases.py", "--input", str(bank), "--out-jsonl", str(bank)])
+    repair_cases.main()
+    store = CaseStore(str(bank))
+    assert store.case_ids() == ["VCFCST-1.1.1-001"]
+    assert store.get("VCFCST-1.1.1-001")["requirement"] == "repaired"
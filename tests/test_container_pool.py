@@ -0,0 +1,79 @@
+import asyncio
+
+import container_pool
+from container_pool import ContainerPool, pool_key
+
+INSTALLED = ["C /usr", "C /usr/local", "A /usr/local/lib/python3.10/site-packages/requests", "A /var/lib/vcfcst-home"]
+
+
+class FakeDocker:
+    # Just enough of the docker CLI for ContainerPool: each container keeps the
+    # lines `docker diff` would print for it.
+    def __init__(self):
+        self.containers = {}
+        self.calls = []
+        self.started = 0
+
+    async def docker(self, *args):
+        self.calls.append(args)
+        if args[0] == "run":
+            cid = f"c{self.started}"
+            self.started += 1
+            self.containers[cid] = []
+            return cid
+        if args[0] == "exec" and args[2] == "pip":
+            self.containers[args[1]] += INSTALLED
+        elif args[0] == "exec" and "$HOME" in args[-1]:
+            return "/root"
+        elif args[0] == "exec" and args[-1].startswith("rm -rf /workspace"):
+            # The reset: scratch dirs and $HOME are restored.
+            self.containers[args[1]] = [line for line in self.containers[args[1]] if not line.startswith("A /tmp")]
+        elif args[0] == "diff":
+            return "\n".join(self.containers[args[1]])
+        elif args[0] == "rm":
+            self.containers.pop(args[-1], None)
+        return ""
+
+    async def run_process(self, cmd, cwd, stdout_path, stderr_path, timeout=600):
+        cid, script = cmd[4], cmd[-1]
+        if "pip install" in script:
+            self.containers[cid] += ["A /usr/local/lib/python3.10/site-packages/leaked"]
+        self.containers[cid] += ["C /tmp", "A /tmp/scratch", "C /root", "A /root/.cache", "A /workspace/out.txt"]
+        return {"returncode": 0, "wall_sec": 0.0, "first_output_sec": None, "timed_out": False}
+
+
+def _pool(monkeypatch):
+    fake = FakeDocker()
+    monkeypatch.setattr(container_pool, "_docker", fake.docker)
+    monkeypatch.setattr(container_pool, "run_process", fake.run_process)
+    return fake, ContainerPool(max_idle_per_key=1)
+
+
+def test_scratch_dirs_are_reset_and_the_container_reused(tmp_path, monkeypatch):
+    fake, pool = _pool(monkeypatch)
+    key = pool_key("python:3.10-slim", ["requests"])
+
+    async def main():
+        for _ in range(3):
+            await pool.run(key, tmp_path, "pytest -q", tmp_path / "out", tmp_path / "err", 60)
+
+    asyncio.run(main())
+    assert list(fake.containers) == ["c0"]
+    resets = [args[-1] for args in fake.calls if args[0] == "exec" and args[-1].startswith("rm -rf /workspace")]
+    assert len(resets) == 3
+    for part in ("/tmp/*", "/var/tmp/*", "rm -rf /root", "cp -a /var/lib/vcfcst-home /root"):
+        assert part in resets[0]
+
+
+def test_a_container_changed_outside_scratch_dirs_is_replaced(tmp_path, monkeypatch):
+    fake, pool = _pool(monkeypatch)
+    key = pool_key("python:3.10-slim", ["requests"])
+
+    async def main():
+        await pool.run(key, tmp_path, "pip install leaked && pytest -q", tmp_path / "out", tmp_path / "err", 60)
+        await pool.run(key, tmp_path, "pytest -q", tmp_path / "out", tmp_path / "err", 60)
+
+    asyncio.run(main())
+    # c0 got a package into site-packages and was removed; c1 ran the next case.
+    assert ("rm", "-f", "c0") in fake.calls
+    assert list(fake.containers) == ["c1"]
@@ -0,0 +1,145 @@
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import deepseek_client
+from deepseek_client import ChatError, DeepSeekClient
+
+
+def test_large_retry_after_is_capped(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(deepseek_client.time, "sleep", sleeps.append)
+    client = DeepSeekClient(api_key="test", max_retries=2, max_backoff_sec=10.0)
+    responses = iter(
+        [
+            ChatError("HTTP 429", status=429, headers={"Retry-After": "3600"}),
+            ChatError("HTTP 503", status=503, headers={"Retry-After": "3600"}),
+            {"choices": [{"message": {"content": "ok"}}]},
+        ]
+    )
+
+    def post(body):
+        item = next(responses)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    monkeypatch.setattr(client, "_post", post)
+    assert client.chat_complete([{"role": "user", "content": "hi"}]) == "ok"
+    assert len(sleeps) == 2
+    # Jittered around the cap, never the server's hour.
+    assert all(5.0 <= delay <= 15.0 for delay in sleeps)
+
+
+class _Stub(BaseHTTPRequestHandler):
+    # Chat completions endpoint replaying server.script, one response per request:
+    # (status, headers, body, close the connection afterwards).
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append((self.path, self.client_address, body))
+        status, headers, payload, close = self.server.script.pop(0)
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        # Drop the keep-alive connection without announcing it.
+        self.close_connection = close
+
+    def log_message(self, *args):
+        pass
+
+
+def _ok(text):
+    return (200, {}, {"choices": [{"message": {"content": text}}]}, False)
+
+
+@pytest.fixture
+def stub(tmp_path, monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    server.requests, server.script = [], []
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    monkeypatch.setenv("API_BASE", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setenv("API_KEY", "test")
+    monkeypatch.setenv("MODEL_NAME", "stub-model")
+    sleeps = []
+    monkeypatch.setattr(deepseek_client.time, "sleep", sleeps.append)
+    client = DeepSeekClient.from_env(tmp_path / ".env", max_retries=2)
+    yield server, client, sleeps
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_connection_is_reused(stub):
+    server, client, _ = stub
+    server.script = [_ok("one"), _ok("two")]
+    assert client.chat_complete([{"role": "user", "content": "a"}]) == "one"
+    assert client.chat_complete([{"role": "user", "content": "b"}]) == "two"
+    assert [r[0] for r in server.requests] == ["/v1/chat/completions"] * 2
+    assert server.requests[0][2]["model"] == "stub-model"
+    # Same client port: one keep-alive connection served both requests.
+    assert server.requests[0][1] == server.requests[1][1]
+
+
+def test_429_is_retried_after_retry_after(stub):
+    server, client, sleeps = stub
+    server.script = [(429, {"Retry-After": "2"}, {"error": "slow down"}, False), _ok("done")]
+    assert client.chat_complete([{"role": "user", "content": "a"}]) == "done"
+    assert len(server.requests) == 2
+    assert len(sleeps) == 1 and 1.0 <= sleeps[0] <= 3.0
+
+
+def test_client_error_is_raised_over_the_wire(stub):
+    server, client, sleeps = stub
+    server.script = [(400, {}, {"error": "bad request"}, False)]
+    with pytest.raises(ChatError) as info:
+        client.chat_complete([{"role": "user", "content": "a"}])
+    assert info.value.status == 400
+    assert "bad request" in str(info.value)
+    assert len(server.requests) == 1 and sleeps == []
+
+
+def test_connection_closed_by_the_server_is_replaced(stub):
+    server, client, sleeps = stub
+    server.script = [(200, {}, {"choices": [{"message": {"content": "one"}}]}, True), _ok("two")]
+    assert client.chat_complete([{"role": "user", "content": "a"}]) == "one"
+    # The pooled connection is dead; the request goes out on a fresh one.
+    assert client.chat_complete([{"role": "user", "content": "b"}]) == "two"
+    assert server.requests[0][1] != server.requests[1][1]
+    assert sleeps == []
+
+
+def test_refused_connection_is_retried_then_raised(tmp_path, monkeypatch):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    sleeps = []
+    monkeypatch.setattr(deepseek_client.time, "sleep", sleeps.append)
+    client = DeepSeekClient(api_key="test", api_base=f"http://127.0.0.1:{port}", max_retries=2)
+    with pytest.raises(ChatError, match="request failed"):
+        client.chat_complete([{"role": "user", "content": "a"}])
+    assert len(sleeps) == 2
+
+
+def test_other_os_errors_are_not_retried(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(deepseek_client.time, "sleep", sleeps.append)
+    client = DeepSeekClient(api_key="test", max_retries=2)
+
+    def post(body):
+        raise PermissionError("no")
+
+    monkeypatch.setattr(client, "_post", post)
+    with pytest.raises(PermissionError):
+        client.chat_complete([{"role": "user", "content": "a"}])
+    assert sleeps == []
@@ -0,0 +1,34 @@
+import sys
+
+import pytest
+
+import env_cache
+from env_cache import EnvCache, PythonVersionMismatch, base_python_version, python_for
+
+HOST = f"{sys.version_info[0]}.{sys.version_info[1]}"
+
+
+def test_base_python_version():
+    assert base_python_version("python:3.10-slim") == "3.10"
+    assert base_python_version("docker.io/library/python:3.9") == "3.9"
+    assert base_python_version("node:18-slim") is None
+
+
+def test_python_for_matches_the_base_image(monkeypatch):
+    assert python_for(f"python:{HOST}-slim") == (sys.executable, HOST)
+    assert python_for("node:18-slim") == (sys.executable, HOST)
+
+    monkeypatch.setattr(env_cache.shutil, "which", lambda name: f"/opt/bin/{name}" if name == "python2.7" else None)
+    assert python_for("python:2.7-slim") == ("/opt/bin/python2.7", "2.7")
+    with pytest.raises(PythonVersionMismatch):
+        python_for("python:2.6-slim")
+
+
+def test_venv_is_not_built_with_another_python(tmp_path, monkeypatch):
+    monkeypatch.setattr(env_cache.shutil, "which", lambda name: None)
+    calls = []
+    monkeypatch.setattr(env_cache.subprocess, "run", lambda *a, **kw: calls.append(a))
+    with pytest.raises(PythonVersionMismatch):
+        EnvCache(str(tmp_path)).venv_for("python:2.6-slim", ["requests"])
+    assert calls == []
+    assert not (tmp_path / "venvs").exists()
@@ -0,0 +1,54 @@
+import asyncio
+
+from evaluator import pytest_summary, run_pytest_async, slowest_tests
+
+TESTS = """
+import pytest
+
+
+def test_ok():
+    pass
+
+
+def test_fails():
+    assert 1 == 2
+
+
+@pytest.mark.skip(reason="not now")
+def test_skipped():
+    pass
+
+
+@pytest.fixture
+def broken():
+    raise RuntimeError("setup")
+
+
+def test_errors(broken):
+    pass
+"""
+
+
+def test_outcomes_come_from_the_junit_report(tmp_path):
+    ws = tmp_path / "ws"
+    ws.mkdir()
+    (ws / "test_sample.py").write_text(TESTS, encoding="utf-8")
+    code, summary, stats = asyncio.run(run_pytest_async(str(ws), tmp_path / "out.log", tmp_path / "err.log"))
+    assert code == 1
+    assert not stats["timed_out"]
+    assert {k: summary[k] for k in ("passed", "failed", "errors", "skipped")} == {
+        "passed": 1,
+        "failed": 1,
+        "errors": 1,
+        "skipped": 1,
+    }
+    outcomes = {t["nodeid"].rsplit("::", 1)[-1]: t["outcome"] for t in summary["tests"]}
+    assert outcomes == {"test_ok": "passed", "test_fails": "failed", "test_skipped": "skipped", "test_errors": "error"}
+    assert len(slowest_tests(summary, 2)) == 2
+
+
+def test_stdout_summary_is_the_fallback(tmp_path):
+    (tmp_path / "out.log").write_text("..F\n1 failed, 2 passed, 1 error in 0.12s\n", encoding="utf-8")
+    summary = pytest_summary(tmp_path / "missing.xml", tmp_path / "out.log")
+    assert (summary["passed"], summary["failed"], summary["errors"], summary["skipped"]) == (2, 1, 1, 0)
+    assert summary["tests"] == []
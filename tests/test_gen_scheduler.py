@@ -0,0 +1,45 @@
+import pytest
+
+import gen_scheduler
+from deepseek_client import ChatError
+from gen_scheduler import TokenBucket, call_with_retries, run_jobs
+
+
+def test_throttled_job_costs_max_retries_requests_and_no_final_sleep(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(gen_scheduler.time, "sleep", sleeps.append)
+    calls = []
+
+    def attempt(job):
+        calls.append(job)
+        raise ChatError("HTTP 429", status=429, headers={"Retry-After": "3600"})
+
+    bucket = TokenBucket(1000.0, burst=10)
+    failures = run_jobs(["a"], attempt, lambda *_: None, bucket=bucket, max_retries=3, max_backoff_sec=5.0)
+    assert failures == [("a", "HTTP 429")]
+    assert len(calls) == 3
+    # No sleep after the last attempt; Retry-After is capped (with jitter).
+    assert len(sleeps) == 2
+    assert all(2.5 <= delay <= 7.5 for delay in sleeps)
+    assert bucket.rate == 1000.0 / 8
+
+
+def test_other_errors_back_off_with_jitter(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(gen_scheduler.time, "sleep", sleeps.append)
+    outcomes = iter([ValueError("bad json"), ValueError("bad json"), "ok"])
+
+    def attempt(job):
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert call_with_retries(attempt, "a", max_retries=3, backoff_sec=2.0) == ("ok", "")
+    assert len(sleeps) == 2
+    assert all(1.0 <= delay <= 3.0 for delay in sleeps)
+
+
+def test_token_bucket_rejects_non_positive_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
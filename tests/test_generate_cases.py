@@ -0,0 +1,54 @@
+import itertools
+import json
+import sys
+
+import generate_cases
+import pandas as pd
+from conftest import BENCH_DIR
+
+
+class _FakeLiteLLM:
+    # Every completion is a different valid case, like sampling at temperature > 0.
+    def __init__(self, category):
+        self.category = category
+        self.calls = itertools.count(1)
+
+    def completion(self, **kwargs):
+        n = next(self.calls)
+        case = generate_cases._make_stub_case(self.category, n)
+        case["requirement"] = f"sample {n}"
+        return {"choices": [{"message": {"content": json.dumps(case, ensure_ascii=False)}}]}
+
+
+def test_cached_samples_of_one_category_differ(tmp_path, monkeypatch):
+    categories = json.loads((BENCH_DIR / "categories_top50.json").read_text(encoding="utf-8"))[:1]
+    (tmp_path / "categories.json").write_text(json.dumps(categories, ensure_ascii=False), encoding="utf-8")
+    fake = _FakeLiteLLM(categories[0])
+    monkeypatch.setattr(generate_cases, "_require_litellm", lambda: fake)
+    argv = [
+        "generate_cases.py",
+        "--categories",
+        str(tmp_path / "categories.json"),
+        "--template",
+        str(BENCH_DIR / "prompts" / "case_prompt_template.md"),
+        "--per-category",
+        "2",
+        "--concurrency",
+        "1",
+        "--rps",
+        "1000",
+        "--llm-cache",
+        str(tmp_path / "llm_cache"),
+        "--out-jsonl",
+        str(tmp_path / "bank.jsonl"),
+        "--out-parquet",
+        str(tmp_path / "bank.parquet"),
+    ]
+    for _ in range(2):
+        # The second run is served from the cache and must still give both samples.
+        monkeypatch.setattr(sys, "argv", argv)
+        generate_cases.main()
+        cases = pd.read_parquet(tmp_path / "bank.parquet")
+        assert len(cases) == 2
+        assert sorted(cases["requirement"]) == ["sample 1", "sample 2"]
+    assert next(fake.calls) == 3
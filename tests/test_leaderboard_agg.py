@@ -0,0 +1,112 @@
+import json
+import os
+
+import pytest
+
+from conftest import make_bank
+from leaderboard_agg import agg_dir, refresh_aggregates, rollup
+from result_writer import ResultWriter, write_results
+
+
+def _cases(bank):
+    return [json.loads(line) for line in bank.read_text(encoding="utf-8").splitlines()]
+
+
+def _results(cases, agent, passed, duration=1.0):
+    return [
+        {
+            "case_id": case["case_id"],
+            "agent_name": agent,
+            "agent_version": "v1",
+            "category_id": case["vcfcst_category"]["level3_id"],
+            "difficulty": case["difficulty"],
+            "passed": ok,
+            "duration_sec": duration,
+        }
+        for case, ok in zip(cases, passed)
+    ]
+
+
+def _write_batch(root, name, results):
+    writer = ResultWriter(str(root), name, "2026-01-02")
+    writer.write_many(results)
+    writer.close()
+
+
+def _by_agent(agg):
+    return {row["agent_name"]: (row["runs"], row["passed"]) for row in rollup(agg, ["agent_name"]).to_dict("records")}
+
+
+def test_refresh_reads_only_new_files(tmp_path):
+    bank, _ = make_bank(tmp_path, cases=3)
+    cases = _cases(bank)
+    root = tmp_path / "ds"
+    _write_batch(root, "b1", _results(cases, "alpha", [True, False, True]))
+
+    agg, read = refresh_aggregates(str(root), str(bank))
+    assert read == 1
+    assert _by_agent(agg) == {"alpha": (3, 2)}
+    assert (root / "_aggregates" / "aggregates.parquet").exists()
+
+    again, read = refresh_aggregates(str(root), str(bank))
+    assert read == 0
+    assert again.equals(agg)
+
+    _write_batch(root, "b2", _results(cases, "beta", [False, False, True]))
+    agg, read = refresh_aggregates(str(root), str(bank))
+    assert read == 1
+    assert _by_agent(agg) == {"alpha": (3, 2), "beta": (3, 1)}
+    rebuilt, read = refresh_aggregates(str(root), str(bank), rebuild=True)
+    assert read == 2
+    key = ["agent_name", "level3_id", "difficulty"]
+    assert rebuilt.sort_values(key).reset_index(drop=True).equals(agg.sort_values(key).reset_index(drop=True))
+
+
+def test_a_rewritten_file_or_bank_triggers_a_full_rebuild(tmp_path):
+    bank, _ = make_bank(tmp_path, cases=3)
+    cases = _cases(bank)
+    root = tmp_path / "ds"
+    _write_batch(root, "b1", _results(cases, "alpha", [True, False, True]))
+    _write_batch(root, "b2", _results(cases, "beta", [True, True, True]))
+    refresh_aggregates(str(root), str(bank))
+
+    # A resumed batch rewrites its part file: counting it again would double it.
+    _write_batch(root, "b1", _results(cases, "alpha", [True, True, True]))
+    agg, read = refresh_aggregates(str(root), str(bank))
+    assert read == 2
+    assert _by_agent(agg) == {"alpha": (3, 3), "beta": (3, 3)}
+
+    st = bank.stat()
+    os.utime(bank, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    _, read = refresh_aggregates(str(root), str(bank))
+    assert read == 2
+
+
+def test_groups_carry_bank_categories_and_duration_sums(tmp_path):
+    bank, _ = make_bank(tmp_path, cases=2)
+    cases = _cases(bank)
+    results = _results(cases[:1], "alpha", [True], 1.0) + _results(cases[:1], "alpha", [False], 3.0)
+    write_results(tmp_path / "out.parquet", results)
+
+    agg, read = refresh_aggregates(str(tmp_path / "out.parquet"), str(bank))
+    assert read == 1
+    assert agg_dir(str(tmp_path / "out.parquet")) == tmp_path / "out.agg"
+    [row] = agg.to_dict("records")
+    category = cases[0]["vcfcst_category"]
+    assert (row["level1"], row["level2"], row["level3_id"]) == (
+        category["level1"],
+        category["level2"],
+        category["level3_id"],
+    )
+    assert (row["runs"], row["passed"], row["duration_sum"], row["duration_sq_sum"]) == (2, 1, 4.0, 10.0)
+    [summary] = rollup(agg, ["agent_name"]).to_dict("records")
+    assert summary["pass_rate"] == 0.5
+    assert summary["avg_duration"] == 2.0
+    assert summary["std_duration"] == pytest.approx(1.0)
+
+
+def test_no_results_gives_empty_aggregates(tmp_path):
+    agg, read = refresh_aggregates(str(tmp_path / "missing.parquet"))
+    assert read == 0
+    assert agg.empty
+    assert "runs" in agg.columns
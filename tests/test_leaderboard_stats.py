@@ -0,0 +1,83 @@
+import math
+
+import pandas as pd
+import pytest
+
+from leaderboard_stats import compute_stats, holm_adjust, load_stats, pass_at_k, sign_test_pvalues, wilson_interval
+from result_writer import write_results
+
+
+def _frame(rows):
+    return pd.DataFrame(rows, columns=["agent_name", "agent_version", "case_id", "passed"])
+
+
+def test_wilson_interval_matches_the_formula():
+    lo, hi = wilson_interval([8], [10])
+    z = 1.959963984540054
+    center = (0.8 + z * z / 20) / (1 + z * z / 10)
+    half = z * math.sqrt(0.8 * 0.2 / 10 + z * z / 400) / (1 + z * z / 10)
+    assert (lo[0], hi[0]) == pytest.approx((center - half, center + half))
+
+
+def test_sign_test_and_holm():
+    p = sign_test_pvalues([5, 3, 0], [0, 3, 0])
+    # 2 * P(X <= 0), X ~ Bin(5, 1/2); an even split; no discordant cases.
+    assert list(p) == pytest.approx([2 / 32, 1.0, 1.0])
+    assert list(holm_adjust([0.01, 0.04, 0.03])) == pytest.approx([0.03, 0.06, 0.06])
+
+
+def test_pass_at_k_is_unbiased():
+    n, c = [5, 5, 2], [2, 0, 1]
+    expected = [1 - math.comb(3, 2) / math.comb(5, 2), 0.0, 1.0]
+    assert list(pass_at_k(n, c, 2)) == pytest.approx(expected)
+    assert math.isnan(pass_at_k([1], [1], 2)[0])
+
+
+def test_versions_of_one_agent_are_ranked_separately():
+    rows = []
+    for i in range(6):
+        rows.append(("alpha", "v1", f"c{i}", i < 2))
+        rows.append(("alpha", "v2", f"c{i}", True))
+    stats = compute_stats(_frame(rows), n_boot=200)
+
+    agents = stats["agents"]
+    assert list(zip(agents["agent_name"], agents["agent_version"], agents["passed"])) == [
+        ("alpha", "v2", 6),
+        ("alpha", "v1", 2),
+    ]
+    assert (agents["wilson_low"] <= agents["pass_rate"]).all()
+    assert (agents["pass_rate"] <= agents["wilson_high"]).all()
+    [pair] = stats["pairwise"].to_dict("records")
+    assert (pair["agent_a_version"], pair["agent_b_version"]) == ("v1", "v2")
+    assert (pair["shared_cases"], pair["a_better"], pair["b_better"]) == (6, 0, 4)
+    assert pair["p_value"] == pytest.approx(2 / 16)
+    assert stats["pass_at_k"] is None
+
+
+def test_repeats_give_pass_at_k_and_categories():
+    rows = [("alpha", "", case, ok) for case in ("c0", "c1") for ok in (True, False)]
+    categories = pd.DataFrame({"case_id": ["c0", "c1"], "level1": ["L1", "L2"], "level2": ["", ""]})
+    stats = compute_stats(_frame(rows), categories, n_boot=50)
+    assert list(stats["categories"]["level1"]) == ["L1", "L2"]
+    assert list(stats["categories"]["cases"]) == [1, 1]
+    pass_k = stats["pass_at_k"].set_index("k")["pass_at_k"]
+    assert list(pass_k) == pytest.approx([0.5, 1.0])
+
+
+def test_no_results_give_empty_tables():
+    stats = compute_stats(_frame([]))
+    assert stats["agents"].empty and "wilson_low" in stats["agents"]
+    assert stats["categories"].empty and "level1" in stats["categories"]
+    assert stats["pairwise"].empty and "p_holm" in stats["pairwise"]
+    assert stats["pass_at_k"] is None
+
+
+def test_load_stats_reads_versions_and_filters(tmp_path):
+    rows = [
+        {"agent_name": "alpha", "agent_version": version, "case_id": "c0", "difficulty": "Easy", "passed": ok}
+        for version, ok in (("v1", False), ("v2", True))
+    ]
+    write_results(tmp_path / "out.parquet", rows)
+    stats = load_stats(str(tmp_path / "out.parquet"), n_boot=20)
+    assert list(stats["agents"]["agent_version"]) == ["v2", "v1"]
+    assert load_stats(str(tmp_path / "out.parquet"), difficulty="Hard")["agents"].empty
@@ -0,0 +1,103 @@
+import json
+import sys
+from pathlib import Path
+
+import orchestrator
+from conftest import BENCH_DIR, make_bank, orchestrator_args, read_results, run_orchestrator
+
+
+def _summary(results):
+    return [(r["case_id"], r["passed"], sorted(r["changed_files"])) for r in results]
+
+
+def test_parallel_workers_match_the_serial_run(tmp_path):
+    bank, _ = make_bank(tmp_path, cases=6)
+    run_orchestrator(tmp_path, bank, "--out", tmp_path / "serial.parquet", "--workers", 1)
+    run_orchestrator(
+        tmp_path, bank, "--out", tmp_path / "parallel.parquet", "--workers", 4, "--run-dir", tmp_path / "parallel"
+    )
+
+    serial = read_results(tmp_path / "serial.parquet")
+    parallel = read_results(tmp_path / "parallel.parquet")
+    # Same results, in case order, each case in its own workspace.
+    assert _summary(parallel) == _summary(serial)
+    assert [r["passed"] for r in parallel] == [False, True, True, False, True, True]
+    assert len({r["artifacts"]["workspace_dir"] for r in parallel}) == 6
+    stats_path = next((tmp_path / "parallel").glob("*/pipeline_stats.json"))
+    stats = json.loads(stats_path.read_text(encoding="utf-8"))
+    assert stats["stages"][0]["processed"] == 6
+
+
+def test_resume_reruns_only_unfinished_cases(tmp_path):
+    bank, _ = make_bank(tmp_path, cases=4)
+    run_orchestrator(tmp_path, bank, "--out", tmp_path / "first.parquet")
+    batch_dir = next((tmp_path / "runs").glob("benchmark-*"))
+    journal = batch_dir / "results.jsonl"
+    lines = journal.read_text(encoding="utf-8").splitlines(keepends=True)
+    # Interrupted after two cases, in the middle of writing the third.
+    journal.write_text("".join(lines[:2]) + lines[2][:20], encoding="utf-8")
+
+    proc = run_orchestrator(tmp_path, bank, "--out", tmp_path / "resumed.parquet", "--resume", batch_dir)
+    assert "resume: 2 runs already done, 2 to run" in proc.stdout
+    resumed = read_results(tmp_path / "resumed.parquet")
+    assert _summary(resumed) == _summary(read_results(tmp_path / "first.parquet"))
+    # The torn line was dropped and the rerun cases appended on fresh lines.
+    entries = [json.loads(line) for line in journal.read_text(encoding="utf-8").splitlines()]
+    assert [e["case_id"] for e in entries] == [r["case_id"] for r in resumed]
+
+
+def test_a_failing_run_does_not_stop_the_others(tmp_path, monkeypatch, capsys):
+    bank, _ = make_bank(tmp_path, cases=4)
+    broken = json.loads(bank.read_text(encoding="utf-8").splitlines()[1])["case_id"]
+    run_agent = orchestrator._run_agent
+
+    async def _run_agent(agent_cmd, prompt, cwd, *rest):
+        if Path(cwd).parent.name == broken:
+            raise OSError("agent binary vanished")
+        return await run_agent(agent_cmd, prompt, cwd, *rest)
+
+    monkeypatch.setattr(orchestrator, "_run_agent", _run_agent)
+    argv = orchestrator_args(tmp_path, bank, "--out", tmp_path / "out.parquet", "--workers", 2)
+    monkeypatch.setattr(sys, "argv", ["orchestrator.py", *argv])
+    orchestrator.main()
+
+    results = read_results(tmp_path / "out.parquet")
+    assert [r["passed"] for r in results] == [False, False, True, False]
+    failed = results[1]
+    assert failed["case_id"] == broken
+    assert failed["failure_reason"] == "agent: OSError: agent binary vanished"
+    assert list(failed["changed_files"]) == []
+    assert all(not r["failure_reason"] for i, r in enumerate(results) if i != 1)
+    assert "agent binary vanished" in capsys.readouterr().out
+
+
+def _agent_config(tmp_path, name, cmd, max_concurrency):
+    import yaml
+
+    config = yaml.safe_load((BENCH_DIR / "adapters" / "fake_agent.yaml").read_text(encoding="utf-8"))
+    config["agent_name"] = name
+    config["call_config"].update(cmd=" ".join(str(part) for part in cmd), max_concurrency=max_concurrency)
+    path = tmp_path / f"{name}.yaml"
+    path.write_text(yaml.safe_dump(config), encoding="utf-8")
+    return path
+
+
+def test_a_capped_agent_does_not_hold_up_the_others(tmp_path):
+    bank, patches = make_bank(tmp_path, cases=3)
+    fake = [sys.executable, BENCH_DIR / "fake_agent.py", patches]
+    configs = [_agent_config(tmp_path, "slow", fake + [1500], 1), _agent_config(tmp_path, "fast", fake, 0)]
+    out = tmp_path / "out.parquet"
+    proc = run_orchestrator(tmp_path, bank, "--out", out, "--workers", 3, agent_cmd=[], agent_configs=configs)
+
+    results = read_results(out)
+    # Matrix order: agents interleaved case by case, each in its own workspace.
+    assert [(r["agent_name"], r["passed"]) for r in results] == [
+        (agent, passed) for passed in (False, True, True) for agent in ("slow", "fast")
+    ]
+    assert len({r["artifacts"]["workspace_dir"] for r in results}) == 6
+    assert "agent fast@bench: passed 2/3" in proc.stdout
+    # The slow agent runs one case at a time; the fast one's runs are admitted
+    # past it and finish first.
+    journal = next((tmp_path / "runs").glob("benchmark-*")) / "results.jsonl"
+    finished = [json.loads(line)["agent_name"] for line in journal.read_text(encoding="utf-8").splitlines()]
+    assert finished == ["fast"] * 3 + ["slow"] * 3
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from pipeline import Stage, run_pipeline
+
+
+def _run(stages, items, max_in_flight):
+    done = []
+
+    async def main():
+        await run_pipeline(stages(), items(done) if callable(items) else items, done.append, max_in_flight)
+
+    asyncio.run(main())
+    return done
+
+
+def test_every_item_passes_every_stage_in_order():
+    seen = []
+
+    def stages():
+        async def step(name, item):
+            seen.append((name, item))
+            await asyncio.sleep(0.001 * (5 - item))
+
+        return [Stage(name, lambda item, name=name: step(name, item), 3, 2) for name in ("a", "b", "c")]
+
+    done = _run(stages, range(5), max_in_flight=3)
+    assert sorted(done) == list(range(5))
+    for item in range(5):
+        assert [name for name, i in seen if i == item] == ["a", "b", "c"]
+
+
+def test_max_in_flight_bounds_items_across_stages():
+    active = [0, 0]
+
+    def stages():
+        async def enter(item):
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+            await asyncio.sleep(0.005)
+
+        async def leave(item):
+            await asyncio.sleep(0.005)
+            active[0] -= 1
+
+        return [Stage("enter", enter, 8, 8), Stage("leave", leave, 8, 8)]
+
+    assert len(_run(stages, range(20), max_in_flight=3)) == 20
+    assert active[1] == 3
+
+
+def test_items_are_pulled_one_free_slot_at_a_time():
+    # A generator feeding the pipeline sees every earlier item's on_done first.
+    seen_done = []
+
+    def feed(done):
+        for item in range(6):
+            seen_done.append(len(done))
+            yield item
+
+    def stages():
+        async def noop(item):
+            await asyncio.sleep(0)
+
+        return [Stage("only", noop)]
+
+    assert _run(stages, feed, max_in_flight=1) == list(range(6))
+    assert seen_done == list(range(6))
+
+
+def test_a_stage_exception_is_raised():
+    def stages():
+        async def boom(item):
+            if item == 2:
+                raise ValueError("bad item")
+
+        return [Stage("only", boom, 2)]
+
+    with pytest.raises(ValueError, match="bad item"):
+        _run(stages, range(5), max_in_flight=2)
+
+
+def test_an_async_feed_can_hold_a_slot_until_its_item_is_ready():
+    ready = []
+
+    def feed(done):
+        async def items():
+            for item in range(3):
+                # Waits for the previous item to finish, like a capped agent.
+                while len(done) < item:
+                    await asyncio.sleep(0.001)
+                ready.append(len(done))
+                yield item
+
+        return items()
+
+    def stages():
+        async def noop(item):
+            await asyncio.sleep(0.002)
+
+        return [Stage("only", noop, 4)]
+
+    assert _run(stages, feed, max_in_flight=4) == [0, 1, 2]
+    assert ready == [0, 1, 2]
@@ -0,0 +1,62 @@
+import asyncio
+import sys
+
+from evaluator import run_pytest_async
+from pytest_worker import PytestWorkerPool
+
+
+def _workspace(base, name, value):
+    # Same module name in every workspace, different content: a forked child
+    # must import the one in its own cwd, not a copy cached by an earlier case.
+    ws = base / name
+    ws.mkdir()
+    (ws / "mod.py").write_text(f"VALUE = {value}\n", encoding="utf-8")
+    test = f"import mod\n\n\ndef test_value():\n    assert mod.VALUE == {value}\n"
+    (ws / "test_mod.py").write_text(test, encoding="utf-8")
+    return ws
+
+
+def test_forked_runs_match_subprocess_runs_and_stay_isolated(tmp_path):
+    first = _workspace(tmp_path, "a", 1)
+    second = _workspace(tmp_path, "b", 2)
+    (second / "test_fail.py").write_text("def test_fail():\n    assert False\n", encoding="utf-8")
+
+    async def main():
+        pool = PytestWorkerPool(size=1)
+        try:
+            results = []
+            for ws in (first, second, first):
+                results.append(
+                    await run_pytest_async(str(ws), ws / "out.log", ws / "err.log", python=sys.executable, workers=pool)
+                )
+            pids = [w.proc.pid for w in pool._all]
+            return results, pids
+        finally:
+            await pool.close()
+
+    results, pids = asyncio.run(main())
+    # One warm worker served all three cases.
+    assert len(pids) == 1
+    assert [code for code, _, _ in results] == [0, 1, 0]
+    assert [(s["passed"], s["failed"]) for _, s, _ in results] == [(1, 0), (1, 1), (1, 0)]
+
+    cold = asyncio.run(run_pytest_async(str(second), tmp_path / "out.log", tmp_path / "err.log"))
+    assert cold[0] == results[1][0]
+    assert (cold[1]["passed"], cold[1]["failed"]) == (1, 1)
+
+
+def test_forked_run_times_out(tmp_path):
+    ws = tmp_path / "ws"
+    ws.mkdir()
+    (ws / "test_slow.py").write_text("import time\n\n\ndef test_slow():\n    time.sleep(60)\n", encoding="utf-8")
+
+    async def main():
+        pool = PytestWorkerPool(size=1)
+        try:
+            return await pool.run(sys.executable, str(ws), ["-q"], ws / "out.log", ws / "err.log", timeout=2)
+        finally:
+            await pool.close()
+
+    stats = asyncio.run(main())
+    assert stats["timed_out"]
+    assert stats["wall_sec"] < 30
@@ -0,0 +1,61 @@
+import sys
+
+from conftest import BENCH_DIR, make_bank, read_results, run_orchestrator
+from leaderboard_agg import refresh_aggregates, rollup
+from leaderboard_stats import load_stats
+
+
+def _run(tmp_path, bank, dataset, out, *extra, **kwargs):
+    return run_orchestrator(
+        tmp_path,
+        bank,
+        "--out",
+        out,
+        "--out-dataset",
+        dataset,
+        "--reuse-results",
+        "--result-store",
+        tmp_path / "store",
+        *extra,
+        **kwargs,
+    ).stdout
+
+
+def test_reused_batch_does_not_change_leaderboard_counts(tmp_path):
+    bank, _ = make_bank(tmp_path)
+    dataset = tmp_path / "results"
+
+    first = _run(tmp_path, bank, dataset, tmp_path / "a.parquet")
+    assert "reuse: 0 runs" in first
+    agg, _ = refresh_aggregates(str(dataset))
+    before = rollup(agg, ["agent_name"])[["agent_name", "runs", "passed"]].to_dict("records")
+    assert before[0]["runs"] == 3 and before[0]["passed"] == 2
+
+    second = _run(tmp_path, bank, dataset, tmp_path / "b.parquet")
+    assert "reuse: 3 runs" in second
+    agg, _ = refresh_aggregates(str(dataset))
+    assert rollup(agg, ["agent_name"])[["agent_name", "runs", "passed"]].to_dict("records") == before
+
+    stats = load_stats(str(dataset), n_boot=50)
+    assert stats["agents"]["runs"].tolist() == [3]
+    assert stats["pass_at_k"] is None
+
+
+def test_timed_out_runs_are_not_stored(tmp_path):
+    bank, patches = make_bank(tmp_path)
+    dataset = tmp_path / "results"
+    slow = [sys.executable, BENCH_DIR / "fake_agent.py", patches, 10000]
+
+    first = _run(tmp_path, bank, dataset, tmp_path / "a.parquet", "--timeout", 2, "--workers", 3, agent_cmd=slow)
+    assert "reuse: 0 runs" in first
+    timed_out = read_results(tmp_path / "a.parquet")
+    assert not any(r["passed"] for r in timed_out)
+    phases = [phase for r in timed_out for phase in r["metrics"]["phases"] if phase["phase"] == "agent"]
+    assert len(phases) == 3 and all(phase["timed_out"] for phase in phases)
+
+    # Nothing was stored: the next run executes every case again...
+    second = _run(tmp_path, bank, dataset, tmp_path / "b.parquet")
+    assert "reuse: 0 runs from" in second and "3 to run" in second
+    assert [r["passed"] for r in read_results(tmp_path / "b.parquet")] == [False, True, True]
+    # ...and its completed runs are reused after that.
+    assert "reuse: 3 runs" in _run(tmp_path, bank, dataset, tmp_path / "c.parquet")
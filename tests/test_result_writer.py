@@ -0,0 +1,63 @@
+from conftest import make_bank, read_results, run_orchestrator
+from result_writer import ResultWriter, open_results, write_results
+
+
+def _result(agent, i):
+    return {"case_id": f"case-{i}", "agent_name": agent, "passed": i % 2 == 0, "metrics": {"pytest_exit_code": i}}
+
+
+def test_results_are_partitioned_and_flushed_in_row_groups(tmp_path):
+    import pyarrow.parquet as pq
+
+    writer = ResultWriter(str(tmp_path / "ds"), "batch-1", "2026-01-02", row_group_size=2)
+    writer.write_many(_result(agent, i) for i in range(5) for agent in ("alpha", "team/beta"))
+    # Nothing is visible until close: partition files are hidden .tmp files.
+    assert not list((tmp_path / "ds").rglob("*.parquet"))
+    paths = writer.close()
+
+    assert sorted(str(p.relative_to(tmp_path / "ds")) for p in paths) == [
+        "agent_name=alpha/run_date=2026-01-02/part-batch-1.parquet",
+        "agent_name=team%2Fbeta/run_date=2026-01-02/part-batch-1.parquet",
+    ]
+    assert [pq.ParquetFile(p).metadata.num_row_groups for p in paths] == [3, 3]
+    assert not list((tmp_path / "ds").rglob("*.tmp"))
+
+    rows = open_results(str(tmp_path / "ds")).to_pylist()
+    assert len(rows) == 10
+    beta = sorted((r for r in rows if r["agent_name"] == "team/beta"), key=lambda r: r["case_id"])
+    assert [r["passed"] for r in beta] == [True, False, True, False, True]
+    assert {r["run_date"] for r in rows} == {"2026-01-02"}
+    # Fields a result does not have come back as typed nulls.
+    assert beta[1]["metrics"]["pytest_exit_code"] == 1
+    assert beta[1]["metrics"]["semgrep_findings"] is None
+    assert beta[1]["changed_files"] is None
+
+
+def test_batches_append_files_to_the_same_partition(tmp_path):
+    for batch in ("batch-1", "batch-2"):
+        writer = ResultWriter(str(tmp_path / "ds"), batch, "2026-01-02")
+        writer.write(_result("alpha", 0))
+        writer.close()
+    rows = open_results(str(tmp_path / "ds"), columns=["case_id", "agent_name", "missing"]).to_pylist()
+    assert rows == [{"case_id": "case-0", "agent_name": "alpha"}] * 2
+
+
+def test_single_file_has_the_same_schema(tmp_path):
+    write_results(tmp_path / "out.parquet", [_result("alpha", 0)])
+    table = open_results(str(tmp_path / "out.parquet"))
+    writer = ResultWriter(str(tmp_path / "ds"), "b", "2026-01-02")
+    writer.write(_result("alpha", 0))
+    writer.close()
+    dataset = open_results(str(tmp_path / "ds"))
+    for name in table.schema.names:
+        assert dataset.schema.field(name).type == table.schema.field(name).type
+
+
+def test_orchestrator_dataset_matches_out(tmp_path):
+    bank, _ = make_bank(tmp_path, cases=3)
+    dataset = tmp_path / "ds"
+    run_orchestrator(tmp_path, bank, "--out", tmp_path / "out.parquet", "--out-dataset", dataset, "--row-group-size", 2)
+    streamed = sorted(open_results(str(dataset)).to_pylist(), key=lambda r: r["case_id"])
+    expected = read_results(tmp_path / "out.parquet")
+    assert [(r["case_id"], r["passed"]) for r in streamed] == [(r["case_id"], r["passed"]) for r in expected]
+    assert {r["agent_name"] for r in streamed} == {expected[0]["agent_name"]}
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from seed_cache import SeedCache, seed_workspace
+from workspace_diff import diff_workspace
+
+FILES = {"src/app.py": "def f():\n    return 0\n", "tests/test_app.py": "from src.app import f\n"}
+
+
+def _read(base):
+    return {
+        os.path.relpath(os.path.join(root, name), base): open(os.path.join(root, name), encoding="utf-8").read()
+        for root, _, names in os.walk(base)
+        for name in names
+    }
+
+
+@pytest.mark.parametrize("mode", ["auto", "copy", "hardlink"])
+def test_clones_match_the_seed_files(tmp_path, mode):
+    cache = SeedCache(str(tmp_path / "cache"), mode)
+    first = seed_workspace(cache, "abc", FILES, tmp_path / "run1")
+    second = seed_workspace(cache, "abc", FILES, tmp_path / "run2")
+    assert _read(tmp_path / "run1") == _read(tmp_path / "run2") == FILES
+    # One template, and its snapshot describes every clone.
+    assert first.files == second.files
+    assert diff_workspace(tmp_path / "run2", second).changed_files() == []
+
+
+def test_clone_edits_do_not_reach_the_template(tmp_path):
+    cache = SeedCache(str(tmp_path / "cache"), "copy")
+    snap = seed_workspace(cache, "abc", FILES, tmp_path / "run1")
+    (tmp_path / "run1" / "src" / "app.py").write_text("def f():\n    return 1\n", encoding="utf-8")
+    assert diff_workspace(tmp_path / "run1", snap).modified == ["src/app.py"]
+    seed_workspace(cache, "abc", FILES, tmp_path / "run2")
+    assert _read(tmp_path / "run2") == FILES
+
+
+def test_template_edited_through_a_hardlink_is_rebuilt(tmp_path):
+    cache = SeedCache(str(tmp_path / "cache"), "hardlink")
+    seed_workspace(cache, "abc", FILES, tmp_path / "run1")
+    # An agent editing in place writes through the shared inode.
+    with open(tmp_path / "run1" / "src" / "app.py", "a", encoding="utf-8") as f:
+        f.write("# edited\n")
+    seed_workspace(cache, "abc", FILES, tmp_path / "run2")
+    assert _read(tmp_path / "run2") == FILES
+
+
+def test_cache_is_shared_across_instances(tmp_path):
+    seed_workspace(SeedCache(str(tmp_path / "cache")), "abc", FILES, tmp_path / "run1")
+    template = tmp_path / "cache" / "abc" / "workspace" / "src" / "app.py"
+    built = template.stat().st_mtime_ns
+    seed_workspace(SeedCache(str(tmp_path / "cache")), "abc", FILES, tmp_path / "run2")
+    assert template.stat().st_mtime_ns == built
+
+
+def test_unknown_mode_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        SeedCache(str(tmp_path), "symlink")
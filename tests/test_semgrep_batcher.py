@@ -0,0 +1,90 @@
+import asyncio
+import json
+import time
+
+import evaluator
+from evaluator import SemgrepBatcher
+
+
+def _fake_semgrep(calls):
+    async def run_process(cmd, cwd, stdout_path, stderr_path, timeout=None, measure=False):
+        targets = cmd[cmd.index("off") + 1 :]
+        calls.append(targets)
+        stdout_path.write_text(json.dumps({"results": []}), encoding="utf-8")
+        stderr_path.write_text("", encoding="utf-8")
+        return {"returncode": 0, "wall_sec": 0.0}
+
+    return run_process
+
+
+def test_batch_flushes_when_all_in_flight_cases_wait(tmp_path, monkeypatch):
+    # workers (in flight) = 3 < batch_size = 4: the batch can never fill, so it
+    # must go out once all three are waiting instead of after the linger.
+    calls = []
+    monkeypatch.setattr(evaluator, "run_process", _fake_semgrep(calls))
+    in_flight = [3]
+
+    async def main():
+        batcher = SemgrepBatcher(tmp_path / "batches", batch_size=4, linger_sec=30.0, in_flight=lambda: in_flight[0])
+        checks = []
+        for i in range(3):
+            workspace = tmp_path / f"ws{i}"
+            workspace.mkdir()
+            checks.append(batcher.check(workspace, ["rule"], tmp_path / f"ws{i}.log"))
+        return await asyncio.wait_for(asyncio.gather(*checks), timeout=5)
+
+    t0 = time.perf_counter()
+    results = asyncio.run(main())
+    assert time.perf_counter() - t0 < 5
+    assert len(calls) == 1 and len(calls[0]) == 3
+    assert all(stats["batch_size"] == 3 for _, _, stats in results)
+
+
+def test_poke_flushes_after_a_case_leaves_without_semgrep(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(evaluator, "run_process", _fake_semgrep(calls))
+    in_flight = [3]
+
+    async def main():
+        batcher = SemgrepBatcher(tmp_path / "batches", batch_size=4, linger_sec=30.0, in_flight=lambda: in_flight[0])
+        checks = []
+        for i in range(2):
+            workspace = tmp_path / f"ws{i}"
+            workspace.mkdir()
+            checks.append(asyncio.ensure_future(batcher.check(workspace, ["rule"], tmp_path / f"ws{i}.log")))
+        await asyncio.sleep(0)
+        assert not calls
+        # The third case finishes without static checks.
+        in_flight[0] = 2
+        batcher.poke()
+        return await asyncio.wait_for(asyncio.gather(*checks), timeout=5)
+
+    asyncio.run(main())
+    assert len(calls) == 1 and len(calls[0]) == 2
+
+
+def test_twelve_cases_in_batches_of_four_take_three_runs(tmp_path, monkeypatch):
+    # The orchestrator's accounting: 4 cases in flight, a case leaves the
+    # pipeline (and the next is admitted) once its check returns.
+    calls = []
+    monkeypatch.setattr(evaluator, "run_process", _fake_semgrep(calls))
+    remaining = [12]
+
+    async def main():
+        batcher = SemgrepBatcher(
+            tmp_path / "batches", batch_size=4, linger_sec=30.0, in_flight=lambda: min(4, remaining[0])
+        )
+        slots = asyncio.Semaphore(4)
+
+        async def case(i):
+            async with slots:
+                workspace = tmp_path / f"ws{i}"
+                workspace.mkdir()
+                await batcher.check(workspace, ["rule"], tmp_path / f"ws{i}.log")
+                remaining[0] -= 1
+                batcher.poke()
+
+        await asyncio.wait_for(asyncio.gather(*(case(i) for i in range(12))), timeout=5)
+
+    asyncio.run(main())
+    assert [len(targets) for targets in calls] == [4, 4, 4]
@@ -0,0 +1,93 @@
+import os
+import subprocess
+
+from workspace_diff import diff_workspace, snapshot_workspace
+
+SEEDED = {"src/app.py": "def f():\n    return 0\n", "src/util.py": "X = 1\n", "README.md": "hello\n"}
+
+
+def _seed(base):
+    for rel, text in SEEDED.items():
+        path = base / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+    # Seeded well before the snapshot, like a cloned template.
+    past = 1_000_000_000 * 1_000_000_000
+    for rel in SEEDED:
+        os.utime(base / rel, ns=(past, past))
+
+
+def test_added_modified_deleted_and_ignored(tmp_path):
+    _seed(tmp_path)
+    before = snapshot_workspace(tmp_path)
+    (tmp_path / "src" / "app.py").write_text("def f():\n    return 1\n", encoding="utf-8")
+    (tmp_path / "src" / "util.py").unlink()
+    (tmp_path / "NOTES.md").write_text("new\n", encoding="utf-8")
+    (tmp_path / "blob.bin").write_bytes(b"\xff\xfe\x00")
+    (tmp_path / "__pycache__").mkdir()
+    (tmp_path / "__pycache__" / "app.pyc").write_bytes(b"cache")
+    (tmp_path / "node_modules" / "pkg").mkdir(parents=True)
+    (tmp_path / "node_modules" / "pkg" / "index.js").write_text("x", encoding="utf-8")
+
+    diff = diff_workspace(tmp_path, before)
+    assert diff.added == ["NOTES.md", "blob.bin"]
+    assert diff.modified == ["src/app.py"]
+    assert diff.deleted == ["src/util.py"]
+    assert diff.texts["blob.bin"] is None
+    # Unchanged files are not read again.
+    assert diff.bytes_read == len("def f():\n    return 1\n") + len("new\n") + 3
+
+    final = diff.final_code(SEEDED)
+    assert final == {"src/app.py": "def f():\n    return 1\n", "README.md": "hello\n", "NOTES.md": "new\n"}
+
+
+def test_touched_but_unchanged_file_is_not_reported(tmp_path):
+    _seed(tmp_path)
+    before = snapshot_workspace(tmp_path)
+    os.utime(tmp_path / "README.md")
+    (tmp_path / "src" / "util.py").write_text("X = 1\n", encoding="utf-8")
+    diff = diff_workspace(tmp_path, before)
+    assert diff.changed_files() == []
+
+
+def test_same_size_edit_right_after_the_snapshot_is_seen(tmp_path):
+    # Size and mtime can both match when the edit lands in the same clock tick;
+    # files modified at or after the snapshot are hashed.
+    _seed(tmp_path)
+    path = tmp_path / "src" / "util.py"
+    before = snapshot_workspace(tmp_path)
+    st = path.stat()
+    path.write_text("X = 2\n", encoding="utf-8")
+    os.utime(path, ns=(before.taken_ns, before.taken_ns))
+    assert path.stat().st_size == st.st_size
+    assert diff_workspace(tmp_path, before).modified == ["src/util.py"]
+
+
+def test_oversized_blob_is_hashed_not_kept(tmp_path):
+    _seed(tmp_path)
+    before = snapshot_workspace(tmp_path)
+    (tmp_path / "big.txt").write_text("a" * 2048, encoding="utf-8")
+    diff = diff_workspace(tmp_path, before, max_blob_bytes=1024)
+    assert diff.added == ["big.txt"]
+    assert diff.texts["big.txt"] is None
+    assert "Binary files /dev/null and b/big.txt differ" in diff.patch(SEEDED)
+
+
+def test_patch_applies_with_git(tmp_path):
+    base = tmp_path / "ws"
+    base.mkdir()
+    _seed(base)
+    before = snapshot_workspace(base)
+    (base / "src" / "app.py").write_text("def f():\n    return 1", encoding="utf-8")
+    (base / "src" / "util.py").unlink()
+    (base / "NOTES.md").write_text("new\n", encoding="utf-8")
+    patch = diff_workspace(base, before).patch(SEEDED)
+
+    fresh = tmp_path / "fresh"
+    fresh.mkdir()
+    _seed(fresh)
+    (tmp_path / "changes.patch").write_text(patch, encoding="utf-8")
+    subprocess.run(["git", "apply", str(tmp_path / "changes.patch")], cwd=fresh, check=True)
+    assert (fresh / "src" / "app.py").read_text(encoding="utf-8") == "def f():\n    return 1"
+    assert not (fresh / "src" / "util.py").exists()
+    assert (fresh / "NOTES.md").read_text(encoding="utf-8") == "new\n"